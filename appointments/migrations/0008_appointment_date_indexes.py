@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_alter_caseappointment_status'),
+        ('clients', '0002_initial'),
+        ('lawyers', '0012_lawyerprofile_rating_sum_rating_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='caseappointment',
+            index=models.Index(fields=['lawyer', 'appointment_date'], name='appointment_lawyer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caseappointment',
+            index=models.Index(fields=['user', 'appointment_date'], name='appointment_user_date_idx'),
+        ),
+    ]
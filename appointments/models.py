@@ -18,5 +18,11 @@ class CaseAppointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['lawyer', 'appointment_date'], name='appointment_lawyer_date_idx'),
+            models.Index(fields=['user', 'appointment_date'], name='appointment_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.user.user.email} -> {self.lawyer.user.email}"
\ No newline at end of file
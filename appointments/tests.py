@@ -1,3 +1,38 @@
+import datetime
 from django.test import TestCase
+from lawyers.tests import api_client, make_client, make_lawyer
+from .models import CaseAppointment
 
-# Create your tests here.
+
+class AppointmentPaginationTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        client_profile = make_client(1)
+        # Several rows share a date so the id tie-break decides page edges.
+        for n in range(7):
+            CaseAppointment.objects.create(
+                user=client_profile, lawyer=self.lawyer, title=f'Meeting {n}',
+                appointment_date=datetime.date(2026, 3, 1 + n // 3),
+            )
+        self.api = api_client(self.lawyer.user)
+
+    def test_unpaginated_request_keeps_the_plain_list(self):
+        response = self.api.get('/api/appointments/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_pages_cover_every_row_once(self):
+        seen, url = [], '/api/appointments/?page_size=3'
+        while url:
+            response = self.api.get(url)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(set(seen), set(CaseAppointment.objects.values_list('id', flat=True)))
+
+    def test_page_size_is_capped(self):
+        response = self.api.get('/api/appointments/?page_size=100000')
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
@@ -11,6 +11,7 @@ from lawyers.models import LawyerProfile
 from clients.models import GeneralUserProfile
 
 from .serializers import CaseAppointmentSerializer
+from backend.pagination import paginate
 from dotenv import load_dotenv
 import os
 
@@ -58,8 +59,11 @@ class LawyerAppointmentsView(APIView):
         except LawyerProfile.DoesNotExist:
             return Response({"error": "Only lawyers can view their appointments."}, status=status.HTTP_403_FORBIDDEN)
 
-        appointments = CaseAppointment.objects.filter(lawyer=lawyer_profile).order_by('-appointment_date')
+        appointments = CaseAppointment.objects.filter(lawyer=lawyer_profile).select_related('user').order_by('-appointment_date')
+        appointments, paginator = paginate(request, appointments, '-appointment_date', view=self)
         serializer = CaseAppointmentSerializer(appointments, many=True)
+        if paginator is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
 class ClientAppointmentsView(APIView):
@@ -71,8 +75,11 @@ class ClientAppointmentsView(APIView):
         except GeneralUserProfile.DoesNotExist:
             return Response({"error": "Only clients can view their appointments."}, status=status.HTTP_403_FORBIDDEN)
 
-        appointments = CaseAppointment.objects.filter(user=user_profile).order_by('-appointment_date')
+        appointments = CaseAppointment.objects.filter(user=user_profile).select_related('user').order_by('-appointment_date')
+        appointments, paginator = paginate(request, appointments, '-appointment_date', view=self)
         serializer = CaseAppointmentSerializer(appointments, many=True)
+        if paginator is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -15,4 +15,14 @@ settings_module = 'backend.deployment_settings' if 'RENDER_EXTERNAL_HOSTNAME' in
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up; it touches models.
+from chat.realtime import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # WebSocket connections (chat push) bypass Django's HTTP handler.
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    page_size = getattr(settings, 'CURSOR_PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'CURSOR_MAX_PAGE_SIZE', 100)
+
+    def __init__(self, ordering):
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        # Rows sharing the leading key are tie-broken on id so page boundaries never shift.
+        tiebreak = '-id' if ordering[0].startswith('-') else 'id'
+        self.ordering = tuple(ordering) + (tiebreak,)
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_paginated_response(self, data):
+        payload = dict(data) if isinstance(data, dict) else {'results': data}
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        return Response(payload)
+
+
+def paginate(request, queryset, ordering, view=None):
+    # Pagination is opt-in (?page_size= or ?cursor=) so existing clients keep
+    # getting the full list. Returns (rows, paginator); paginator is None when
+    # the request is not paginated and rows is then the queryset unchanged.
+    paginator = KeysetPagination(ordering)
+    if not paginator.is_requested(request):
+        return queryset, None
+    return paginator.paginate_queryset(queryset, request, view=view), paginator
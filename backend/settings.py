@@ -10,6 +10,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
+REDIS_URL = os.getenv("REDIS_URL")
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET")
 
@@ -21,6 +22,23 @@ ALLOWED_HOSTS = []
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Partial chunked uploads live outside MEDIA_ROOT so they are never served.
+CHUNKED_UPLOAD_DIR = os.path.join(BASE_DIR, 'upload_tmp')
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+
+# How case document downloads are served once access is checked: 'python'
+# streams them from Django, 'accel' hands off to an nginx internal location
+# (DOCUMENT_ACCEL_PREFIX mapped onto MEDIA_ROOT), 'sendfile' to X-Sendfile.
+DOCUMENT_DOWNLOAD_BACKEND = os.getenv("DOCUMENT_DOWNLOAD_BACKEND", "python")
+DOCUMENT_ACCEL_PREFIX = '/protected-media/'
+
+# How often each ASGI worker checks for chat messages sent through other workers.
+CHAT_TAIL_INTERVAL = 0.5
+CHAT_LONG_POLL_TIMEOUT = 25
+CHAT_SSE_HEARTBEAT = 15
+CHAT_SSE_MAX_DURATION = 300
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -53,6 +71,9 @@ REST_FRAMEWORK = {
     ],
 }
 
+CURSOR_PAGE_SIZE = 20
+CURSOR_MAX_PAGE_SIZE = 100
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 MIDDLEWARE = [
@@ -101,6 +122,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Directory facets and chat membership are cached and dropped when they
+# change, so every worker must share the cache: Redis when REDIS_URL is set,
+# else a database table (manage.py createcachetable).
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
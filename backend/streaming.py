@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+# StreamingHttpResponse only streams an iterator of the kind the server
+# speaks: under ASGI it collects a sync iterator into a list before sending
+# the first byte, under WSGI it does the same to an async one. Streaming
+# views hand their body through streaming_content() so either way it goes
+# out as it is produced.
+
+def served_over_asgi(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def iterate_in_thread(iterator):
+    # Each next() runs in the request's sync thread, so blocking reads stay
+    # off the event loop and ORM cursors stay on the connection that opened
+    # them. Closing the generator (client gone) closes the iterator too.
+    next_chunk = sync_to_async(next)
+    done = object()
+    try:
+        while (chunk := await next_chunk(iterator, done)) is not done:
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_content(request, iterator):
+    return iterate_in_thread(iterator) if served_over_asgi(request) else iterator
@@ -0,0 +1,69 @@
+import base64
+import binascii
+import json
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+# Change feeds (case sync, chat polls) hand clients an opaque watermark
+# instead of the last auto-increment id. Ids are allocated when a row is
+# inserted but the row only becomes visible when its transaction commits, so
+# a lower id can appear after a higher one has already been read. A
+# watermark is a point in time plus the ids already delivered from just
+# behind it: the next read looks back `overlap` from that time and skips
+# those ids. Writes that commit within `overlap` of their timestamp are never
+# lost, and nothing is sent twice.
+
+# Watermarks come back from clients, so the ids they carry are capped; the
+# reads below would otherwise grow with whatever a forged one holds. A feed
+# delivering more than this within one overlap only risks sending the
+# oldest of them again.
+MAX_SEEN = 1000
+
+
+def encode_watermark(time, seen=()):
+    payload = json.dumps({'t': time.isoformat(), 's': sorted(seen)[-MAX_SEEN:]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_watermark(value):
+    # Returns (time, seen ids); raises ValueError for anything that is not a
+    # watermark from encode_watermark.
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        time = parse_datetime(payload['t'])
+        if len(payload['s']) > MAX_SEEN:
+            raise ValueError
+        seen = {int(row_id) for row_id in payload['s']}
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError):
+        raise ValueError("Not a watermark.")
+    if time is None or timezone.is_naive(time):
+        raise ValueError("Not a watermark.")
+    return time, seen
+
+
+def read_since(queryset, field, since, seen, limit, overlap):
+    # The rows of queryset stamped (on `field`) after since - overlap that are
+    # not in seen, oldest first, at most limit of them. Returns
+    # (rows, has_more, watermark). A full read moves the watermark to the time
+    # the read started; a cut-off read resumes from its last row.
+    now = timezone.now()
+    window = list(
+        queryset.filter(**{f'{field}__gt': since - overlap}).order_by(field, 'pk')[:limit + 1 + len(seen)]
+    )
+    rows = [row for row in window if row.pk not in seen]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    time = getattr(rows[-1], field) if has_more else now
+    delivered = {row.pk for row in rows} | seen
+    return rows, has_more, encode_watermark(time, {
+        row.pk for row in window if row.pk in delivered and getattr(row, field) > time - overlap
+    })
+
+
+def watermark_now(queryset, field, overlap):
+    # The watermark for a snapshot taken now: everything already committed
+    # inside the look-back window counts as delivered.
+    now = timezone.now()
+    seen = queryset.filter(**{f'{field}__gt': now - overlap}).values_list('pk', flat=True)
+    return encode_watermark(now, set(seen))
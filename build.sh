@@ -4,6 +4,8 @@ pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py createcachetable
+python manage.py rebuild_lawyer_stats
 
 if [[ $CREATE_SUPERUSER ]]; then
     python manage.py createsuperuser \
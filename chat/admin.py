@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Conversation, Message
+from .models import Conversation, Message, ReadCursor
 
 # Register your models here.
 admin.site.register(Conversation)
-admin.site.register(Message)
\ No newline at end of file
+admin.site.register(Message)
+admin.site.register(ReadCursor)
@@ -0,0 +1,110 @@
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from backend.watermarks import read_since, watermark_now
+from .models import Conversation, Message, ReadCursor
+
+# Inbox state: each conversation carries its newest message (kept current by
+# record_message) and each participant a read cursor, so listing every
+# conversation with a preview and unread count is a single query.
+
+PREVIEW_LENGTH = 100
+
+
+def record_message(message):
+    """Bump the conversation's last message and mark it read for the sender."""
+    # Guarded on id so a slower concurrent send can't move it backwards.
+    Conversation.objects.filter(
+        Q(last_message__isnull=True) | Q(last_message_id__lt=message.id), id=message.conversation_id,
+    ).update(last_message=message, last_message_at=message.timestamp)
+    mark_read(message.conversation_id, message.sender_id, message.id)
+
+
+def mark_read(conversation_id, user_id, message_id):
+    """Move the user's read cursor up to message_id. Never moves it back."""
+    cursor, created = ReadCursor.objects.get_or_create(
+        conversation_id=conversation_id, user_id=user_id, defaults={'last_read_message_id': message_id},
+    )
+    if not created and cursor.last_read_message_id < message_id:
+        ReadCursor.objects.filter(pk=cursor.pk, last_read_message_id__lt=message_id).update(last_read_message_id=message_id)
+        cursor.last_read_message_id = message_id
+    return cursor
+
+
+def with_unread_counts(conversations, user):
+    """Annotate unread_count: messages past the user's cursor sent by others."""
+    read_up_to = Coalesce(
+        Subquery(ReadCursor.objects.filter(conversation=OuterRef('pk'), user=user).values('last_read_message_id')[:1]),
+        Value(0), output_field=IntegerField(),
+    )
+    return conversations.annotate(
+        unread_count=Count('messages', filter=Q(messages__id__gt=read_up_to) & ~Q(messages__sender=user)),
+    )
+
+
+def conversations_with(user, other_user_ids):
+    """{other user id: conversation} for the user's two-party conversations."""
+    other_user_ids = list(other_user_ids)
+    if not other_user_ids:
+        return {}
+    conversations = Conversation.objects.filter(
+        Q(min_user=user, max_user__in=other_user_ids) | Q(max_user=user, min_user__in=other_user_ids)
+    ).select_related('last_message')
+    return {
+        conversation.max_user_id if conversation.min_user_id == user.id else conversation.min_user_id: conversation
+        for conversation in with_unread_counts(conversations, user)
+    }
+
+
+def summary(conversation):
+    """The inbox fields for one conversation (or for no conversation yet)."""
+    if conversation is None:
+        return {"conversation_id": None, "last_message": None, "unread_count": 0}
+    last_message = None
+    message = conversation.last_message
+    if message is not None:
+        last_message = {
+            "id": message.id,
+            "sender": message.sender_id,
+            "preview": message.text[:PREVIEW_LENGTH],
+            "timestamp": message.timestamp,
+        }
+    return {
+        "conversation_id": conversation.id,
+        "last_message": last_message,
+        "unread_count": conversation.unread_count,
+    }
+
+
+def changes_watermark(user, overlap):
+    """The watermark for the user's messages as of now."""
+    return watermark_now(Message.objects.filter(conversation__participants=user), 'timestamp', overlap)
+
+
+def changes_since(user, since, seen, limit, per_conversation, overlap):
+    """
+    The user's messages past a watermark position (see backend.watermarks),
+    at most limit of them, grouped by conversation. Returns
+    ([(conversation, messages, has_more)], has_more, watermark) with the
+    conversations oldest change first, each holding its newest
+    per_conversation messages; its has_more means it had more than that.
+    """
+    # A conversation's last_message_at moves with every message it gets, so
+    # only the conversations it puts inside the window can hold any. Picking
+    # those first is a range scan on last_message_at; the messages are then
+    # read per conversation on (conversation, timestamp, id).
+    changed = Conversation.objects.filter(participants=user, last_message_at__gt=since - overlap).values('id')
+    messages, has_more, watermark = read_since(
+        Message.objects.filter(conversation_id__in=changed).select_related('sender'),
+        'timestamp', since, seen, limit, overlap,
+    )
+    grouped = {}
+    for message in messages:
+        grouped.setdefault(message.conversation_id, []).append(message)
+    conversations = with_unread_counts(
+        Conversation.objects.filter(id__in=grouped).select_related('last_message'), user,
+    ).order_by('last_message_at', 'id')
+    changes = [
+        (conversation, grouped[conversation.id][-per_conversation:], len(grouped[conversation.id]) > per_conversation)
+        for conversation in conversations
+    ]
+    return changes, has_more, watermark
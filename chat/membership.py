@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.db import transaction
+from .models import Conversation
+
+# Every chat request checks that the user belongs to the conversation. A yes
+# is cached per (conversation, user) in the shared cache; a no always goes
+# to the database. Removing a participant replaces the cached yes with a
+# marker (see signals.py) that a request which read the old membership
+# before the removal committed can't overwrite, since yeses are only added.
+
+MEMBERSHIP_TIMEOUT = 30
+Participant = Conversation.participants.through
+
+
+def membership_key(conversation_id, user_id):
+    return f'chat:member:{conversation_id}:{user_id}'
+
+
+def is_participant(conversation_id, user_id):
+    key = membership_key(conversation_id, user_id)
+    if cache.get(key):
+        return True
+    member = Participant.objects.filter(conversation_id=conversation_id, user_id=user_id).exists()
+    if member:
+        cache.add(key, True, MEMBERSHIP_TIMEOUT)
+    return member
+
+
+def check_access(conversation_id, user_id):
+    """
+    None if the user may use the conversation, else (error, status) with the
+    same messages the chat views have always returned.
+    """
+    if is_participant(conversation_id, user_id):
+        return None
+    if not Conversation.objects.filter(id=conversation_id).exists():
+        return 'Conversation not found', 404
+    return 'Not authorized for this conversation', 403
+
+
+def invalidate_membership(pairs):
+    # Joined: drop any removal marker so the new membership gets cached.
+    keys = [membership_key(conversation_id, user_id) for conversation_id, user_id in pairs]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def revoke_membership(pairs):
+    # Left: mark the keys for the cache timeout, now and again after commit.
+    markers = {membership_key(conversation_id, user_id): False for conversation_id, user_id in pairs}
+    if markers:
+        cache.set_many(markers, MEMBERSHIP_TIMEOUT)
+        transaction.on_commit(lambda: cache.set_many(markers, MEMBERSHIP_TIMEOUT))
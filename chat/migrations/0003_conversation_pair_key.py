@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def merge_duplicate_conversations(apps, schema_editor):
+    # Key every two-party conversation by its participant pair. Where a pair
+    # has several conversations, keep the oldest and move the others'
+    # messages into it before deleting them.
+    Conversation = apps.get_model('chat', 'Conversation')
+    Message = apps.get_model('chat', 'Message')
+    Participant = Conversation.participants.through
+
+    pairs = {}
+    rows = (
+        Participant.objects.values('conversation_id')
+        .annotate(members=Count('user_id'), low=Min('user_id'), high=Max('user_id'))
+        .filter(members=2)
+        .order_by('conversation_id')
+    )
+    for row in rows:
+        pairs.setdefault((row['low'], row['high']), []).append(row['conversation_id'])
+
+    for (low, high), conversation_ids in pairs.items():
+        keeper, duplicates = conversation_ids[0], conversation_ids[1:]
+        if duplicates:
+            Message.objects.filter(conversation_id__in=duplicates).update(conversation_id=keeper)
+            Conversation.objects.filter(id__in=duplicates).delete()
+        Conversation.objects.filter(id=keeper).update(min_user_id=low, max_user_id=high)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='max_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='min_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(merge_duplicate_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_conversation_pair_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('min_user', 'max_user'), name='unique_conversation_pair'),
+        ),
+    ]
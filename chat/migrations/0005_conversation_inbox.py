@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_inbox(apps, schema_editor):
+    # Point every conversation at its newest message, and start existing
+    # participants with everything so far read rather than a full unread
+    # backlog.
+    Conversation = apps.get_model('chat', 'Conversation')
+    Message = apps.get_model('chat', 'Message')
+    ReadCursor = apps.get_model('chat', 'ReadCursor')
+    Participant = Conversation.participants.through
+
+    newest = Message.objects.filter(conversation_id=OuterRef('pk')).order_by('-id')
+    Conversation.objects.update(
+        last_message_id=Subquery(newest.values('id')[:1]),
+        last_message_at=Subquery(newest.values('timestamp')[:1]),
+    )
+    last_ids = dict(Conversation.objects.filter(last_message__isnull=False).values_list('id', 'last_message_id'))
+    ReadCursor.objects.bulk_create(
+        [
+            ReadCursor(conversation_id=conversation_id, user_id=user_id, last_read_message_id=last_ids[conversation_id])
+            for conversation_id, user_id in Participant.objects.filter(conversation_id__in=last_ids).values_list('conversation_id', 'user_id').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_conversation_pair_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReadCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_cursors', to='chat.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('conversation', 'user'), name='unique_read_cursor')],
+            },
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
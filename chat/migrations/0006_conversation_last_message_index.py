@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_conversation_inbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['last_message_at'], name='conversation_last_msg_at_idx'),
+        ),
+    ]
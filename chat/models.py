@@ -3,7 +3,27 @@ from users.models import User
 
 class Conversation(models.Model):
     participants = models.ManyToManyField(User)
+    # Canonical key for two-party conversations (lower user id first), so a
+    # pair maps to at most one conversation.
+    min_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    max_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized from Message so inbox listings don't scan message history.
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['min_user', 'max_user'], name='unique_conversation_pair'),
+        ]
+        indexes = [
+            # The changes poll is a range scan from the client's watermark.
+            models.Index(fields=['last_message_at'], name='conversation_last_msg_at_idx'),
+        ]
+
+    @staticmethod
+    def pair_key(user_id, other_user_id):
+        return {'min_user_id': min(user_id, other_user_id), 'max_user_id': max(user_id, other_user_id)}
 
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages")
@@ -11,4 +31,23 @@ class Message(models.Model):
     text = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     class Meta:
-        ordering = ['timestamp']
\ No newline at end of file
+        ordering = ['timestamp']
+        indexes = [
+            # History pages and incremental fetches are range scans on this.
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conv_ts_id_idx'),
+            # The realtime tail reads every conversation by time.
+            models.Index(fields=['timestamp', 'id'], name='message_ts_id_idx'),
+        ]
+
+class ReadCursor(models.Model):
+    # The newest message a participant has seen; later messages from anyone
+    # else count as unread.
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='read_cursors')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_read_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='unique_read_cursor'),
+        ]
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .models import Conversation, Message
+from .serializers import MessageSerializer
+
+# Real-time chat delivery. Each worker process runs one Hub, which holds a
+# queue per connected socket (keyed by user). Messages sent through this
+# worker are pushed straight into those queues; messages committed by any
+# other worker (or a WSGI process) are picked up by tailing the message
+# table, so fan-out needs no broker. Ordering across workers and a rare
+# double delivery are possible, so clients should key messages by id.
+
+TAIL_BATCH = 500
+# A message's id and timestamp are taken before its transaction commits, so
+# rows can become visible out of order. Each tail pass re-reads this far
+# behind the previous one and skips the ids it already delivered.
+TAIL_OVERLAP = timedelta(seconds=5)
+
+
+def message_event(message):
+    return {
+        "type": "message",
+        "conversation_id": message.conversation_id,
+        "message": MessageSerializer(message).data,
+    }
+
+
+class Hub:
+    def __init__(self):
+        self.loop = None
+        self.subscribers = {}
+        # Where the next tail pass starts, and {id: timestamp} of the messages
+        # already delivered from within TAIL_OVERLAP of it.
+        self.horizon = None
+        self.delivered = {}
+        self.tail_task = None
+        self.lock = threading.Lock()
+
+    def _bind(self, loop):
+        # Under ASGI there is one loop per worker. Under WSGI each async view
+        # gets a short-lived loop; adopt it once the previous one has closed.
+        if self.loop is loop:
+            return True
+        if self.running:
+            return False
+        self.loop, self.tail_task, self.horizon = loop, None, None
+        self.subscribers = {}
+        with self.lock:
+            self.delivered.clear()
+        return True
+
+    async def subscribe(self, user_id):
+        """
+        Return a queue of message events for the user, or None if another
+        event loop owns this worker's hub (callers then poll the database).
+        """
+        if not self._bind(asyncio.get_running_loop()):
+            return None
+        if self.horizon is None:
+            self.horizon = timezone.now()
+        if self.tail_task is None or self.tail_task.done():
+            self.tail_task = self.loop.create_task(self._tail())
+
+        queue = asyncio.Queue()
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    @asynccontextmanager
+    async def listen(self, user_id):
+        queue = await self.subscribe(user_id)
+        try:
+            yield queue
+        finally:
+            if queue is not None:
+                self.unsubscribe(user_id, queue)
+
+    async def wait(self, queue, conversation_id, timeout):
+        """
+        Wait up to timeout seconds for a message in the conversation. Without a
+        queue, just sleep one tail interval. Returns True if one arrived.
+        """
+        if queue is None:
+            await asyncio.sleep(min(timeout, settings.CHAT_TAIL_INTERVAL))
+            return False
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return False
+            try:
+                event = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return False
+            if event["conversation_id"] == conversation_id:
+                return True
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+
+    @property
+    def running(self):
+        return self.loop is not None and not self.loop.is_closed()
+
+    def publish(self, message, participant_ids):
+        """
+        Deliver a message to this worker's sockets. Safe to call from sync
+        code running in another thread (e.g. a view's on_commit hook).
+        """
+        if not self.running:
+            return
+        with self.lock:
+            self.delivered[message.id] = message.timestamp
+        self.loop.call_soon_threadsafe(self._dispatch, message_event(message), participant_ids)
+
+    def _dispatch(self, event, participant_ids):
+        for user_id in participant_ids:
+            for queue in self.subscribers.get(user_id, ()):
+                queue.put_nowait(event)
+
+    def _fetch_new(self, since, delivered_ids):
+        """
+        Messages stamped after since less TAIL_OVERLAP that aren't in
+        delivered_ids, oldest first, with the participants of each conversation.
+        """
+        try:
+            messages = list(
+                Message.objects.filter(timestamp__gt=since - TAIL_OVERLAP).exclude(id__in=delivered_ids)
+                .select_related('sender').order_by('timestamp', 'id')[:TAIL_BATCH]
+            )
+            participants = {}
+            if messages:
+                rows = Conversation.participants.through.objects.filter(
+                    conversation_id__in={message.conversation_id for message in messages}
+                ).values_list('conversation_id', 'user_id')
+                for conversation_id, user_id in rows:
+                    participants.setdefault(conversation_id, []).append(user_id)
+            return [(message, participants.get(message.conversation_id, [])) for message in messages]
+        finally:
+            close_old_connections()
+
+    async def _tail(self):
+        while True:
+            await asyncio.sleep(settings.CHAT_TAIL_INTERVAL)
+            if not self.subscribers:
+                # Nobody to deliver to; the next subscribe starts from then.
+                self.horizon = None
+                with self.lock:
+                    self.delivered.clear()
+                continue
+            started = timezone.now()
+            with self.lock:
+                delivered_ids = list(self.delivered)
+            try:
+                batch = await sync_to_async(self._fetch_new)(self.horizon, delivered_ids)
+            except Exception:
+                continue
+            for message, participant_ids in batch:
+                with self.lock:
+                    # Published by this worker while the query ran.
+                    if message.id in self.delivered:
+                        continue
+                    self.delivered[message.id] = message.timestamp
+                self._dispatch(message_event(message), participant_ids)
+            # A full batch resumes from its last row rather than skipping ahead.
+            self.horizon = batch[-1][0].timestamp if len(batch) == TAIL_BATCH else started
+            cutoff = self.horizon - TAIL_OVERLAP
+            with self.lock:
+                self.delivered = {
+                    message_id: timestamp for message_id, timestamp in self.delivered.items() if timestamp > cutoff
+                }
+
+
+hub = Hub()
+
+
+def publish_message(message):
+    # Under WSGI there is no hub loop; ASGI workers pick the row up by tailing.
+    if hub.running:
+        participant_ids = Conversation.participants.through.objects.filter(
+            conversation_id=message.conversation_id
+        ).values_list('user_id', flat=True)
+        hub.publish(message, list(participant_ids))
+
+
+def token_from(query_token, authorization):
+    # Browsers can't set headers on WebSocket or EventSource requests, so the
+    # token may also come in the query string.
+    if query_token:
+        return query_token
+    if authorization and authorization.startswith('Token '):
+        return authorization[len('Token '):]
+    return None
+
+
+@sync_to_async
+def token_user(key):
+    """The active user owning a DRF token, or None."""
+    if not key:
+        return None
+    try:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is None or not token.user.is_active:
+            return None
+        return token.user
+    finally:
+        close_old_connections()
+
+
+async def authenticate(scope):
+    query_token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    authorization = dict(scope.get('headers', [])).get(b'authorization', b'').decode()
+    return await token_user(token_from(query_token, authorization))
+
+
+async def websocket_application(scope, receive, send):
+    """
+    /ws/chat/ - one socket per user, carrying every message in any of their
+    conversations as {"type": "message", "conversation_id", "message"}.
+    Clients may send {"type": "ping"} to keep idle proxies from dropping it.
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    if scope['path'].rstrip('/') != '/ws/chat':
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    user = await authenticate(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+
+    queue = await hub.subscribe(user.id)
+    if queue is None:
+        await send({'type': 'websocket.close', 'code': 1011})
+        return
+    await send({'type': 'websocket.accept'})
+    receiving = asyncio.ensure_future(receive())
+    delivering = asyncio.ensure_future(queue.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({receiving, delivering}, return_when=asyncio.FIRST_COMPLETED)
+            if delivering in done:
+                await send({'type': 'websocket.send', 'text': json.dumps(delivering.result())})
+                delivering = asyncio.ensure_future(queue.get())
+            if receiving in done:
+                event = receiving.result()
+                if event['type'] == 'websocket.disconnect':
+                    break
+                if event.get('text'):
+                    try:
+                        frame = json.loads(event['text'])
+                    except ValueError:
+                        frame = None
+                    if isinstance(frame, dict) and frame.get('type') == 'ping':
+                        await send({'type': 'websocket.send', 'text': json.dumps({"type": "pong"})})
+                receiving = asyncio.ensure_future(receive())
+    finally:
+        receiving.cancel()
+        delivering.cancel()
+        hub.unsubscribe(user.id, queue)
@@ -0,0 +1,37 @@
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+from .membership import Participant, invalidate_membership, revoke_membership
+from .models import Conversation
+
+
+@receiver(m2m_changed, sender=Participant)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # clear() doesn't say who was removed; remember it for post_clear.
+        if reverse:
+            rows = Participant.objects.filter(user_id=instance.pk).values_list('conversation_id', 'user_id')
+        else:
+            rows = Participant.objects.filter(conversation_id=instance.pk).values_list('conversation_id', 'user_id')
+        instance._cleared_memberships = list(rows)
+    elif action == 'post_clear':
+        revoke_membership(getattr(instance, '_cleared_memberships', []))
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            pairs = [(conversation_id, instance.pk) for conversation_id in pk_set]
+        else:
+            pairs = [(instance.pk, user_id) for user_id in pk_set]
+        if action == 'post_add':
+            invalidate_membership(pairs)
+        else:
+            revoke_membership(pairs)
+
+
+@receiver(pre_delete, sender=Conversation)
+def remember_members(sender, instance, **kwargs):
+    rows = Participant.objects.filter(conversation_id=instance.pk).values_list('conversation_id', 'user_id')
+    instance._deleted_memberships = list(rows)
+
+
+@receiver(post_delete, sender=Conversation)
+def forget_members(sender, instance, **kwargs):
+    revoke_membership(getattr(instance, '_deleted_memberships', []))
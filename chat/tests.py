@@ -1,3 +1,574 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from hire.models import Hire
+from lawyers.tests import MigrationTestCase, count_queries, make_client, make_lawyer
+from users.models import User
+from .inbox import PREVIEW_LENGTH, mark_read, record_message, with_unread_counts
+from .membership import check_access, is_participant, membership_key
+from .models import Conversation, Message, ReadCursor
+from .realtime import Hub
 
-# Create your tests here.
+
+def make_user(name, role='general'):
+    return User.objects.create_user(email=f'{name}@example.com', password=None, role=role)
+
+
+def make_conversation(*users):
+    conversation = Conversation.objects.create(**Conversation.pair_key(users[0].id, users[1].id))
+    conversation.participants.set(users)
+    return conversation
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=user.pk))
+    return client
+
+
+@override_settings(CHAT_TAIL_INTERVAL=0.02)
+class HubTailTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.conversation = make_conversation(self.alice, self.bob)
+        self.hub = Hub()
+
+    def send(self, text, **fields):
+        return Message.objects.create(conversation=self.conversation, sender=self.alice, text=text, **fields)
+
+    async def received(self, queue, timeout=0.3):
+        ids = []
+        try:
+            while True:
+                ids.append((await asyncio.wait_for(queue.get(), timeout))["message"]["id"])
+        except asyncio.TimeoutError:
+            return ids
+
+    async def test_tail_delivers_messages_from_other_workers_once(self):
+        queue = await self.hub.subscribe(self.bob.id)
+        message = await sync_to_async(self.send)('hello')
+        self.assertEqual(await self.received(queue), [message.id])
+        self.hub.tail_task.cancel()
+
+    async def test_message_committed_out_of_id_order_is_delivered(self):
+        queue = await self.hub.subscribe(self.bob.id)
+        # The slow sender's id and timestamp come first, but its row only
+        # becomes visible after the fast sender's has been delivered.
+        slow = await sync_to_async(self.send)('slow')
+        slow_id, slow_at = slow.id, slow.timestamp
+        await sync_to_async(slow.delete)()
+        fast = await sync_to_async(self.send)('fast')
+        self.assertEqual(await self.received(queue), [fast.id])
+
+        def commit_slow():
+            self.send('slow', id=slow_id)
+            Message.objects.filter(id=slow_id).update(timestamp=slow_at)
+        await sync_to_async(commit_slow)()
+        self.assertEqual(await self.received(queue), [slow_id])
+        self.hub.tail_task.cancel()
+
+    async def test_published_messages_are_not_repeated_by_the_tail(self):
+        queue = await self.hub.subscribe(self.bob.id)
+        message = await sync_to_async(self.send)('local')
+        self.hub.publish(message, [self.alice.id, self.bob.id])
+        self.assertEqual(await self.received(queue), [message.id])
+        self.hub.tail_task.cancel()
+
+    async def test_only_participants_receive(self):
+        carol = await sync_to_async(make_user)('carol')
+        queue = await self.hub.subscribe(carol.id)
+        await sync_to_async(self.send)('private')
+        self.assertEqual(await self.received(queue), [])
+        self.hub.tail_task.cancel()
+
+
+@override_settings(CHAT_TAIL_INTERVAL=0.02, CHAT_SSE_MAX_DURATION=0.2)
+class MessageFallbackTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.conversation = make_conversation(self.alice, self.bob)
+        self.token = Token.objects.create(user=self.bob).key
+        self.base = f'/api/chat/conversations/{self.conversation.id}/messages'
+
+    def send(self, text, **fields):
+        return Message.objects.create(conversation=self.conversation, sender=self.alice, text=text, **fields)
+
+    def wait(self, token=None, **params):
+        params.setdefault('timeout', 0)
+        return self.client.get(f'{self.base}/wait/', {'token': token or self.token, **params})
+
+    def test_wait_returns_messages_past_the_starting_point(self):
+        first = self.send('one')
+        second = self.send('two')
+        response = self.wait(after=first.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([message['id'] for message in response.json()['messages']], [second.id])
+
+        again = self.wait(since=response.json()['watermark'])
+        self.assertEqual(again.json()['messages'], [])
+        third = self.send('three')
+        self.assertEqual([message['id'] for message in self.wait(since=again.json()['watermark']).json()['messages']], [third.id])
+
+    def test_wait_without_a_starting_point_only_sees_new_messages(self):
+        self.send('old')
+        response = self.wait()
+        self.assertEqual(response.json()['messages'], [])
+
+    def test_wait_picks_up_a_message_committed_out_of_id_order(self):
+        slow = self.send('slow')
+        slow_id, slow_at = slow.id, slow.timestamp
+        slow.delete()
+        fast = self.send('fast')
+        response = self.wait(after=fast.id - 1)
+        self.assertEqual([message['id'] for message in response.json()['messages']], [fast.id])
+
+        self.send('slow', id=slow_id)
+        Message.objects.filter(id=slow_id).update(timestamp=slow_at)
+        late = self.wait(since=response.json()['watermark'])
+        self.assertEqual([message['id'] for message in late.json()['messages']], [slow_id])
+        self.assertEqual(self.wait(since=late.json()['watermark']).json()['messages'], [])
+
+    def test_wait_access(self):
+        outsider = Token.objects.create(user=make_user('carol')).key
+        self.assertEqual(self.wait(token=outsider).status_code, 403)
+        self.assertEqual(self.client.get(f'{self.base}/wait/').status_code, 401)
+        self.assertEqual(self.wait(since='junk').status_code, 400)
+        self.assertEqual(self.wait(timeout='soon').status_code, 400)
+
+    def stream(self, **headers):
+        response = self.client.get(f'{self.base}/stream/', {'token': self.token, 'after': 0}, headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_stream_under_wsgi_is_a_sync_stream(self):
+        first = self.send('one')
+        second = self.send('two')
+        body = self.stream()
+        self.assertIn(f'"id": {first.id}', body)
+        self.assertIn(f'"id": {second.id}', body)
+        event_ids = [line[4:] for line in body.splitlines() if line.startswith('id: ')]
+        self.assertEqual(len(event_ids), 1)
+
+        third = self.send('three')
+        resumed = self.stream(**{'Last-Event-ID': event_ids[0]})
+        self.assertNotIn(f'"id": {second.id}', resumed)
+        self.assertIn(f'"id": {third.id}', resumed)
+
+    async def test_stream_under_asgi_is_an_async_stream(self):
+        message = await sync_to_async(self.send)('hello')
+        response = await AsyncClient().get(f'{self.base}/stream/', {'token': self.token, 'after': message.id - 1})
+        self.assertTrue(hasattr(response.streaming_content, '__aiter__'))
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f'"id": {message.id}', body)
+
+
+class MessageHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.conversation = make_conversation(self.alice, self.bob)
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, sender=self.alice, text=f'm{n}') for n in range(7)
+        ]
+        self.url = f'/api/chat/conversations/{self.conversation.id}/messages/'
+        self.api = api_client(self.bob)
+
+    def ids(self, **params):
+        response = self.api.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [message['id'] for message in response.data['results']], response.data['has_more']
+
+    def test_latest_window_then_pages_backwards(self):
+        ids = [message.id for message in self.messages]
+        self.assertEqual(self.ids(limit=3), (ids[4:], True))
+        self.assertEqual(self.ids(limit=3, before=ids[4]), (ids[1:4], True))
+        self.assertEqual(self.ids(limit=3, before=ids[1]), (ids[:1], False))
+
+    def test_pages_forwards_from_a_message(self):
+        ids = [message.id for message in self.messages]
+        self.assertEqual(self.ids(limit=4, after=ids[1]), (ids[2:6], True))
+        self.assertEqual(self.ids(limit=4, after=ids[5]), (ids[6:], False))
+
+    def test_equal_timestamps_are_ordered_by_id(self):
+        Message.objects.filter(conversation=self.conversation).update(timestamp=self.messages[0].timestamp)
+        ids = [message.id for message in self.messages]
+        self.assertEqual(self.ids(limit=2, before=ids[3]), (ids[1:3], True))
+        self.assertEqual(self.ids(limit=2, after=ids[3]), (ids[4:6], True))
+
+    def test_bad_windows(self):
+        other = make_conversation(make_user('carol'), make_user('dave'))
+        foreign = Message.objects.create(conversation=other, sender=other.participants.first(), text='x')
+        for params in [{'limit': 0}, {'limit': 'x'}, {'before': foreign.id}, {'after': 999999}]:
+            self.assertEqual(self.api.get(self.url, params).status_code, 400, params)
+        self.assertEqual(api_client(make_user('erin')).get(self.url).status_code, 403)
+
+    def test_cursor_pages_and_plain_list(self):
+        response = self.api.get(self.url, {'page_size': 4})
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(response.data['results'][0]['id'], self.messages[-1].id)
+        rest = self.api.get(response.data['next'])
+        self.assertEqual(len(rest.data['results']), 3)
+        self.assertEqual(len(self.api.get(self.url).data), 7)
+
+
+class StartConversationTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        Hire.objects.create(client=self.client_profile, lawyer=self.lawyer, status='accepted')
+
+    def start(self, user, other):
+        return api_client(user).post('/api/chat/start/', {'participant_id': other.id}, format='json')
+
+    def test_both_sides_land_on_one_conversation(self):
+        first = self.start(self.client_profile.user, self.lawyer.user)
+        self.assertEqual(first.data['message'], 'New conversation started')
+        again = self.start(self.client_profile.user, self.lawyer.user)
+        reverse = self.start(self.lawyer.user, self.client_profile.user)
+        self.assertEqual(again.data['message'], 'Conversation already exists')
+        self.assertEqual({first.data['conversation_id'], again.data['conversation_id'], reverse.data['conversation_id']},
+                         {first.data['conversation_id']})
+        conversation = Conversation.objects.get()
+        self.assertEqual(set(conversation.participants.values_list('id', flat=True)),
+                         {self.lawyer.user.id, self.client_profile.user.id})
+
+    def test_requires_an_accepted_hire(self):
+        stranger = make_lawyer(2)
+        self.assertEqual(self.start(self.client_profile.user, stranger.user).status_code, 403)
+        self.assertEqual(self.start(self.client_profile.user, make_client(2).user).status_code, 403)
+        self.assertEqual(api_client(self.client_profile.user).post('/api/chat/start/', {}, format='json').status_code, 400)
+        self.assertEqual(api_client(self.client_profile.user).post('/api/chat/start/', {'participant_id': 999999}, format='json').status_code, 404)
+
+
+class ConversationPairKeyMigrationTests(MigrationTestCase):
+    migrate_from = [('chat', '0002_message_history_index')]
+    migrate_to = [('chat', '0004_conversation_pair_unique')]
+
+    def test_duplicates_are_merged_into_the_oldest(self):
+        User = self.old_apps.get_model('users', 'User')
+        Conversation = self.old_apps.get_model('chat', 'Conversation')
+        Message = self.old_apps.get_model('chat', 'Message')
+        alice, bob, carol = (User.objects.create(email=f'{name}@example.com', role='general') for name in ('alice', 'bob', 'carol'))
+
+        conversations = []
+        for members in [(alice, bob), (bob, alice), (alice, carol), (alice, bob, carol)]:
+            conversation = Conversation.objects.create()
+            conversation.participants.set(members)
+            Message.objects.create(conversation=conversation, sender=members[0], text='hi')
+            conversations.append(conversation)
+
+        apps = self.migrate()
+        Conversation = apps.get_model('chat', 'Conversation')
+        Message = apps.get_model('chat', 'Message')
+        keeper, duplicate, other, group = conversations
+        self.assertFalse(Conversation.objects.filter(id=duplicate.id).exists())
+        self.assertEqual(Message.objects.filter(conversation_id=keeper.id).count(), 2)
+        self.assertEqual(
+            Conversation.objects.values_list('id', 'min_user_id', 'max_user_id').get(id=keeper.id),
+            (keeper.id, min(alice.id, bob.id), max(alice.id, bob.id)),
+        )
+        self.assertEqual(Conversation.objects.get(id=other.id).max_user_id, max(alice.id, carol.id))
+        self.assertIsNone(Conversation.objects.get(id=group.id).min_user_id)
+
+
+class MembershipCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.carol = make_user('carol')
+        self.conversation = make_conversation(self.alice, self.bob)
+
+    def test_answers_are_cached(self):
+        self.assertIsNone(check_access(self.conversation.id, self.alice.id))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(check_access(self.conversation.id, self.alice.id))
+        self.assertFalse([query for query in queries if 'chat_conversation' in query['sql']])
+        self.assertEqual(check_access(self.conversation.id, self.carol.id), ('Not authorized for this conversation', 403))
+        self.assertEqual(check_access(999999, self.carol.id), ('Conversation not found', 404))
+
+    def test_participant_changes_drop_the_cached_answer(self):
+        self.assertFalse(is_participant(self.conversation.id, self.carol.id))
+        self.conversation.participants.add(self.carol)
+        self.assertTrue(is_participant(self.conversation.id, self.carol.id))
+
+        self.conversation.participants.remove(self.carol)
+        self.assertFalse(is_participant(self.conversation.id, self.carol.id))
+
+        self.assertTrue(is_participant(self.conversation.id, self.bob.id))
+        self.bob.conversation_set.clear()
+        self.assertFalse(is_participant(self.conversation.id, self.bob.id))
+
+        self.assertTrue(is_participant(self.conversation.id, self.alice.id))
+        self.conversation.participants.clear()
+        self.assertFalse(is_participant(self.conversation.id, self.alice.id))
+
+    def test_removal_reaches_other_workers_and_beats_a_racing_read(self):
+        other_worker = caches.create_connection('default')
+        key = membership_key(self.conversation.id, self.bob.id)
+        self.assertTrue(is_participant(self.conversation.id, self.bob.id))
+        self.assertTrue(other_worker.get(key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.remove(self.bob)
+        self.assertFalse(other_worker.get(key))
+        # A request that read the membership before the removal committed
+        # can't put its stale answer back.
+        other_worker.add(key, True)
+        self.assertFalse(is_participant(self.conversation.id, self.bob.id))
+        self.assertEqual(check_access(self.conversation.id, self.bob.id), ('Not authorized for this conversation', 403))
+
+    def test_only_memberships_are_cached(self):
+        self.assertFalse(is_participant(self.conversation.id, self.carol.id))
+        self.assertIsNone(cache.get(membership_key(self.conversation.id, self.carol.id)))
+
+    def test_deleting_the_conversation_drops_the_cached_answer(self):
+        conversation_id = self.conversation.id
+        self.assertTrue(is_participant(conversation_id, self.alice.id))
+        self.conversation.delete()
+        self.assertFalse(is_participant(conversation_id, self.alice.id))
+
+    def test_views_share_the_check(self):
+        url = f'/api/chat/conversations/{self.conversation.id}/'
+        self.assertEqual(api_client(self.carol).get(url + 'messages/').status_code, 403)
+        self.assertEqual(api_client(self.carol).post(url + 'send/', {'text': 'hi'}, format='json').status_code, 403)
+        self.assertEqual(api_client(self.alice).post(url + 'send/', {'text': 'hi'}, format='json').status_code, 200)
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        self.other_client = make_client(2)
+        for client in (self.client_profile, self.other_client):
+            Hire.objects.create(client=client, lawyer=self.lawyer, status='accepted')
+        self.conversation = make_conversation(self.lawyer.user, self.client_profile.user)
+
+    def send(self, user, text):
+        response = api_client(user).post(f'/api/chat/conversations/{self.conversation.id}/send/', {'text': text}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['id']
+
+    def mark_read(self, user, **data):
+        return api_client(user).post(f'/api/chat/conversations/{self.conversation.id}/read/', data, format='json')
+
+    def unread(self, user):
+        return with_unread_counts(Conversation.objects.filter(id=self.conversation.id), user).get().unread_count
+
+    def test_sending_moves_the_last_message_and_the_sender_cursor(self):
+        first = self.send(self.client_profile.user, 'hello')
+        second = self.send(self.lawyer.user, 'hi')
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, second)
+        self.assertEqual(self.conversation.last_message_at, Message.objects.get(id=second).timestamp)
+        self.assertEqual(ReadCursor.objects.get(user=self.lawyer.user).last_read_message_id, second)
+        self.assertEqual(ReadCursor.objects.get(user=self.client_profile.user).last_read_message_id, first)
+
+        # An older message recorded late doesn't move it back.
+        record_message(Message.objects.get(id=first))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, second)
+
+    def test_unread_counts_only_others_messages_past_the_cursor(self):
+        first = self.send(self.client_profile.user, 'one')
+        self.send(self.client_profile.user, 'two')
+        self.send(self.lawyer.user, 'reply')
+        self.assertEqual(self.unread(self.lawyer.user), 0)
+        self.assertEqual(self.unread(self.client_profile.user), 1)
+
+        self.send(self.client_profile.user, 'three')
+        self.assertEqual(self.unread(self.lawyer.user), 1)
+        mark_read(self.conversation.id, self.lawyer.user.id, first)
+        self.assertEqual(self.unread(self.lawyer.user), 1)
+
+    def test_mark_read(self):
+        first = self.send(self.client_profile.user, 'one')
+        last = self.send(self.client_profile.user, 'two')
+
+        response = self.mark_read(self.lawyer.user, message_id=first)
+        self.assertEqual(response.data['last_read_message_id'], first)
+        self.assertEqual(self.unread(self.lawyer.user), 1)
+        # Past the newest message is clamped to it; backwards is ignored.
+        self.assertEqual(self.mark_read(self.lawyer.user, message_id=last + 100).data['last_read_message_id'], last)
+        self.assertEqual(self.mark_read(self.lawyer.user, message_id=first).data['last_read_message_id'], last)
+        self.assertEqual(self.unread(self.lawyer.user), 0)
+
+        self.assertEqual(self.mark_read(self.lawyer.user, message_id='x').status_code, 400)
+        self.assertEqual(self.mark_read(self.other_client.user).status_code, 403)
+
+    def test_mark_read_without_a_message_reads_everything(self):
+        self.send(self.client_profile.user, 'one')
+        last = self.send(self.client_profile.user, 'two')
+        self.assertEqual(self.mark_read(self.lawyer.user).data['last_read_message_id'], last)
+        self.assertEqual(self.unread(self.lawyer.user), 0)
+
+    def test_contacts_carry_previews_and_unread_counts(self):
+        self.send(self.client_profile.user, 'x' * 150)
+        last = self.send(self.client_profile.user, 'are you there?')
+
+        lawyer = api_client(self.lawyer.user)
+        response, queries = count_queries(lambda: lawyer.get('/api/chat/contacts/'))
+        self.assertEqual(queries, 2)
+        contacts = {contact['user_id']: contact for contact in response.data}
+        talking = contacts[self.client_profile.user.id]
+        self.assertEqual(talking['conversation_id'], self.conversation.id)
+        self.assertEqual(talking['unread_count'], 2)
+        self.assertEqual(talking['last_message']['id'], last)
+        self.assertEqual(talking['last_message']['preview'], 'are you there?')
+        untouched = contacts[self.other_client.user.id]
+        self.assertEqual((untouched['conversation_id'], untouched['last_message'], untouched['unread_count']), (None, None, 0))
+
+        response = api_client(self.client_profile.user).get('/api/chat/contacts/')
+        self.assertEqual(response.data[0]['user_id'], self.lawyer.user.id)
+        self.assertEqual(response.data[0]['unread_count'], 0)
+
+    def test_preview_is_truncated(self):
+        self.send(self.client_profile.user, 'x' * 150)
+        response = api_client(self.lawyer.user).get('/api/chat/contacts/')
+        contact = next(contact for contact in response.data if contact['conversation_id'])
+        self.assertEqual(contact['last_message']['preview'], 'x' * PREVIEW_LENGTH)
+
+
+class InboxBackfillMigrationTests(MigrationTestCase):
+    migrate_from = [('chat', '0004_conversation_pair_unique')]
+    migrate_to = [('chat', '0005_conversation_inbox')]
+
+    def test_conversations_point_at_their_newest_message_and_start_read(self):
+        User = self.old_apps.get_model('users', 'User')
+        Conversation = self.old_apps.get_model('chat', 'Conversation')
+        Message = self.old_apps.get_model('chat', 'Message')
+        alice, bob, carol = (User.objects.create(email=f'{name}@example.com', role='general') for name in ('alice', 'bob', 'carol'))
+
+        busy = Conversation.objects.create(min_user=alice, max_user=bob)
+        busy.participants.set([alice, bob])
+        Message.objects.create(conversation=busy, sender=alice, text='one')
+        newest = Message.objects.create(conversation=busy, sender=bob, text='two')
+        quiet = Conversation.objects.create(min_user=alice, max_user=carol)
+        quiet.participants.set([alice, carol])
+
+        apps = self.migrate()
+        Conversation = apps.get_model('chat', 'Conversation')
+        ReadCursor = apps.get_model('chat', 'ReadCursor')
+        busy = Conversation.objects.get(id=busy.id)
+        self.assertEqual(busy.last_message_id, newest.id)
+        self.assertEqual(busy.last_message_at, newest.timestamp)
+        self.assertIsNone(Conversation.objects.get(id=quiet.id).last_message_id)
+        self.assertEqual(
+            set(ReadCursor.objects.values_list('conversation_id', 'user_id', 'last_read_message_id')),
+            {(busy.id, alice.id, newest.id), (busy.id, bob.id, newest.id)},
+        )
+
+
+class ConversationChangesTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.carol = make_user('carol')
+        self.with_bob = make_conversation(self.alice, self.bob)
+        self.with_carol = make_conversation(self.alice, self.carol)
+        self.poller = api_client(self.alice)
+
+    def send(self, conversation, sender, text, **fields):
+        message = Message.objects.create(conversation=conversation, sender=sender, text=text, **fields)
+        record_message(message)
+        return message
+
+    def poll(self, since):
+        response = self.poller.get('/api/chat/conversations/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def changes(self, data):
+        return {change['conversation_id']: [message['id'] for message in change['messages']] for change in data['conversations']}
+
+    def test_nothing_new_comes_back_empty(self):
+        self.send(self.with_bob, self.bob, 'before')
+        start = self.poller.get('/api/chat/conversations/changes/').data
+        self.assertEqual(start['conversations'], [])
+
+        first = self.poll(start['watermark'])
+        self.assertEqual(first['conversations'], [])
+        self.assertEqual(self.poll(first['watermark'])['conversations'], [])
+
+    def test_new_messages_come_back_once(self):
+        watermark = self.poller.get('/api/chat/conversations/changes/').data['watermark']
+        hello = self.send(self.with_bob, self.bob, 'hello')
+        hi = self.send(self.with_carol, self.carol, 'hi')
+
+        data = self.poll(watermark)
+        self.assertEqual(self.changes(data), {self.with_bob.id: [hello.id], self.with_carol.id: [hi.id]})
+        self.assertEqual([change['conversation_id'] for change in data['conversations']], [self.with_bob.id, self.with_carol.id])
+        self.assertEqual(data['conversations'][0]['unread_count'], 1)
+        self.assertFalse(data['has_more'])
+
+        again = self.poll(data['watermark'])
+        self.assertEqual(again['conversations'], [])
+        reply = self.send(self.with_bob, self.alice, 'reply')
+        self.assertEqual(self.changes(self.poll(again['watermark'])), {self.with_bob.id: [reply.id]})
+
+    def test_picks_up_a_message_committed_out_of_id_order(self):
+        watermark = self.poller.get('/api/chat/conversations/changes/').data['watermark']
+        slow = self.send(self.with_bob, self.bob, 'slow')
+        slow_id, slow_at = slow.id, slow.timestamp
+        slow.delete()
+        fast = self.send(self.with_carol, self.carol, 'fast')
+        data = self.poll(watermark)
+        self.assertEqual(self.changes(data), {self.with_carol.id: [fast.id]})
+
+        self.send(self.with_bob, self.bob, 'slow', id=slow_id)
+        Message.objects.filter(id=slow_id).update(timestamp=slow_at)
+        late = self.poll(data['watermark'])
+        self.assertEqual(self.changes(late), {self.with_bob.id: [slow_id]})
+        self.assertEqual(self.poll(late['watermark'])['conversations'], [])
+
+    def test_long_backlogs_are_paged(self):
+        watermark = self.poller.get('/api/chat/conversations/changes/').data['watermark']
+        sent = [self.send(self.with_bob, self.bob, str(n)).id for n in range(3)]
+        with mock.patch('chat.views.CHANGES_READ_LIMIT', 2):
+            first = self.poll(watermark)
+            self.assertTrue(first['has_more'])
+            self.assertEqual(self.changes(first), {self.with_bob.id: sent[:2]})
+            rest = self.poll(first['watermark'])
+        self.assertFalse(rest['has_more'])
+        self.assertEqual(self.changes(rest), {self.with_bob.id: sent[2:]})
+
+        with mock.patch('chat.views.CHANGES_MESSAGE_LIMIT', 1):
+            more = [self.send(self.with_bob, self.bob, str(n)).id for n in range(2)]
+            data = self.poll(rest['watermark'])
+        self.assertEqual(self.changes(data), {self.with_bob.id: more[1:]})
+        self.assertTrue(data['conversations'][0]['has_more'])
+
+    def test_changed_conversations_are_picked_by_last_message_at(self):
+        watermark = self.poller.get('/api/chat/conversations/changes/').data['watermark']
+        hello = self.send(self.with_bob, self.bob, 'hello')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.poll(watermark)
+        self.assertEqual(self.changes(data), {self.with_bob.id: [hello.id]})
+        read = next(query['sql'] for query in queries if 'FROM "chat_message"' in query['sql'])
+        self.assertIn('"last_message_at" >', read)
+
+        # A message the conversation row doesn't reflect (written around
+        # record_message) isn't looked for.
+        Message.objects.create(conversation=self.with_carol, sender=self.carol, text='unrecorded')
+        self.assertEqual(self.poll(data['watermark'])['conversations'], [])
+
+    def test_only_the_users_conversations(self):
+        watermark = self.poller.get('/api/chat/conversations/changes/').data['watermark']
+        self.send(make_conversation(self.bob, self.carol), self.bob, 'private')
+        self.assertEqual(self.poll(watermark)['conversations'], [])
+
+    def test_since_must_be_a_watermark(self):
+        for since in ['2026-01-01T00:00:00Z', '12', 'not-a-watermark']:
+            response = self.poller.get('/api/chat/conversations/changes/', {'since': since})
+            self.assertEqual(response.status_code, 400, since)
@@ -3,8 +3,12 @@ from . import views
 
 urlpatterns = [
     path('start/', views.StartConversationView.as_view(), name='start-conversation'),
+    path('conversations/changes/', views.ConversationChangesView.as_view(), name='conversation-changes'),
     path('conversations/<int:conversation_id>/messages/', views.MessageListView.as_view(), name='message-list'),
+    path('conversations/<int:conversation_id>/messages/wait/', views.MessageWaitView.as_view(), name='message-wait'),
+    path('conversations/<int:conversation_id>/messages/stream/', views.MessageStreamView.as_view(), name='message-stream'),
     path('conversations/<int:conversation_id>/send/', views.SendMessageView.as_view(), name='send-message'),
+    path('conversations/<int:conversation_id>/read/', views.MarkReadView.as_view(), name='mark-read'),
     path('contacts/', views.ChatContactListView.as_view(), name='chat-contacts'),
     
     # path('conversations/<int:conversation_id>/legal-bot/', views.LegalBotView.as_view(), name='legal-bot'),
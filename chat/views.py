@@ -8,36 +8,109 @@ from clients.models import GeneralUserProfile
 from lawyers.models import LawyerProfile
 from hire.models import Hire
 from .serializers import MessageSerializer
+from .realtime import hub, publish_message, token_from, token_user
+from .membership import check_access
+from .inbox import changes_since, changes_watermark, conversations_with, mark_read, record_message, summary
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from asgiref.sync import sync_to_async
 from django.utils.dateparse import parse_datetime
+from backend.pagination import paginate
+from backend.streaming import served_over_asgi
+from backend.watermarks import decode_watermark, read_since, watermark_now
 # from utils.rag_model import get_legal_answer
 
 from dotenv import load_dotenv
+from datetime import timedelta
+import asyncio
+import json
 import os
+import time
 
 load_dotenv()
 debug = os.getenv("DEBUG", "False")
 
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_MAX_PAGE_SIZE = 200
+CHANGES_READ_LIMIT = 200
+CHANGES_MESSAGE_LIMIT = 20
+# Messages can commit out of timestamp order by up to this much.
+MESSAGE_OVERLAP = timedelta(seconds=5)
+
 class MessageListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, conversation_id):
-        try:
-            conversation = Conversation.objects.get(id=conversation_id)
-        except Conversation.DoesNotExist:
-            return Response({'error': 'Conversation not found'}, status=404)
-
-        if request.user not in conversation.participants.all():
-            return Response({'error': 'Not authorized for this conversation'}, status=403)
+        denied = check_access(conversation_id, request.user.id)
+        if denied:
+            error, code = denied
+            return Response({'error': error}, status=code)
 
         since = request.query_params.get('since')
-        messages = conversation.messages.all()
+        messages = Message.objects.filter(conversation_id=conversation_id)
         if since:
             messages = messages.filter(timestamp__gt=parse_datetime(since))
 
+        params = request.query_params
+        if 'before' in params or 'after' in params or 'limit' in params:
+            return self.get_window(request, conversation_id, messages)
+
+        messages, paginator = paginate(request, messages.select_related('sender'), '-timestamp', view=self)
+
         serialized = MessageSerializer(messages, many=True)
+        if paginator is not None:
+            return paginator.get_paginated_response(serialized.data)
         return Response(serialized.data)
 
 
+    def get_window(self, request, conversation_id, messages):
+        """
+        ?before=<message id> pages history backwards, ?after=<message id>
+        fetches what is new, and ?limit alone returns the latest messages.
+        Rows come back oldest first, with has_more saying whether the window
+        was cut at limit. Every case is a range scan on
+        (conversation, timestamp, id).
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', MESSAGE_PAGE_SIZE)), MESSAGE_MAX_PAGE_SIZE)
+            before = request.query_params.get('before')
+            after = request.query_params.get('after')
+            before = int(before) if before else None
+            after = int(after) if after else None
+        except ValueError:
+            return Response({'error': 'before, after and limit must be integers'}, status=400)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=400)
+
+        anchors = {
+            anchor.id: anchor.timestamp
+            for anchor in Message.objects.filter(conversation_id=conversation_id, id__in=[i for i in (before, after) if i])
+        }
+        if before is not None:
+            if before not in anchors:
+                return Response({'error': 'before must be a message in this conversation'}, status=400)
+            messages = messages.filter(Q(timestamp__lt=anchors[before]) | Q(timestamp=anchors[before], id__lt=before))
+        if after is not None:
+            if after not in anchors:
+                return Response({'error': 'after must be a message in this conversation'}, status=400)
+            messages = messages.filter(Q(timestamp__gt=anchors[after]) | Q(timestamp=anchors[after], id__gt=after))
+
+        # Paging forwards reads up from the cursor; otherwise read down from
+        # the newest end and flip the page back into chronological order.
+        if after is not None and before is None:
+            rows = list(messages.select_related('sender').order_by('timestamp', 'id')[:limit + 1])
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+        else:
+            rows = list(messages.select_related('sender').order_by('-timestamp', '-id')[:limit + 1])
+            has_more = len(rows) > limit
+            rows = rows[:limit][::-1]
+
+        return Response({'results': MessageSerializer(rows, many=True).data, 'has_more': has_more})
+
 class SendMessageView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -46,20 +119,262 @@ class SendMessageView(APIView):
         if not text:
             return Response({"error": "Message text required"}, status=400)
 
+        denied = check_access(conversation_id, request.user.id)
+        if denied:
+            error, code = denied
+            return Response({"error": error}, status=code)
+
+        with transaction.atomic():
+            message = Message.objects.create(
+                conversation_id=conversation_id,
+                sender=request.user,
+                text=text
+            )
+            record_message(message)
+        transaction.on_commit(lambda: publish_message(message))
+        return Response(MessageSerializer(message).data)
+
+
+class MarkReadView(APIView):
+    """
+    Mark the conversation read up to message_id, or entirely if it is
+    omitted. The cursor only moves forward.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, conversation_id):
+        denied = check_access(conversation_id, request.user.id)
+        if denied:
+            error, code = denied
+            return Response({"error": error}, status=code)
+
+        last_message_id = Conversation.objects.filter(id=conversation_id).values_list('last_message_id', flat=True).first() or 0
+        message_id = request.data.get('message_id')
+        if message_id in (None, ''):
+            message_id = last_message_id
+        else:
+            try:
+                message_id = min(int(message_id), last_message_id)
+            except (TypeError, ValueError):
+                return Response({"error": "message_id must be an integer"}, status=400)
+
+        cursor = mark_read(conversation_id, request.user.id, message_id)
+        return Response({"conversation_id": conversation_id, "last_read_message_id": cursor.last_read_message_id})
+
+
+@sync_to_async
+def conversation_access(conversation_id, user_id):
+    """None if the user may read the conversation, else an error JsonResponse."""
+    try:
+        denied = check_access(conversation_id, user_id)
+        if denied:
+            error, code = denied
+            return JsonResponse({'error': error}, status=code)
+        return None
+    finally:
+        close_old_connections()
+
+
+def read_messages(conversation_id, since, seen, limit=100):
+    """(serialized messages, watermark) for the messages past a watermark position."""
+    try:
+        messages, _, watermark = read_since(
+            Message.objects.filter(conversation_id=conversation_id).select_related('sender'),
+            'timestamp', since, seen, limit, MESSAGE_OVERLAP,
+        )
+        return MessageSerializer(messages, many=True).data, watermark
+    finally:
+        close_old_connections()
+
+
+messages_since = sync_to_async(read_messages)
+
+
+@sync_to_async
+def start_position(conversation_id, watermark, after):
+    """
+    (since, seen) to read the conversation from: a watermark from an earlier
+    response, else just past the message id after, else from now. Raises
+    ValueError for a watermark this server didn't issue.
+    """
+    try:
+        if watermark:
+            return decode_watermark(watermark)
+        messages = Message.objects.filter(conversation_id=conversation_id)
+        if after is None:
+            return decode_watermark(watermark_now(messages, 'timestamp', MESSAGE_OVERLAP))
+        anchor = messages.filter(id__lte=after).order_by('-id').values_list('timestamp', flat=True).first()
+        if anchor is None:
+            # Nothing at or before after: read from the start of the conversation.
+            return Conversation.objects.get(id=conversation_id).created_at - MESSAGE_OVERLAP, set()
+        seen = messages.filter(timestamp__gt=anchor - MESSAGE_OVERLAP, id__lte=after).values_list('id', flat=True)
+        return anchor, set(seen)
+    finally:
+        close_old_connections()
+
+
+async def authorize_stream(request, conversation_id):
+    """(user, None) for a participant, else (None, error response)."""
+    user = await token_user(token_from(request.GET.get('token'), request.headers.get('Authorization')))
+    if user is None:
+        return None, JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    error = await conversation_access(conversation_id, user.id)
+    return (None, error) if error else (user, None)
+
+
+def parse_message_id(value):
+    try:
+        return max(int(value), 0) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def message_events(messages, watermark):
+    # Only a batch's last event carries an id, so a client cut off mid-batch
+    # resumes from the previous batch and gets the rest of this one again.
+    for n, message in enumerate(messages, 1):
+        event_id = f"id: {watermark}\n" if n == len(messages) else ''
+        yield f"{event_id}event: message\ndata: {json.dumps(message)}\n\n"
+
+
+class MessageWaitView(View):
+    """
+    Long-poll variant of MessageListView for clients that can't keep a
+    WebSocket open. Returns {"messages", "watermark"} as soon as there are
+    messages past ?since=<watermark> (or past ?after=<message id>), or with
+    no messages once ?timeout seconds pass; send the watermark back as
+    ?since next time. With neither it waits for the next new message.
+    Async, so under ASGI a held request doesn't tie up a worker.
+    """
+
+    async def get(self, request, conversation_id):
+        user, error = await authorize_stream(request, conversation_id)
+        if error:
+            return error
+
+        try:
+            since, seen = await start_position(conversation_id, request.GET.get('since'), parse_message_id(request.GET.get('after')))
+        except ValueError:
+            return JsonResponse({'error': 'since must be a watermark returned by this endpoint.'}, status=400)
         try:
-            conversation = Conversation.objects.get(id=conversation_id)
-        except Conversation.DoesNotExist:
-            return Response({"error": "Conversation not found"}, status=404)
+            timeout = min(max(float(request.GET.get('timeout', settings.CHAT_LONG_POLL_TIMEOUT)), 0), settings.CHAT_LONG_POLL_TIMEOUT)
+        except ValueError:
+            return JsonResponse({'error': 'timeout must be a number of seconds.'}, status=400)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Subscribe before reading so a message committed in between isn't missed.
+        async with hub.listen(user.id) as queue:
+            while True:
+                messages, watermark = await messages_since(conversation_id, since, seen)
+                remaining = deadline - loop.time()
+                if messages or remaining <= 0:
+                    break
+                since, seen = decode_watermark(watermark)
+                await hub.wait(queue, conversation_id, remaining)
+
+        return JsonResponse({'messages': messages, 'watermark': watermark})
+
+
+class MessageStreamView(View):
+    """
+    Server-Sent Events feed of new messages in a conversation. Event ids are
+    watermarks, so EventSource resumes from Last-Event-ID on reconnect;
+    ?since=<watermark> or ?after=<message id> set the starting point. The
+    stream ends after CHAT_SSE_MAX_DURATION so proxies can recycle it; the
+    browser reconnects on its own.
+
+    Under ASGI the stream waits on the worker's hub. Under WSGI it polls the
+    database every CHAT_TAIL_INTERVAL and holds its worker thread while open.
+    """
+
+    async def get(self, request, conversation_id):
+        user, error = await authorize_stream(request, conversation_id)
+        if error:
+            return error
 
-        if request.user not in conversation.participants.all():
-            return Response({'error': 'Not authorized for this conversation'}, status=403)
+        try:
+            since, seen = await start_position(
+                conversation_id,
+                request.headers.get('Last-Event-ID') or request.GET.get('since'),
+                parse_message_id(request.GET.get('after')),
+            )
+        except ValueError:
+            return JsonResponse({'error': 'since must be a watermark returned by this endpoint.'}, status=400)
+
+        async def events():
+            nonlocal since, seen
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.CHAT_SSE_MAX_DURATION
+            yield 'retry: 2000\n\n'
+            last_sent = loop.time()
+            async with hub.listen(user.id) as queue:
+                while loop.time() < deadline:
+                    messages, watermark = await messages_since(conversation_id, since, seen)
+                    since, seen = decode_watermark(watermark)
+                    for event in message_events(messages, watermark):
+                        last_sent = loop.time()
+                        yield event
+                    if loop.time() - last_sent >= settings.CHAT_SSE_HEARTBEAT:
+                        last_sent = loop.time()
+                        yield ': keep-alive\n\n'
+                    await hub.wait(queue, conversation_id, min(settings.CHAT_SSE_HEARTBEAT, deadline - loop.time()))
+
+        def polled_events():
+            # WSGI streams only sync iterators (see backend.streaming).
+            position = since, seen
+            deadline = time.monotonic() + settings.CHAT_SSE_MAX_DURATION
+            yield 'retry: 2000\n\n'
+            last_sent = time.monotonic()
+            while time.monotonic() < deadline:
+                messages, watermark = read_messages(conversation_id, *position)
+                position = decode_watermark(watermark)
+                for event in message_events(messages, watermark):
+                    last_sent = time.monotonic()
+                    yield event
+                if time.monotonic() - last_sent >= settings.CHAT_SSE_HEARTBEAT:
+                    last_sent = time.monotonic()
+                    yield ': keep-alive\n\n'
+                time.sleep(settings.CHAT_TAIL_INTERVAL)
+
+        content = events() if served_over_asgi(request) else polled_events()
+        response = StreamingHttpResponse(content, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ConversationChangesView(APIView):
+    """
+    One poll for every conversation: ?since=<watermark> returns the user's
+    conversations with messages past it, each with its inbox summary and up
+    to CHANGES_MESSAGE_LIMIT of the newest of them (has_more means fetch the
+    rest from the message list). Pass the returned watermark next time; a
+    top-level has_more means poll again straight away. Without ?since only
+    the current watermark comes back.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if not since:
+            return Response({"watermark": changes_watermark(request.user, MESSAGE_OVERLAP), "conversations": [], "has_more": False})
+        try:
+            since, seen = decode_watermark(since)
+        except ValueError:
+            return Response({"error": "since must be a watermark returned by this endpoint."}, status=400)
 
-        message = Message.objects.create(
-            conversation=conversation,
-            sender=request.user,
-            text=text
+        conversations, has_more, watermark = changes_since(
+            request.user, since, seen, CHANGES_READ_LIMIT, CHANGES_MESSAGE_LIMIT, MESSAGE_OVERLAP,
         )
-        return Response(MessageSerializer(message).data)
+        changes = []
+        for conversation, rows, more in conversations:
+            changes.append({
+                **summary(conversation),
+                "messages": MessageSerializer(rows, many=True).data,
+                "has_more": more,
+            })
+        return Response({"watermark": watermark, "conversations": changes, "has_more": has_more})
 
 
 class StartConversationView(APIView):
@@ -80,13 +395,15 @@ class StartConversationView(APIView):
         if not is_valid_hire_pair(user1, user2):
             return Response({"error": "No valid hire relationship found."}, status=403)
 
-        existing_convos = Conversation.objects.filter(participants=user1).filter(participants=user2)
-        for convo in existing_convos:
-            if convo.participants.count() == 2:
-                return Response({"conversation_id": convo.id, "message": "Conversation already exists"})
+        # The unique pair key makes concurrent starts converge on one row; the
+        # participants are added in the same transaction as the create.
+        with transaction.atomic():
+            conversation, created = Conversation.objects.get_or_create(**Conversation.pair_key(user1.id, user2.id))
+            if created:
+                conversation.participants.add(user1, user2)
 
-        conversation = Conversation.objects.create()
-        conversation.participants.add(user1, user2)
+        if not created:
+            return Response({"conversation_id": conversation.id, "message": "Conversation already exists"})
         return Response({"conversation_id": conversation.id, "message": "New conversation started"})
 
 
@@ -106,6 +423,11 @@ def is_valid_hire_pair(user1, user2):
     return Hire.objects.filter(client=client, lawyer=lawyer, status='accepted').exists()
 
 class ChatContactListView(APIView):
+    """
+    Everyone the user can chat with, each with their conversation id, a
+    preview of the last message and the unread count. Two queries however
+    many contacts there are.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -113,35 +435,30 @@ class ChatContactListView(APIView):
         contacts = []
 
         if user.role == 'lawyer':
-            try:
-                lawyer_profile = LawyerProfile.objects.get(user=user)
-                hires = Hire.objects.filter(lawyer=lawyer_profile, status='accepted')
-                for hire in hires:
-                    client_user = hire.client.user
-                    contacts.append({
-                        "user_id": client_user.id,
-                        "full_name": hire.client.full_name,
-                        "email": client_user.email,
-                        "role": "client"
-                    })
-            except LawyerProfile.DoesNotExist:
-                pass
+            hires = Hire.objects.filter(lawyer__user=user, status='accepted').select_related('client__user')
+            for hire in hires:
+                client_user = hire.client.user
+                contacts.append({
+                    "user_id": client_user.id,
+                    "full_name": hire.client.full_name,
+                    "email": client_user.email,
+                    "role": "client"
+                })
 
         elif user.role == 'general':
-            try:
-                client_profile = GeneralUserProfile.objects.get(user=user)
-                hires = Hire.objects.filter(client=client_profile, status='accepted')
-                for hire in hires:
-                    lawyer_user = hire.lawyer.user
-                    contacts.append({
-                        "user_id": lawyer_user.id,
-                        "full_name": hire.lawyer.full_name,
-                        "email": lawyer_user.email,
-                        "role": "lawyer"
-                    })
-            except GeneralUserProfile.DoesNotExist:
-                pass
-
+            hires = Hire.objects.filter(client__user=user, status='accepted').select_related('lawyer__user')
+            for hire in hires:
+                lawyer_user = hire.lawyer.user
+                contacts.append({
+                    "user_id": lawyer_user.id,
+                    "full_name": hire.lawyer.full_name,
+                    "email": lawyer_user.email,
+                    "role": "lawyer"
+                })
+
+        conversations = conversations_with(user, {contact["user_id"] for contact in contacts})
+        for contact in contacts:
+            contact.update(summary(conversations.get(contact["user_id"])))
         return Response(contacts)
     
 # class LegalBotInitConversationView(APIView):
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from lawyers.stats import bump
+from .models import Hire
+
+
+def _has_other_accepted_hire(hire):
+    return Hire.objects.filter(
+        lawyer_id=hire.lawyer_id, client_id=hire.client_id, status='accepted'
+    ).exclude(pk=hire.pk).exists()
+
+
+def _hire_deltas(hire, status, sign=1):
+    deltas = {'pending_hires': sign if status == 'pending' else 0}
+    # clients_served counts distinct clients, so only the first accepted hire
+    # for a client adds to it and only the last one leaving removes it.
+    if status == 'accepted' and not _has_other_accepted_hire(hire):
+        deltas['clients_served'] = sign
+    return deltas
+
+
+@receiver(post_init, sender=Hire)
+def remember_hire_state(sender, instance, **kwargs):
+    instance._stats_state = (instance.lawyer_id, instance.client_id, instance.status)
+
+
+@receiver(post_save, sender=Hire)
+def update_stats_on_hire_save(sender, instance, created, **kwargs):
+    old_lawyer_id, old_client_id, old_status = instance._stats_state
+    new_state = (instance.lawyer_id, instance.client_id, instance.status)
+
+    if created:
+        bump(instance.lawyer_id, **_hire_deltas(instance, instance.status))
+    elif new_state != instance._stats_state:
+        old = Hire(pk=instance.pk, lawyer_id=old_lawyer_id, client_id=old_client_id, status=old_status)
+        bump(old_lawyer_id, **_hire_deltas(old, old_status, sign=-1))
+        bump(instance.lawyer_id, **_hire_deltas(instance, instance.status))
+
+    instance._stats_state = new_state
+
+
+@receiver(post_delete, sender=Hire)
+def update_stats_on_hire_delete(sender, instance, **kwargs):
+    bump(instance.lawyer_id, rebuild_missing=False, **_hire_deltas(instance, instance.status, sign=-1))
@@ -1,3 +1,34 @@
 from django.test import TestCase
+from lawyers.models import LawyerStats
+from lawyers.tests import make_client, make_lawyer
+from .models import Hire
 
-# Create your tests here.
+
+class HireStatsTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+
+    def stats(self):
+        return LawyerStats.objects.get(lawyer=self.lawyer)
+
+    def test_pending_then_accepted(self):
+        hire = Hire.objects.create(client=self.client_profile, lawyer=self.lawyer)
+        self.assertEqual((self.stats().pending_hires, self.stats().clients_served), (1, 0))
+
+        hire.status = 'accepted'
+        hire.save()
+        self.assertEqual((self.stats().pending_hires, self.stats().clients_served), (0, 1))
+        self.lawyer.refresh_from_db()
+        self.assertEqual(self.lawyer.clients_served, 1)
+
+    def test_clients_are_counted_once(self):
+        first = Hire.objects.create(client=self.client_profile, lawyer=self.lawyer, status='accepted')
+        second = Hire.objects.create(client=self.client_profile, lawyer=self.lawyer, status='accepted')
+        self.assertEqual(self.stats().clients_served, 1)
+
+        first.delete()
+        self.assertEqual(self.stats().clients_served, 1)
+        second.status = 'completed'
+        second.save()
+        self.assertEqual(self.stats().clients_served, 0)
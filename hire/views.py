@@ -7,6 +7,7 @@ from .models import Hire
 from lawyers.models import LawyerProfile
 from clients.models import GeneralUserProfile
 from .serializers import HireLawyerSerializer
+from backend.pagination import paginate
 
 from dotenv import load_dotenv
 import os
@@ -87,5 +88,8 @@ class ClientHireRequestsView(APIView):
             return Response({"error": "Client profile not found."}, status=400)
 
         hire_requests = Hire.objects.filter(client=client_profile).order_by('-hired_at')
+        hire_requests, paginator = paginate(request, hire_requests, '-hired_at', view=self)
         serializer = HireLawyerSerializer(hire_requests, many=True)
+        if paginator is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import LawyerProfile, LegalCase, LawyerDocuments, CaseDocument
+from .models import LawyerProfile, LegalCase, LawyerDocuments, CaseDocument, LawyerStats, CaseEvent, MediaBlob
 
 admin.site.register(LawyerProfile)
 admin.site.register(LawyerDocuments)
+admin.site.register(LawyerStats)
 admin.site.register(LegalCase)
-admin.site.register(CaseDocument)
\ No newline at end of file
+admin.site.register(CaseDocument)
+admin.site.register(CaseEvent)
+admin.site.register(MediaBlob)
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LawyersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lawyers'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,116 @@
+from datetime import datetime
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from backend.pagination import paginate
+from .facets import parse_choices
+from .models import CaseEvent, LegalCase
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date format for {name}. Use YYYY-MM-DD format.")
+
+
+def filter_cases(cases, params):
+    if params.get('status'):
+        cases = cases.filter(status__in=parse_choices(params['status'], LegalCase.STATUS_CHOICES, 'status'))
+    if params.get('priority'):
+        cases = cases.filter(priority__in=parse_choices(params['priority'], LegalCase.PRIORITY_CHOICES, 'priority'))
+    if params.get('hearing_from'):
+        cases = cases.filter(next_hearing__gte=_parse_date(params['hearing_from'], 'hearing_from'))
+    if params.get('hearing_to'):
+        cases = cases.filter(next_hearing__lte=_parse_date(params['hearing_to'], 'hearing_to'))
+    return cases
+
+
+def apply_case_update(legal_case, data):
+    # Validates the editable fields in data and sets them on legal_case without
+    # saving. Returns the updated field names; raises ValueError on bad input.
+    updated_fields = []
+
+    if 'status' in data:
+        valid_statuses = [choice[0] for choice in LegalCase.STATUS_CHOICES]
+        if data['status'] not in valid_statuses:
+            raise ValueError(f"Invalid status. Valid options are: {', '.join(valid_statuses)}")
+        legal_case.status = data['status']
+        updated_fields.append('status')
+
+    if 'next_hearing' in data:
+        try:
+            legal_case.next_hearing = datetime.strptime(data['next_hearing'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise ValueError("Invalid date format for next_hearing. Use YYYY-MM-DD format.")
+        updated_fields.append('next_hearing')
+
+    if 'priority' in data:
+        valid_priorities = [choice[0] for choice in LegalCase.PRIORITY_CHOICES]
+        if data['priority'] not in valid_priorities:
+            raise ValueError(f"Invalid priority. Valid options are: {', '.join(valid_priorities)}")
+        legal_case.priority = data['priority']
+        updated_fields.append('priority')
+
+    if not updated_fields:
+        raise ValueError("No valid fields provided for update. Supported fields: status, next_hearing, priority")
+
+    return updated_fields
+
+
+def record_case_events(cases, kind):
+    CaseEvent.objects.bulk_create([
+        CaseEvent(case_id=case.pk, lawyer_id=case.lawyer_id, client_id=case.client_id, kind=kind)
+        for case in cases
+    ])
+
+
+def serialize_case(case, media_origin=None):
+    data = {
+        "id": case.id,
+        "title": case.title,
+        "client": case.client.full_name,
+        "court": case.court,
+        "case_number": case.case_number,
+        "next_hearing": case.next_hearing,
+        "status": case.status,
+        "priority": case.priority,
+        "created_at": case.created_at,
+    }
+    if hasattr(case, 'document_count'):
+        data["document_count"] = case.document_count
+    else:
+        data["documents"] = [
+            {
+                "id": doc.id,
+                "title": doc.title,
+                "download_url": media_origin + reverse('case-document-download', args=[doc.id]),
+                "uploaded_at": doc.uploaded_at
+            } for doc in case.documents.all()
+        ]
+    return data
+
+
+def case_list_response(request, cases, view=None):
+    # Shared by the lawyer and client case lists: one query for the cases and
+    # their clients plus one for all their documents, or a COUNT annotation
+    # instead of the documents with ?documents=count.
+    try:
+        cases = filter_cases(cases, request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    cases = cases.select_related('client').order_by('-created_at')
+    if request.query_params.get('documents') == 'count':
+        cases = cases.annotate(document_count=Count('documents'))
+    else:
+        cases = cases.prefetch_related('documents')
+
+    cases, paginator = paginate(request, cases, '-created_at', view=view)
+
+    media_origin = request.build_absolute_uri('/').rstrip('/')
+    data = {"cases": [serialize_case(case, media_origin) for case in cases]}
+    if paginator is not None:
+        return paginator.get_paginated_response(data)
+    return Response(data, status=status.HTTP_200_OK)
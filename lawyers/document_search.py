@@ -0,0 +1,201 @@
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .extraction import UnsupportedDocument, extract_text
+from .models import CaseDocument, CaseDocumentText, LegalCase
+from .search import backend
+
+# Full-text search over extracted case document text. Same layout as the
+# lawyer search index: lawyers_documentsearch (migration 0017) is a tsvector
+# table on Postgres and an FTS5 table on SQLite; other backends scan
+# CaseDocumentText with LIKE.
+
+TABLE = 'lawyers_documentsearch'
+EXTRACTION_TIMEOUT = 120
+SNIPPET_WORDS = 12
+HIGHLIGHT = '**'
+
+# Parsing runs in a spawned worker process so a large or hostile PDF can't
+# stall a request thread or the GIL; a small thread pool hands it files and
+# indexes the results. Future.result(timeout=) only stops the wait, not the
+# parse, so a file that overruns EXTRACTION_TIMEOUT (or crashes the worker)
+# gets the worker killed and the next file starts a fresh one.
+_process_pool = None
+_pool_lock = threading.Lock()
+coordinator = ThreadPoolExecutor(max_workers=2, thread_name_prefix='document-text')
+
+
+def process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _process_pool
+
+
+def _kill_process_pool():
+    global _process_pool
+    pool, _process_pool = _process_pool, None
+    if pool is None:
+        return
+    # The executor has no public way to stop a running task; its workers are
+    # only reachable through _processes.
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_in_worker(path):
+    # One file in the worker at a time, so the timeout covers this file's
+    # parse and not the wait behind another one.
+    with _pool_lock:
+        future = process_pool().submit(extract_text, path)
+        try:
+            return future.result(timeout=EXTRACTION_TIMEOUT)
+        except FutureTimeoutError:
+            _kill_process_pool()
+            raise TimeoutError(f"Extraction took longer than {EXTRACTION_TIMEOUT} seconds.")
+        except BrokenProcessPool:
+            _kill_process_pool()
+            raise
+
+
+def index_document(document, text):
+    vendor = backend()
+    if vendor is None:
+        return
+
+    with connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {TABLE} (document_id, legal_case_id, document) VALUES (%s, %s, "
+                f"setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B')) "
+                f"ON CONFLICT (document_id) DO UPDATE SET document = EXCLUDED.document",
+                [document.pk, document.legal_case_id, document.title, text],
+            )
+        else:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [document.pk])
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, title, content, legal_case_id) VALUES (%s, %s, %s, %s)",
+                [document.pk, document.title, text, document.legal_case_id],
+            )
+
+
+def unindex_document(document_id):
+    # Postgres rows go with the document through ON DELETE CASCADE.
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [document_id])
+
+
+def extract_document(document, in_process=False):
+    """
+    Extract and index one document's text, recording the outcome on its
+    CaseDocumentText row. Parsing happens in the worker process unless
+    in_process is set (management commands).
+    """
+    result = CaseDocumentText(document=document, extracted_at=timezone.now())
+    try:
+        path = document.document.path
+        if in_process:
+            text = extract_text(path)
+        else:
+            text = extract_in_worker(path)
+    except UnsupportedDocument as e:
+        result.status, result.error = 'unsupported', str(e)
+    except Exception as e:
+        result.status, result.error = 'failed', str(e)[:255]
+    else:
+        result.status, result.content = 'done', text
+
+    with transaction.atomic():
+        result.save()
+        if result.status == 'done':
+            index_document(document, result.content)
+    return result
+
+
+def _extract_in_background(document_id):
+    try:
+        document = CaseDocument.objects.filter(pk=document_id).first()
+        if document is not None:
+            extract_document(document)
+    finally:
+        # Worker threads hold their own connections; don't leave them open.
+        connection.close()
+
+
+def schedule_extraction(document):
+    CaseDocumentText.objects.get_or_create(document=document)
+    document_id = document.pk
+    transaction.on_commit(lambda: coordinator.submit(_extract_in_background, document_id))
+
+
+def _terms(query):
+    return re.findall(r'[^\W_]+', query.lower())
+
+
+def _visible_cases(user):
+    return LegalCase.objects.filter(Q(lawyer__user=user) | Q(client__user=user)).values('id')
+
+
+def _python_snippet(text, terms):
+    lowered = text.lower()
+    hit = min((i for i in (lowered.find(term) for term in terms) if i >= 0), default=0)
+    words_before = text[:hit].split()[-SNIPPET_WORDS // 2:]
+    words_after = text[hit:].split()[:SNIPPET_WORDS]
+    snippet = ' '.join(words_before + words_after)
+    for term in terms:
+        snippet = re.sub(f'({re.escape(term)})', rf'{HIGHLIGHT}\1{HIGHLIGHT}', snippet, flags=re.IGNORECASE)
+    return snippet
+
+
+def search_documents(user, query, limit=20):
+    """
+    Return [(document_id, score, snippet)] over documents in the user's own
+    cases (as lawyer or client), best match first. Matches in the snippet are
+    wrapped in HIGHLIGHT.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    cases_sql, cases_params = _visible_cases(user).query.sql_with_params()
+    vendor = backend()
+
+    if vendor is None:
+        condition = Q(status='done', document__legal_case__in=_visible_cases(user))
+        for term in terms:
+            condition &= Q(document__title__icontains=term) | Q(content__icontains=term)
+        rows = CaseDocumentText.objects.filter(condition).order_by('-document__uploaded_at').values_list('document_id', 'content')[:limit]
+        return [(document_id, 0.0, _python_snippet(content, terms)) for document_id, content in rows]
+
+    with connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            # Rank and cut to the page first so ts_headline only reparses the hits.
+            cursor.execute(
+                f"WITH q AS (SELECT to_tsquery('english', %s) AS query), "
+                f"hits AS (SELECT s.document_id, ts_rank(s.document, q.query) AS score FROM {TABLE} s, q "
+                f"WHERE s.document @@ q.query AND s.legal_case_id IN ({cases_sql}) "
+                f"ORDER BY score DESC LIMIT %s) "
+                f"SELECT hits.document_id, hits.score, ts_headline('english', t.content, q.query, %s) "
+                f"FROM hits JOIN lawyers_casedocumenttext t ON t.document_id = hits.document_id, q "
+                f"ORDER BY hits.score DESC",
+                [
+                    ' & '.join(f'{term}:*' for term in terms), *cases_params, limit,
+                    f'StartSel={HIGHLIGHT}, StopSel={HIGHLIGHT}, MaxWords={SNIPPET_WORDS * 2}, MinWords={SNIPPET_WORDS}, MaxFragments=2',
+                ],
+            )
+        else:
+            cursor.execute(
+                f"SELECT rowid, -bm25({TABLE}, 5.0, 1.0) AS score, "
+                f"snippet({TABLE}, 1, %s, %s, '...', %s) "
+                f"FROM {TABLE} WHERE {TABLE} MATCH %s AND legal_case_id IN ({cases_sql}) "
+                f"ORDER BY score DESC LIMIT %s",
+                [HIGHLIGHT, HIGHLIGHT, SNIPPET_WORDS, ' '.join(f'"{term}"*' for term in terms), *cases_params, limit],
+            )
+        return cursor.fetchall()
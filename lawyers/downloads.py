@@ -0,0 +1,246 @@
+import mimetypes
+import os
+import re
+import zipfile
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from backend.streaming import served_over_asgi, streaming_content
+from .models import LawyerProfile
+from .storage import BLOB_PREFIX
+from .thumbnails import thumbnail_source_stem
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class FileRange:
+    """
+    A file object limited to length bytes from start. It keeps fileno() and
+    tell() so a server's wsgi.file_wrapper can still sendfile() the slice.
+    Content-Length bounds how much it sends.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(name, stat):
+    # Content-addressed blobs already carry their digest in the name.
+    if name.startswith(BLOB_PREFIX):
+        return '"%s"' % os.path.splitext(os.path.basename(name))[0]
+    return '"%x-%x"' % (stat.st_size, int(stat.st_mtime))
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) inclusive for a single byte range, None to send the
+    whole file (no header, or several ranges), or False if unsatisfiable.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        return None
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def read_blocks(file):
+    try:
+        yield from iter(lambda: file.read(STREAM_BLOCK_SIZE), b'')
+    finally:
+        file.close()
+
+
+def is_public_media(name):
+    """
+    Whether a stored name is a profile picture or one of its thumbnails, the
+    only media handed out by URL. Blobs are shared by content, so this asks
+    whether a public field references the name, not which fields do.
+    """
+    stem = thumbnail_source_stem(name)
+    if stem is not None:
+        return LawyerProfile.objects.filter(profile_picture__startswith=f'{stem}.').exists()
+    return LawyerProfile.objects.filter(profile_picture=name).exists()
+
+
+def file_download_response(request, field_file, filename, as_attachment=False):
+    """
+    Serve a stored file after the caller has checked access. Answers
+    conditional GETs itself, then hands the body to the front server
+    (DOCUMENT_DOWNLOAD_BACKEND 'accel' or 'sendfile') or streams it itself,
+    honouring a single Range.
+    """
+    path = field_file.path
+    stat = os.stat(path)
+    etag = file_etag(field_file.name, stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    backend = settings.DOCUMENT_DOWNLOAD_BACKEND
+    if backend == 'accel':
+        # nginx serves the internal location and handles Range itself.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.DOCUMENT_ACCEL_PREFIX + field_file.name
+    elif backend == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        if byte_range and not if_range_matches(request, etag, last_modified):
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{stat.st_size}"
+            return response
+
+        file = open(path, 'rb')
+        status, length = 200, stat.st_size
+        if byte_range:
+            start, end = byte_range
+            status, length = 206, end - start + 1
+            file = FileRange(file, start, length)
+
+        if served_over_asgi(request):
+            # FileResponse would be read into memory whole under ASGI.
+            response = StreamingHttpResponse(streaming_content(request, read_blocks(file)), status=status, content_type=content_type)
+        else:
+            response = FileResponse(file, status=status, content_type=content_type)
+            response.block_size = STREAM_BLOCK_SIZE
+        if byte_range:
+            response['Content-Range'] = f"bytes {byte_range[0]}-{byte_range[1]}/{stat.st_size}"
+        response['Content-Length'] = length
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# Formats that are already compressed; deflating them again only costs CPU.
+STORED_EXTENSIONS = {
+    '.pdf', '.docx', '.xlsx', '.pptx', '.odt', '.zip', '.gz', '.rar', '.7z',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.mp3', '.mp4', '.mov',
+}
+
+
+class ZipStream:
+    """
+    Write-only sink for zipfile. It has no seek() or tell(), so zipfile
+    streams entries with data descriptors instead of rewinding to patch
+    headers, and whatever it wrote so far can be handed on and dropped.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def archive_name(title, stored_name, used):
+    extension = os.path.splitext(stored_name)[1]
+    base = title.replace('/', '_').replace('\\', '_').strip() or 'document'
+    if base.lower().endswith(extension.lower()):
+        base = base[:len(base) - len(extension)]
+    name, n = base + extension, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{base} ({n}){extension}"
+    used.add(name.lower())
+    return name
+
+
+def zip_documents(documents):
+    """
+    Yield a ZIP of the given CaseDocuments piece by piece. Only one read
+    block per file is held in memory; files missing from storage are skipped.
+    """
+    stream = ZipStream()
+    used = set()
+    with zipfile.ZipFile(stream, 'w') as archive:
+        for document in documents:
+            try:
+                source = document.document.open('rb')
+            except FileNotFoundError:
+                continue
+            with source:
+                info = zipfile.ZipInfo(
+                    archive_name(document.title, document.document.name, used),
+                    date_time=document.uploaded_at.timetuple()[:6],
+                )
+                info.file_size = document.document.size
+                stored = os.path.splitext(document.document.name)[1].lower() in STORED_EXTENSIONS
+                info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                with archive.open(info, 'w') as entry:
+                    for block in iter(lambda: source.read(STREAM_BLOCK_SIZE), b''):
+                        entry.write(block)
+                        data = stream.pop()
+                        if data:
+                            yield data
+            yield stream.pop()
+    yield stream.pop()
+
+
+def zip_download_response(request, documents, filename):
+    # Under ASGI the archive is still built by the sync generator, one block
+    # at a time in the request's thread; see backend.streaming.
+    chunks = (chunk for chunk in zip_documents(documents) if chunk)
+    response = StreamingHttpResponse(streaming_content(request, chunks), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Cache-Control'] = 'private, no-store'
+    # Don't let a buffering proxy hold the stream back until it finishes.
+    response['X-Accel-Buffering'] = 'no'
+    return response
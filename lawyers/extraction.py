@@ -0,0 +1,61 @@
+import os
+import zipfile
+from xml.etree import ElementTree
+
+# Runs in a separate worker process (see document_search.py), so this module
+# must stay importable without Django being set up.
+
+MAX_TEXT_LENGTH = 1_000_000
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class UnsupportedDocument(Exception):
+    pass
+
+
+def _pdf_text(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnsupportedDocument("pypdf is not installed.")
+
+    reader = PdfReader(path)
+    pages, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        pages.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_LENGTH:
+            break
+    return '\n'.join(pages)
+
+
+def _docx_text(path):
+    with zipfile.ZipFile(path) as docx:
+        root = ElementTree.fromstring(docx.read('word/document.xml'))
+    paragraphs = []
+    for paragraph in root.iter(f'{WORD_NS}p'):
+        paragraphs.append(''.join(node.text or '' for node in paragraph.iter(f'{WORD_NS}t')))
+    return '\n'.join(paragraphs)
+
+
+def _plain_text(path):
+    with open(path, 'rb') as f:
+        return f.read(MAX_TEXT_LENGTH).decode('utf-8', errors='replace')
+
+
+EXTRACTORS = {
+    '.pdf': _pdf_text,
+    '.docx': _docx_text,
+    '.txt': _plain_text,
+}
+
+
+def extract_text(path):
+    """Plain text of a PDF, DOCX or TXT file, truncated to MAX_TEXT_LENGTH."""
+    extractor = EXTRACTORS.get(os.path.splitext(path)[1].lower())
+    if extractor is None:
+        raise UnsupportedDocument("Unsupported file type.")
+    text = extractor(path)
+    # Collapse the whitespace PDF extraction leaves between glyph runs.
+    return ' '.join(text.split())[:MAX_TEXT_LENGTH]
@@ -0,0 +1,167 @@
+import hashlib
+import time
+from collections import Counter
+from django.core.cache import cache
+from django.db.models import BooleanField, Count, ExpressionWrapper, IntegerField, Q, Value
+from django.db.models.functions import Cast, Floor, Lower, Trim
+from .models import LawyerProfile
+
+FACET_CUBE_KEY = 'lawyers:facet-cube'
+FACET_VERSION_KEY = 'lawyers:facet-version'
+FACET_CUBE_TIMEOUT = 600
+
+FACET_FIELDS = ('specialization', 'experience_years', 'location', 'is_verified')
+
+
+def parse_choices(value, choices, name):
+    """Split a comma-separated query value, checking each item against choices."""
+    values = [v.strip() for v in value.split(',') if v.strip()]
+    valid = dict(choices)
+    for v in values:
+        if v not in valid:
+            raise ValueError(f"Invalid {name}. Valid options are: {', '.join(valid)}")
+    return values
+
+
+def parse_filters(params):
+    filters = {}
+
+    if params.get('specialization'):
+        filters['specialization'] = parse_choices(
+            params['specialization'], LawyerProfile.SPECIALIZATION_CHOICES, 'specialization'
+        )
+    if params.get('experience_years'):
+        filters['experience_years'] = parse_choices(
+            params['experience_years'], LawyerProfile.EXPERIENCE_CHOICES, 'experience_years'
+        )
+    if params.get('location'):
+        filters['location'] = params['location'].strip()
+    if params.get('is_verified'):
+        value = params['is_verified'].lower()
+        if value not in ('true', 'false', '1', '0'):
+            raise ValueError("is_verified must be true or false.")
+        filters['is_verified'] = value in ('true', '1')
+
+    for name in ('min_rating', 'max_rating'):
+        if params.get(name):
+            try:
+                filters[name] = float(params[name])
+            except ValueError:
+                raise ValueError(f"{name} must be a number.")
+
+    return filters
+
+
+def location_key(prefix=''):
+    # Locations are matched trimmed and case-insensitively.
+    return Lower(Trim(f'{prefix}location'))
+
+
+def location_match(filters, prefix=''):
+    return Q(**{f'{prefix}location_key': Lower(Value(filters['location']))})
+
+
+def rating_match(filters, prefix=''):
+    lookups = {}
+    if 'min_rating' in filters:
+        lookups[f'{prefix}rating__gte'] = filters['min_rating']
+    if 'max_rating' in filters:
+        lookups[f'{prefix}rating__lte'] = filters['max_rating']
+    return Q(**lookups)
+
+
+def apply_filters(queryset, filters, prefix=''):
+    lookups = {}
+    if 'specialization' in filters:
+        lookups[f'{prefix}specialization__in'] = filters['specialization']
+    if 'experience_years' in filters:
+        lookups[f'{prefix}experience_years__in'] = filters['experience_years']
+    if 'is_verified' in filters:
+        lookups[f'{prefix}is_verified'] = filters['is_verified']
+    if 'location' in filters:
+        queryset = queryset.alias(location_key=location_key(prefix)).filter(location_match(filters))
+    return queryset.filter(rating_match(filters, prefix), **lookups)
+
+
+def matches(condition):
+    return ExpressionWrapper(condition, output_field=BooleanField()) if condition else Value(True)
+
+
+def facet_cube_key(filters):
+    # The cube depends on the location and rating filters (see get_facet_cube),
+    # and every variant is dropped at once by moving the version.
+    version = cache.get_or_set(FACET_VERSION_KEY, time.time_ns, None)
+    variant = repr([filters.get(name) for name in ('location', 'min_rating', 'max_rating')])
+    return f'{FACET_CUBE_KEY}:{version}:{hashlib.sha1(variant.encode()).hexdigest()}'
+
+
+def get_facet_cube(filters=None):
+    # One row per distinct (facet values, whole-star rating) combination with
+    # its lawyer count, plus whether the rows match the location and rating
+    # filters. Those two are evaluated by the database with the same lookups
+    # as apply_filters, so a facet count always equals the size of the list
+    # it stands for. Location is grouped the way it is matched; both keep the
+    # cube bounded by the number of distinct facet values rather than the
+    # number of lawyers.
+    filters = filters or {}
+    key = facet_cube_key(filters)
+    cube = cache.get(key)
+    if cube is None:
+        cube = list(
+            LawyerProfile.objects.filter(user__role='lawyer')
+            .exclude(user__email='legalbot@casebridge.com')
+            .order_by()
+            .annotate(location_key=location_key(), stars=Cast(Floor('rating'), IntegerField()))
+            .annotate(
+                location_ok=matches(location_match(filters) if 'location' in filters else None),
+                rating_ok=matches(rating_match(filters)),
+            )
+            .values_list('specialization', 'experience_years', 'location_key', 'is_verified', 'stars', 'location_ok', 'rating_ok')
+            .annotate(n=Count('id'))
+        )
+        cache.set(key, cube, FACET_CUBE_TIMEOUT)
+    return cube
+
+
+def invalidate_facets():
+    cache.set(FACET_VERSION_KEY, time.time_ns(), None)
+
+
+def _failed_filters(row, filters):
+    specialization, experience_years, location, is_verified, stars, location_ok, rating_ok = row[:7]
+    checks = {
+        'specialization': lambda v: specialization in v,
+        'experience_years': lambda v: experience_years in v,
+        'is_verified': lambda v: is_verified == v,
+    }
+    failed = {name for name, check in checks.items() if name in filters and not check(filters[name])}
+    if not location_ok:
+        failed.add('location')
+    if not rating_ok:
+        failed.add('rating')
+    return failed
+
+
+def facet_counts(filters):
+    # Each facet is counted with every filter applied except its own, so the
+    # client can show how many lawyers each alternative value would return.
+    # A row feeds a facet when the only filters it fails are that facet's own.
+    skips = {field: {field} for field in FACET_FIELDS}
+    skips['rating'] = {'rating'}
+
+    facets = {facet: Counter() for facet in skips}
+    for row in get_facet_cube(filters):
+        failed = _failed_filters(row, filters)
+        if len(failed) > 1:
+            continue
+        keys = {
+            'specialization': row[0],
+            'experience_years': row[1],
+            'location': row[2],
+            'is_verified': 'true' if row[3] else 'false',
+            'rating': str(row[4]),
+        }
+        for facet, skip in skips.items():
+            if failed <= skip:
+                facets[facet][keys[facet]] += row[7]
+    return {facet: dict(counts) for facet, counts in facets.items()}
@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from django.db import IntegrityError, transaction
+from clients.models import GeneralUserProfile
+from .cases import record_case_events
+from .models import LegalCase
+from .stats import bump, case_deltas
+
+REQUIRED_FIELDS = ['title', 'client_id', 'court', 'case_number', 'next_hearing']
+LENGTH_LIMITED_FIELDS = ['title', 'court', 'case_number']
+CHUNK_SIZE = 500
+FORMATS = ('csv', 'ndjson')
+
+
+class ImportFileError(ValueError):
+    """The file itself can't be read (bad encoding, broken CSV); no further rows are read."""
+    created = 0
+
+
+def detect_format(filename, requested=None):
+    fmt = (requested or filename.rsplit('.', 1)[-1]).lower()
+    if fmt in ('jsonl', 'json'):
+        fmt = 'ndjson'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format. Use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def iter_rows(binary_stream, fmt):
+    # Yields (row_number, row) one at a time so only the current line is held in memory.
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    row_number = 0
+    try:
+        if fmt == 'csv':
+            for row_number, row in enumerate(csv.DictReader(text), start=1):
+                yield row_number, row
+        else:
+            for row_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield row_number, row if isinstance(row, dict) else None
+    except UnicodeDecodeError:
+        raise ImportFileError(f"File is not UTF-8 text (failed after row {row_number}).")
+    except csv.Error as e:
+        raise ImportFileError(f"Malformed CSV after row {row_number}: {e}")
+
+
+def _validate(row):
+    if row is None:
+        raise ValueError("Row is not a valid JSON object.")
+    for field in REQUIRED_FIELDS:
+        if not row.get(field):
+            raise ValueError(f"{field} is required.")
+
+    try:
+        client_id = int(row['client_id'])
+    except (TypeError, ValueError):
+        raise ValueError("client_id must be an integer.")
+    try:
+        next_hearing = datetime.strptime(str(row['next_hearing']), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError("Invalid date format for next_hearing. Use YYYY-MM-DD format.")
+
+    case_status = row.get('status') or 'active'
+    if case_status not in dict(LegalCase.STATUS_CHOICES):
+        raise ValueError(f"Invalid status. Valid options are: {', '.join(dict(LegalCase.STATUS_CHOICES))}")
+    priority = row.get('priority') or 'medium'
+    if priority not in dict(LegalCase.PRIORITY_CHOICES):
+        raise ValueError(f"Invalid priority. Valid options are: {', '.join(dict(LegalCase.PRIORITY_CHOICES))}")
+
+    values = {
+        'title': str(row['title']),
+        'client_id': client_id,
+        'court': str(row['court']),
+        'case_number': str(row['case_number']).strip(),
+        'next_hearing': next_hearing,
+        'status': case_status,
+        'priority': priority,
+    }
+    # Checked here so one long value rejects its row, not the whole chunk.
+    for field in LENGTH_LIMITED_FIELDS:
+        max_length = LegalCase._meta.get_field(field).max_length
+        if len(values[field]) > max_length:
+            raise ValueError(f"{field} must be at most {max_length} characters.")
+    return values
+
+
+def _import_chunk(lawyer, chunk, on_error):
+    parsed = []
+    for row_number, row in chunk:
+        try:
+            parsed.append((row_number, _validate(row)))
+        except ValueError as e:
+            on_error(row_number, row, str(e))
+
+    clients = GeneralUserProfile.objects.in_bulk({values['client_id'] for _, values in parsed})
+    taken = set(LegalCase.objects.filter(
+        case_number__in=[values['case_number'] for _, values in parsed]
+    ).values_list('case_number', flat=True))
+
+    to_create = []
+    for row_number, values in parsed:
+        if values['client_id'] not in clients:
+            on_error(row_number, values, "Client not found.")
+        elif values['case_number'] in taken:
+            on_error(row_number, values, "case_number already exists.")
+        else:
+            taken.add(values['case_number'])
+            to_create.append((row_number, LegalCase(lawyer=lawyer, **values)))
+
+    if not to_create:
+        return 0
+
+    try:
+        with transaction.atomic():
+            cases = LegalCase.objects.bulk_create([case for _, case in to_create])
+            if any(case.pk is None for case in cases):
+                # Backends that can't return ids from a bulk insert (MySQL).
+                ids = dict(LegalCase.objects.filter(
+                    case_number__in=[case.case_number for case in cases]
+                ).values_list('case_number', 'id'))
+                for case in cases:
+                    case.pk = ids[case.case_number]
+            record_case_events(cases, 'created')
+            # bulk_create bypasses the post_save signals (stats and case events).
+            deltas = Counter()
+            for _, case in to_create:
+                deltas.update(case_deltas(case.status))
+            bump(lawyer.pk, **deltas)
+    except IntegrityError as e:
+        for row_number, case in to_create:
+            on_error(row_number, None, f"Chunk rejected by the database: {e}")
+        return 0
+
+    return len(to_create)
+
+
+def import_cases(lawyer, rows, on_error, chunk_size=CHUNK_SIZE):
+    """
+    Create cases for lawyer from an iterable of (row_number, row) pairs, one
+    chunk at a time. Each chunk costs a client in_bulk, one case_number lookup
+    and one bulk_create. Rejected rows are passed to on_error(row_number, row,
+    message). Returns the number of cases created.
+
+    If the file turns out to be unreadable part way, the rows read so far are
+    still imported and ImportFileError is raised with created set.
+    """
+    created = 0
+    rows = iter(rows)
+    while True:
+        chunk = []
+        try:
+            for item in islice(rows, chunk_size):
+                chunk.append(item)
+        except ImportFileError as e:
+            e.created = created + _import_chunk(lawyer, chunk, on_error)
+            raise
+        if not chunk:
+            return created
+        created += _import_chunk(lawyer, chunk, on_error)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from lawyers.document_search import extract_document
+from lawyers.models import CaseDocument
+
+
+class Command(BaseCommand):
+    help = "Extract and index text for case documents that were never processed or whose extraction failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-extract every document, not just missing or failed ones.")
+
+    def handle(self, *args, **options):
+        documents = CaseDocument.objects.all()
+        if not options['all']:
+            documents = documents.exclude(text__status__in=['done', 'unsupported'])
+
+        counts = {}
+        for document in documents.iterator():
+            result = extract_document(document, in_process=True)
+            counts[result.status] = counts.get(result.status, 0) + 1
+
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items())) or "nothing to do"
+        self.stdout.write(self.style.SUCCESS(f"Extraction finished: {summary}."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from lawyers.models import LawyerDocuments, LawyerProfile
+from lawyers.thumbnails import delete_thumbnails, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate missing profile picture thumbnails, e.g. for files uploaded before thumbnailing existed, "
+        "and remove photo ID thumbnails left from when ID scans were thumbnailed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate thumbnails that already exist.")
+
+    def handle(self, *args, **options):
+        storage = LawyerProfile._meta.get_field('profile_picture').storage
+        pictures = set(
+            LawyerProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True)
+        )
+        written = 0
+        for name in pictures:
+            written += generate_thumbnails(storage, name, force=options['force'])
+
+        # Blobs are shared by content: keep the derivatives a picture still uses.
+        scans = (
+            LawyerDocuments.objects.exclude(photo_id='').exclude(photo_id__isnull=True)
+            .values_list('photo_id', flat=True).distinct()
+        )
+        removed = 0
+        for name in scans.iterator():
+            if name not in pictures:
+                delete_thumbnails(name)
+                removed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{written} thumbnails written, {removed} photo ID thumbnail sets removed."))
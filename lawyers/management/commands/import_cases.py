@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from lawyers.importers import CHUNK_SIZE, ImportFileError, detect_format, import_cases, iter_rows
+from lawyers.models import LawyerProfile
+
+
+class Command(BaseCommand):
+    help = "Stream legal cases for a lawyer from a CSV or NDJSON file, printing an error line for every rejected row."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--lawyer', required=True, help="Lawyer profile id or account email.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lookup = options['lawyer']
+        try:
+            if lookup.isdigit():
+                lawyer = LawyerProfile.objects.get(pk=lookup)
+            else:
+                lawyer = LawyerProfile.objects.get(user__email=lookup)
+        except LawyerProfile.DoesNotExist:
+            raise CommandError(f"Lawyer {lookup} not found.")
+
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        failed = 0
+
+        def on_error(row_number, row, message):
+            nonlocal failed
+            failed += 1
+            self.stderr.write(f"row {row_number}: {message}")
+
+        with open(options['path'], 'rb') as stream:
+            try:
+                created = import_cases(lawyer, iter_rows(stream, fmt), on_error, chunk_size=options['chunk_size'])
+            except ImportFileError as e:
+                raise CommandError(f"{e} {e.created} cases imported before the error.")
+
+        self.stdout.write(self.style.SUCCESS(f"{created} cases imported, {failed} rows rejected."))
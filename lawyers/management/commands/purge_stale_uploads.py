@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from lawyers.models import CaseDocumentUpload
+from lawyers.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = "Delete chunked case document uploads that were never finalized, with their partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help="Age since the last chunk before an upload is stale.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = CaseDocumentUpload.objects.filter(status='uploading', updated_at__lt=cutoff)
+
+        purged = 0
+        for upload in stale.iterator():
+            discard_upload(upload)
+            purged += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{purged} stale uploads purged."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from lawyers.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute every lawyer's rating_sum, rating_count and rating from LawyerRating and fix drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without writing anything.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        with transaction.atomic():
+            drift = rebuild_ratings(dry_run=dry_run)
+
+        for lawyer_id, stored, actual in drift:
+            self.stdout.write(f"lawyer {lawyer_id}: (sum, count, rating) {stored} -> {actual}")
+
+        verb = "would be fixed" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{len(drift)} drifted lawyers {verb}."))
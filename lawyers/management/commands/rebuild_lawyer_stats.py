@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from lawyers.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized LawyerStats rows from cases, hires and transactions and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without writing anything.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        with transaction.atomic():
+            drift = rebuild_stats(dry_run=dry_run)
+
+        for lawyer_id, field, stored, actual in drift:
+            self.stdout.write(f"lawyer {lawyer_id}: {field} {stored} -> {actual}")
+
+        lawyers = len({entry[0] for entry in drift})
+        verb = "would be fixed" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{len(drift)} drifted values across {lawyers} lawyers {verb}."))
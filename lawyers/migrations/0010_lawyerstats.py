@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawyers', '0009_lawyerrating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LawyerStats',
+            fields=[
+                ('lawyer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='lawyers.lawyerprofile')),
+                ('total_cases', models.IntegerField(default=0)),
+                ('active_cases', models.IntegerField(default=0)),
+                ('closed_cases', models.IntegerField(default=0)),
+                ('clients_served', models.IntegerField(default=0)),
+                ('pending_hires', models.IntegerField(default=0)),
+                ('completed_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
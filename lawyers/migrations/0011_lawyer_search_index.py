@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE lawyers_lawyersearch ("
+            " lawyer_id bigint PRIMARY KEY REFERENCES lawyers_lawyerprofile (id) ON DELETE CASCADE,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX lawyers_lawyersearch_document_gin ON lawyers_lawyersearch USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO lawyers_lawyersearch (lawyer_id, document) SELECT id,"
+            " setweight(to_tsvector('english', coalesce(full_name, '')), 'A') ||"
+            " setweight(to_tsvector('english', replace(coalesce(specialization, ''), '_', ' ')), 'A') ||"
+            " setweight(to_tsvector('english', coalesce(location, '')), 'B') ||"
+            " setweight(to_tsvector('english', coalesce(bio, '')), 'C')"
+            " FROM lawyers_lawyerprofile"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE lawyers_lawyersearch USING fts5("
+            "full_name, specialization, location, bio, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO lawyers_lawyersearch (rowid, full_name, specialization, location, bio)"
+            " SELECT id, full_name, replace(specialization, '_', ' '), location, bio FROM lawyers_lawyerprofile"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS lawyers_lawyersearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawyers', '0010_lawyerstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
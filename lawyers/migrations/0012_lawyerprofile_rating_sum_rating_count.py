@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:38
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    LawyerProfile = apps.get_model('lawyers', 'LawyerProfile')
+    LawyerRating = apps.get_model('lawyers', 'LawyerRating')
+
+    totals = LawyerRating.objects.order_by().values('lawyer').annotate(total=Sum('rating'), count=Count('id'))
+    for row in totals:
+        LawyerProfile.objects.filter(pk=row['lawyer']).update(
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            rating=round(row['total'] / row['count'], 1),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawyers', '0011_lawyer_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lawyerprofile',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lawyerprofile',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
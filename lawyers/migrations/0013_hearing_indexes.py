@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_initial'),
+        ('lawyers', '0012_lawyerprofile_rating_sum_rating_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='legalcase',
+            index=models.Index(fields=['lawyer', 'next_hearing'], name='legalcase_lawyer_hearing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='legalcase',
+            index=models.Index(fields=['client', 'next_hearing'], name='legalcase_client_hearing_idx'),
+        ),
+    ]
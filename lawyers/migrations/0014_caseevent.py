@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_initial'),
+        ('lawyers', '0013_hearing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('document_added', 'Document Added'), ('deleted', 'Deleted')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='legalcase',
+            index=models.Index(fields=['lawyer', 'updated_at'], name='legalcase_lawyer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='legalcase',
+            index=models.Index(fields=['client', 'updated_at'], name='legalcase_client_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='caseevent',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='case_events', to='clients.generaluserprofile'),
+        ),
+        migrations.AddField(
+            model_name='caseevent',
+            name='lawyer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='case_events', to='lawyers.lawyerprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='caseevent',
+            index=models.Index(fields=['lawyer', 'id'], name='caseevent_lawyer_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caseevent',
+            index=models.Index(fields=['client', 'id'], name='caseevent_client_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:43
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawyers', '0014_caseevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseDocumentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete')], default='uploading', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='lawyers.casedocument')),
+                ('legal_case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='lawyers.legalcase')),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:45
+
+import lawyers.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawyers', '0015_casedocumentupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='casedocument',
+            name='document',
+            field=models.FileField(storage=lawyers.storage.get_media_storage, upload_to='case_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='lawyerdocuments',
+            name='cop',
+            field=models.FileField(blank=True, null=True, storage=lawyers.storage.get_media_storage, upload_to='cop/'),
+        ),
+        migrations.AlterField(
+            model_name='lawyerdocuments',
+            name='photo_id',
+            field=models.FileField(blank=True, null=True, storage=lawyers.storage.get_media_storage, upload_to='photo_id/'),
+        ),
+        migrations.AlterField(
+            model_name='lawyerprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=lawyers.storage.get_media_storage, upload_to='lawyer_pics/'),
+        ),
+    ]
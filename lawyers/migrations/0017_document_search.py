@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_document_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE lawyers_documentsearch ("
+            " document_id bigint PRIMARY KEY REFERENCES lawyers_casedocument (id) ON DELETE CASCADE,"
+            " legal_case_id bigint NOT NULL,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX lawyers_documentsearch_document_gin ON lawyers_documentsearch USING GIN (document)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE lawyers_documentsearch USING fts5("
+            "title, content, legal_case_id UNINDEXED, tokenize='porter unicode61')"
+        )
+
+
+def drop_document_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS lawyers_documentsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawyers', '0016_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseDocumentText',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text', serialize=False, to='lawyers.casedocument')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('content', models.TextField(blank=True)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('extracted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_document_index, drop_document_index),
+    ]
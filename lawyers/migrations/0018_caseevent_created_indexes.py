@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_initial'),
+        ('lawyers', '0017_document_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='caseevent',
+            name='caseevent_lawyer_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='caseevent',
+            name='caseevent_client_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='caseevent',
+            index=models.Index(fields=['lawyer', 'created_at'], name='caseevent_lawyer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caseevent',
+            index=models.Index(fields=['client', 'created_at'], name='caseevent_client_created_idx'),
+        ),
+    ]
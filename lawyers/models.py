@@ -1,6 +1,8 @@
+import uuid
 from django.db import models
 from django.utils import timezone
 from users.models import User
+from .storage import get_media_storage
 from clients.models import GeneralUserProfile
 
 class LawyerProfile(models.Model):
@@ -29,8 +31,10 @@ class LawyerProfile(models.Model):
     location = models.CharField(max_length=255)
     bio = models.TextField(blank=True)
     is_verified = models.BooleanField(default=False)
-    profile_picture = models.ImageField(upload_to='lawyer_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='lawyer_pics/', storage=get_media_storage, blank=True, null=True)
     rating = models.FloatField(default=0.0)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
     cases_won = models.IntegerField(default=0)
     clients_served = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -38,11 +42,24 @@ class LawyerProfile(models.Model):
     def __str__(self):
         return self.full_name
 
+class LawyerStats(models.Model):
+    lawyer = models.OneToOneField(LawyerProfile, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_cases = models.IntegerField(default=0)
+    active_cases = models.IntegerField(default=0)
+    closed_cases = models.IntegerField(default=0)
+    clients_served = models.IntegerField(default=0)
+    pending_hires = models.IntegerField(default=0)
+    completed_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.lawyer.full_name}"
+
 class LawyerDocuments(models.Model):
     lawyer = models.OneToOneField(LawyerProfile, on_delete=models.CASCADE, related_name="documents")
     uploaded = models.BooleanField(default=False)
-    photo_id = models.FileField(upload_to="photo_id/", blank=True, null=True)
-    cop = models.FileField(upload_to="cop/", blank=True, null=True)
+    photo_id = models.FileField(upload_to="photo_id/", storage=get_media_storage, blank=True, null=True)
+    cop = models.FileField(upload_to="cop/", storage=get_media_storage, blank=True, null=True)
     
 class LawyerRating(models.Model):
     RATING_CHOICES = [(i, str(i)) for i in range(6)]
@@ -89,14 +106,98 @@ class LegalCase(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['lawyer', 'next_hearing'], name='legalcase_lawyer_hearing_idx'),
+            models.Index(fields=['client', 'next_hearing'], name='legalcase_client_hearing_idx'),
+            models.Index(fields=['lawyer', 'updated_at'], name='legalcase_lawyer_updated_idx'),
+            models.Index(fields=['client', 'updated_at'], name='legalcase_client_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.case_number})"
 
 class CaseDocument(models.Model):
     legal_case = models.ForeignKey('LegalCase', on_delete=models.CASCADE, related_name='documents')
     title = models.CharField(max_length=255)
-    document = models.FileField(upload_to='case_documents/')
+    document = models.FileField(upload_to='case_documents/', storage=get_media_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.title} for {self.legal_case.case_number}"
\ No newline at end of file
+        return f"{self.title} for {self.legal_case.case_number}"
+
+class CaseDocumentText(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    )
+
+    # Filled in by the background extraction stage; the searchable copy lives
+    # in lawyers_documentsearch (see document_search.py).
+    document = models.OneToOneField(CaseDocument, on_delete=models.CASCADE, primary_key=True, related_name='text')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    content = models.TextField(blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    extracted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Text of {self.document.title} ({self.status})"
+
+class CaseDocumentUpload(models.Model):
+    STATUS_CHOICES = (
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    legal_case = models.ForeignKey(LegalCase, on_delete=models.CASCADE, related_name='uploads')
+    title = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    document = models.OneToOneField(CaseDocument, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+class CaseEvent(models.Model):
+    KIND_CHOICES = (
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('document_added', 'Document Added'),
+        ('deleted', 'Deleted'),
+    )
+
+    # Append-only; case sync reads it by created_at (see backend.watermarks).
+    # case_id is a plain integer so the event outlives a deleted case.
+    case_id = models.BigIntegerField()
+    lawyer = models.ForeignKey(LawyerProfile, on_delete=models.CASCADE, related_name='case_events')
+    client = models.ForeignKey(GeneralUserProfile, on_delete=models.CASCADE, related_name='case_events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lawyer', 'created_at'], name='caseevent_lawyer_created_idx'),
+            models.Index(fields=['client', 'created_at'], name='caseevent_client_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Case {self.case_id} {self.kind}"
+
+class MediaBlob(models.Model):
+    # One row per file stored by ContentAddressedStorage; refcount is the
+    # number of FileField values currently pointing at it.
+    name = models.CharField(max_length=100, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
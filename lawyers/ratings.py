@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, Round
+from .facets import invalidate_facets
+from .models import LawyerProfile, LawyerRating
+
+
+def record_rating(lawyer_id, rating, previous=None):
+    # A re-rating only shifts the sum; a first rating also bumps the count.
+    sum_delta = rating - (previous or 0)
+    count_delta = 0 if previous is not None else 1
+
+    # rating is assigned first on purpose: MySQL evaluates SET clauses left to
+    # right against already-updated columns, so it must read the old sum/count.
+    LawyerProfile.objects.filter(pk=lawyer_id).update(
+        rating=Round(
+            Cast(F('rating_sum') + sum_delta, FloatField()) / (F('rating_count') + count_delta),
+            precision=1,
+        ),
+        rating_sum=F('rating_sum') + sum_delta,
+        rating_count=F('rating_count') + count_delta,
+    )
+    invalidate_facets()
+
+
+def rate_lawyer(client, lawyer_id, rating):
+    """Create or replace the client's rating of a lawyer and fold it into the totals."""
+    with transaction.atomic():
+        # Lock the lawyer, not the rating: a rating row that doesn't exist yet
+        # locks nothing, so two concurrent first ratings would both count as
+        # new. Every rating of this lawyer queues here instead.
+        LawyerProfile.objects.select_for_update().only('id').get(pk=lawyer_id)
+        previous = LawyerRating.objects.filter(user=client, lawyer_id=lawyer_id).values_list('rating', flat=True).first()
+        LawyerRating.objects.update_or_create(user=client, lawyer_id=lawyer_id, defaults={'rating': rating})
+        record_rating(lawyer_id, rating, previous)
+
+
+def rebuild_ratings(dry_run=False):
+    """
+    Recompute rating_sum, rating_count and rating for every lawyer from one
+    grouped query and return a list of (lawyer_id, stored, actual) for drifted rows.
+    """
+    totals = {
+        row['lawyer']: (row['total'], row['count'])
+        for row in LawyerRating.objects.order_by().values('lawyer').annotate(total=Sum('rating'), count=Count('id'))
+    }
+
+    drift, to_update = [], []
+    for profile in LawyerProfile.objects.only('id', 'rating', 'rating_sum', 'rating_count'):
+        total, count = totals.get(profile.pk, (0, 0))
+        rating = round(total / count, 1) if count else 0.0
+        stored = (profile.rating_sum, profile.rating_count, profile.rating)
+        if stored != (total, count, rating):
+            drift.append((profile.pk, stored, (total, count, rating)))
+            profile.rating_sum, profile.rating_count, profile.rating = total, count, rating
+            to_update.append(profile)
+
+    if not dry_run and to_update:
+        LawyerProfile.objects.bulk_update(to_update, fields=['rating_sum', 'rating_count', 'rating'], batch_size=500)
+        invalidate_facets()
+
+    return drift
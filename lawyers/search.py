@@ -0,0 +1,102 @@
+import re
+from django.db import connection
+from django.db.models import Q
+from .models import LawyerProfile
+
+# Ranked lawyer search. The index lives in lawyers_lawyersearch, created by
+# migration 0011: a tsvector column with a GIN index on Postgres and an FTS5
+# virtual table on SQLite. Other backends (the MySQL dev setup) have no index
+# and fall back to a LIKE scan ordered by rating.
+
+TABLE = 'lawyers_lawyersearch'
+
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(%s, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(%s, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(%s, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(%s, '')), 'C')"
+)
+
+# bm25 column weights, in table column order: full_name, specialization, location, bio.
+SQLITE_WEIGHTS = '10.0, 10.0, 4.0, 1.0'
+
+
+def backend():
+    if connection.vendor in ('postgresql', 'sqlite'):
+        return connection.vendor
+    return None
+
+
+def _document(profile):
+    return [profile.full_name, profile.specialization.replace('_', ' '), profile.location, profile.bio]
+
+
+def index_lawyer(profile):
+    vendor = backend()
+    if vendor is None:
+        return
+
+    with connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {TABLE} (lawyer_id, document) VALUES (%s, {PG_DOCUMENT}) "
+                f"ON CONFLICT (lawyer_id) DO UPDATE SET document = EXCLUDED.document",
+                [profile.pk, *_document(profile)],
+            )
+        else:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [profile.pk])
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, full_name, specialization, location, bio) VALUES (%s, %s, %s, %s, %s)",
+                [profile.pk, *_document(profile)],
+            )
+
+
+def unindex_lawyer(lawyer_id):
+    # Postgres rows go with the profile through ON DELETE CASCADE.
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [lawyer_id])
+
+
+def _terms(query):
+    return re.findall(r'[^\W_]+', query.lower())
+
+
+def search_lawyers(query, limit=20):
+    """
+    Return [(lawyer_id, score)] best match first. Text relevance is scaled by
+    (1 + rating / 5) so a 5-star lawyer ranks up to twice as high as an equally
+    relevant unrated one.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    vendor = backend()
+    if vendor is None:
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(full_name__icontains=term) | Q(bio__icontains=term)
+                | Q(location__icontains=term) | Q(specialization__icontains=term)
+            )
+        rows = LawyerProfile.objects.filter(condition).order_by('-rating').values_list('id', 'rating')[:limit]
+        return [(lawyer_id, rating) for lawyer_id, rating in rows]
+
+    with connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute(
+                f"SELECT s.lawyer_id, ts_rank(s.document, q) * (1 + p.rating / 5.0) AS score "
+                f"FROM {TABLE} s JOIN lawyers_lawyerprofile p ON p.id = s.lawyer_id, "
+                f"to_tsquery('english', %s) q "
+                f"WHERE s.document @@ q ORDER BY score DESC, p.rating DESC LIMIT %s",
+                [' & '.join(f'{term}:*' for term in terms), limit],
+            )
+        else:
+            cursor.execute(
+                f"SELECT s.rowid, -bm25({TABLE}, {SQLITE_WEIGHTS}) * (1 + p.rating / 5.0) AS score "
+                f"FROM {TABLE} s JOIN lawyers_lawyerprofile p ON p.id = s.rowid "
+                f"WHERE {TABLE} MATCH %s ORDER BY score DESC, p.rating DESC LIMIT %s",
+                [' '.join(f'"{term}"*' for term in terms), limit],
+            )
+        return cursor.fetchall()
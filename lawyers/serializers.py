@@ -1,26 +1,87 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import LawyerProfile, CaseDocument, LawyerDocuments
+from .models import LawyerProfile, CaseDocument, LawyerDocuments, LawyerStats
+from .thumbnails import thumbnail_urls
 
 class CaseDocumentSerializer(serializers.ModelSerializer):
+    # The stored file is only handed out through the authorized download view.
+    download_url = serializers.SerializerMethodField()
+
     class Meta:
         model = CaseDocument
-        fields = ['id', 'legal_case', 'title', 'document', 'uploaded_at']
+        fields = ['id', 'legal_case', 'title', 'document', 'download_url', 'uploaded_at']
         read_only_fields = ['uploaded_at']
+        extra_kwargs = {'document': {'write_only': True}}
+
+    def get_download_url(self, obj):
+        url = reverse('case-document-download', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
         
 class LawyerDocumentsSerializer(serializers.ModelSerializer):
+    # ID documents are only handed out through the authorized download view.
+    photo_id_url = serializers.SerializerMethodField()
+    cop_url = serializers.SerializerMethodField()
+
     class Meta:
         model = LawyerDocuments
-        fields = ['uploaded', 'photo_id', 'cop']
+        fields = ['uploaded', 'photo_id', 'cop', 'photo_id_url', 'cop_url']
+        extra_kwargs = {'photo_id': {'write_only': True}, 'cop': {'write_only': True}}
+
+    def download_url(self, instance, kind):
+        if not getattr(instance, kind):
+            return None
+        url = reverse('lawyer-document-download', args=[instance.lawyer_id, kind])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_photo_id_url(self, obj):
+        return self.download_url(obj, 'photo_id')
+
+    def get_cop_url(self, obj):
+        return self.download_url(obj, 'cop')
+
+class LawyerDocumentStatusSerializer(serializers.ModelSerializer):
+    # What the public profile shows of the ID documents.
+    class Meta:
+        model = LawyerDocuments
+        fields = ['uploaded']
         
+class LawyerStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LawyerStats
+        fields = [
+            'total_cases', 'active_cases', 'closed_cases', 'clients_served',
+            'pending_hires', 'completed_earnings', 'updated_at'
+        ]
+
 class LawyerProfileSerializer(serializers.ModelSerializer):
-    documents = LawyerDocumentsSerializer(read_only=True)
+    documents = LawyerDocumentStatusSerializer(read_only=True)
     
     class Meta:
         model = LawyerProfile
         fields = [
             'id', 'full_name', 'bar_registration_number', 'specialization',
             'experience_years', 'location', 'bio', 'is_verified',
-            'profile_picture', 'documents',  'rating', 'created_at', 'clients_served', 'cases_won'
+            'profile_picture', 'documents',  'rating', 'rating_count', 'created_at', 'clients_served', 'cases_won'
         ]
         
-        read_only_fields = ['is_verified']
+        read_only_fields = ['is_verified', 'rating', 'rating_count']
+
+    def to_representation(self, instance):
+        # Serve the resized avatar rather than the original upload; the
+        # original URL is only returned until the thumbnails are generated.
+        data = super().to_representation(instance)
+        thumbnails = thumbnail_urls(instance.profile_picture, self.context.get('request'))
+        data['profile_picture_thumbnails'] = thumbnails
+        if thumbnails:
+            data['profile_picture'] = thumbnails['md']['jpg']
+        return data
+
+    def update(self, instance, validated_data):
+        # Only write the submitted columns so a profile edit can't clobber
+        # counters (rating_sum, stats) that are updated concurrently with F().
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
@@ -0,0 +1,128 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .cases import record_case_events
+from .document_search import schedule_extraction, unindex_document
+from .models import CaseDocument, LawyerDocuments, LawyerProfile, LawyerStats, LegalCase
+from .facets import invalidate_facets
+from .search import index_lawyer, unindex_lawyer
+from .stats import bump, case_deltas, case_status_deltas
+from .storage import release_file
+from .thumbnails import schedule_thumbnails
+
+
+@receiver(post_save, sender=LawyerProfile)
+def create_lawyer_stats(sender, instance, created, **kwargs):
+    if created:
+        LawyerStats.objects.get_or_create(lawyer=instance)
+
+
+@receiver(post_save, sender=LawyerProfile)
+def update_search_index(sender, instance, **kwargs):
+    index_lawyer(instance)
+    invalidate_facets()
+
+
+@receiver(post_delete, sender=LawyerProfile)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_lawyer(instance.pk)
+    invalidate_facets()
+
+
+@receiver(post_init, sender=LegalCase)
+def remember_case_state(sender, instance, **kwargs):
+    instance._stats_state = (instance.lawyer_id, instance.status)
+
+
+@receiver(post_save, sender=LegalCase)
+def update_stats_on_case_save(sender, instance, created, **kwargs):
+    old_lawyer_id, old_status = instance._stats_state
+    new_state = (instance.lawyer_id, instance.status)
+
+    if created:
+        bump(instance.lawyer_id, **case_deltas(instance.status))
+    elif old_lawyer_id == instance.lawyer_id:
+        bump(instance.lawyer_id, **case_status_deltas(old_status, instance.status))
+    else:
+        bump(old_lawyer_id, **case_deltas(old_status, sign=-1))
+        bump(instance.lawyer_id, **case_deltas(instance.status))
+
+    instance._stats_state = new_state
+    record_case_events([instance], 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=LegalCase)
+def update_stats_on_case_delete(sender, instance, **kwargs):
+    bump(instance.lawyer_id, rebuild_missing=False, **case_deltas(instance.status, sign=-1))
+
+    # Only log deletes of the case itself; when the lawyer or client is being
+    # deleted their event log goes with them.
+    origin = kwargs.get('origin')
+    if isinstance(origin, LegalCase) or getattr(origin, 'model', None) is LegalCase:
+        record_case_events([instance], 'deleted')
+
+
+@receiver(post_save, sender=CaseDocument)
+def record_document_upload(sender, instance, created, **kwargs):
+    if created:
+        legal_case = instance.legal_case
+        LegalCase.objects.filter(pk=legal_case.pk).update(updated_at=timezone.now())
+        record_case_events([legal_case], 'document_added')
+
+
+@receiver(post_save, sender=CaseDocument)
+def queue_text_extraction(sender, instance, created, **kwargs):
+    if created:
+        schedule_extraction(instance)
+
+
+@receiver(post_delete, sender=CaseDocument)
+def remove_document_from_index(sender, instance, **kwargs):
+    unindex_document(instance.pk)
+
+
+# FileFields backed by ContentAddressedStorage. Each holds a reference on its
+# blob, released when the row is deleted or the file is replaced.
+MEDIA_FIELDS = {
+    CaseDocument: ('document',),
+    LawyerDocuments: ('photo_id', 'cop'),
+    LawyerProfile: ('profile_picture',),
+}
+
+# Image fields that get resized derivatives in the background on upload.
+# Thumbnails are public media, so private fields (ID scans) never get them.
+THUMBNAIL_FIELDS = {
+    LawyerProfile: ('profile_picture',),
+}
+
+
+def media_name(instance, field):
+    # Read the raw value so deferred fields aren't fetched just to be remembered.
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value) or ''
+
+
+def remember_media_names(sender, instance, **kwargs):
+    instance._media_names = {field: media_name(instance, field) for field in MEDIA_FIELDS[sender]}
+
+
+def handle_changed_media(sender, instance, **kwargs):
+    for field, old_name in instance._media_names.items():
+        if old_name == media_name(instance, field):
+            continue
+        if old_name:
+            release_file(old_name)
+        if field in THUMBNAIL_FIELDS.get(sender, ()):
+            schedule_thumbnails(getattr(instance, field))
+    remember_media_names(sender, instance)
+
+
+def release_deleted_media(sender, instance, **kwargs):
+    for field in MEDIA_FIELDS[sender]:
+        release_file(media_name(instance, field))
+
+
+for model in MEDIA_FIELDS:
+    post_init.connect(remember_media_names, sender=model, dispatch_uid=f'media-init-{model.__name__}')
+    post_save.connect(handle_changed_media, sender=model, dispatch_uid=f'media-save-{model.__name__}')
+    post_delete.connect(release_deleted_media, sender=model, dispatch_uid=f'media-delete-{model.__name__}')
@@ -0,0 +1,123 @@
+from decimal import Decimal
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from .models import LawyerProfile, LawyerStats, LegalCase
+
+STAT_FIELDS = ['total_cases', 'active_cases', 'closed_cases', 'clients_served', 'pending_hires', 'completed_earnings']
+
+
+def bump(lawyer_id, rebuild_missing=True, **deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not lawyer_id or not deltas:
+        return
+
+    updated = LawyerStats.objects.filter(lawyer_id=lawyer_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        # No row yet (e.g. lawyer created before the stats table existed):
+        # build it from the source tables, which already include this change.
+        # Deletes skip this, the row may be going away in the same cascade.
+        if rebuild_missing:
+            rebuild_stats(lawyer_ids=[lawyer_id])
+        return
+
+    if 'clients_served' in deltas:
+        LawyerProfile.objects.filter(pk=lawyer_id).update(clients_served=F('clients_served') + deltas['clients_served'])
+
+
+def case_deltas(status, sign=1):
+    return {
+        'total_cases': sign,
+        'active_cases': sign if status == 'active' else 0,
+        'closed_cases': sign if status == 'closed' else 0,
+    }
+
+
+def case_status_deltas(old_status, new_status):
+    removed = case_deltas(old_status, sign=-1)
+    return {field: delta + removed[field] for field, delta in case_deltas(new_status).items()}
+
+
+def compute_stats(lawyer_ids=None):
+    from hire.models import Hire
+    from transactions.models import Transaction
+
+    cases = LegalCase.objects.all()
+    hires = Hire.objects.all()
+    payments = Transaction.objects.filter(status='completed', lawyer__isnull=False)
+    if lawyer_ids is not None:
+        cases = cases.filter(lawyer_id__in=lawyer_ids)
+        hires = hires.filter(lawyer_id__in=lawyer_ids)
+        payments = payments.filter(lawyer_id__in=lawyer_ids)
+
+    stats = {}
+
+    def row(lawyer_id):
+        return stats.setdefault(lawyer_id, {field: 0 for field in STAT_FIELDS})
+
+    for entry in cases.order_by().values('lawyer').annotate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='active')),
+        closed=Count('id', filter=Q(status='closed')),
+    ):
+        row(entry['lawyer']).update(
+            total_cases=entry['total'], active_cases=entry['active'], closed_cases=entry['closed']
+        )
+
+    for entry in hires.order_by().values('lawyer').annotate(
+        clients=Count('client', filter=Q(status='accepted'), distinct=True),
+        pending=Count('id', filter=Q(status='pending')),
+    ):
+        row(entry['lawyer']).update(clients_served=entry['clients'], pending_hires=entry['pending'])
+
+    for entry in payments.order_by().values('lawyer').annotate(total=Sum('amount')):
+        row(entry['lawyer'])['completed_earnings'] = entry['total'] or Decimal('0')
+
+    return stats
+
+
+def rebuild_stats(lawyer_ids=None, dry_run=False):
+    """
+    Recompute stats rows from the source tables with one GROUP BY per table and
+    return a list of (lawyer_id, field, stored, actual) for every drifted value.
+    """
+    computed = compute_stats(lawyer_ids)
+
+    profiles = LawyerProfile.objects.select_related('stats')
+    if lawyer_ids is not None:
+        profiles = profiles.filter(pk__in=lawyer_ids)
+
+    drift, to_create, to_update, profiles_to_update = [], [], [], []
+    for profile in profiles:
+        actual = computed.get(profile.pk, {field: 0 for field in STAT_FIELDS})
+        try:
+            stats = profile.stats
+        except LawyerStats.DoesNotExist:
+            stats = None
+
+        if stats is None:
+            drift.extend((profile.pk, field, None, value) for field, value in actual.items())
+            to_create.append(LawyerStats(lawyer=profile, **actual))
+        else:
+            changed = False
+            for field, value in actual.items():
+                if getattr(stats, field) != value:
+                    drift.append((profile.pk, field, getattr(stats, field), value))
+                    setattr(stats, field, value)
+                    changed = True
+            if changed:
+                stats.updated_at = timezone.now()
+                to_update.append(stats)
+
+        if profile.clients_served != actual['clients_served']:
+            profile.clients_served = actual['clients_served']
+            profiles_to_update.append(profile)
+
+    if not dry_run:
+        LawyerStats.objects.bulk_create(to_create, ignore_conflicts=True)
+        LawyerStats.objects.bulk_update(to_update, fields=STAT_FIELDS + ['updated_at'])
+        LawyerProfile.objects.bulk_update(profiles_to_update, fields=['clients_served'])
+
+    return drift
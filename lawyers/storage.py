@@ -0,0 +1,127 @@
+import hashlib
+import os
+import tempfile
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from .thumbnails import delete_thumbnails
+
+BLOB_PREFIX = 'blobs/'
+HASH_READ_SIZE = 64 * 1024
+
+
+def file_digest(path):
+    """(sha256, size) of a file already on disk."""
+    sha = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_READ_SIZE), b''):
+            sha.update(block)
+            size += len(block)
+    return sha.hexdigest(), size
+
+
+def spool(content, directory):
+    """
+    Copy an in-memory or streamed upload into a temporary file in directory,
+    hashing it on the way through. Returns (path, sha256, size).
+    """
+    os.makedirs(directory, exist_ok=True)
+    sha = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in content.chunks():
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode()
+                sha.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, sha.hexdigest(), size
+
+
+class SpooledFile(File):
+    # Lets FileSystemStorage move a spooled upload into place instead of copying it.
+    def temporary_file_path(self):
+        return self.name
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()[:10]
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every distinct file once under blobs/<digest>, whatever upload_to
+    the field asked for. Each save adds a reference on the MediaBlob row and
+    each delete drops one; the file goes when the last reference does.
+    Names outside blobs/ (files stored before this backend) are left alone.
+    """
+
+    def _save(self, name, content):
+        # Each upload is read once: files Django already spooled to disk are
+        # hashed there and moved into place, anything else is hashed while it
+        # is copied to a temporary file next to the blobs.
+        spooled = None
+        if hasattr(content, 'temporary_file_path'):
+            digest, size = file_digest(content.temporary_file_path())
+        else:
+            spooled, digest, size = spool(content, self.path(BLOB_PREFIX + 'tmp'))
+            content = SpooledFile(None, name=spooled)
+        name = blob_name(digest, name)
+
+        MediaBlob = apps.get_model('lawyers', 'MediaBlob')
+        try:
+            with transaction.atomic():
+                # The row lock serialises this with delete(), so the file
+                # can't be unlinked between the exists() check and the new
+                # reference being counted.
+                MediaBlob.objects.get_or_create(name=name, defaults={'digest': digest, 'size': size})
+                blob = MediaBlob.objects.select_for_update().get(name=name)
+                if not self.exists(name):
+                    name = super()._save(name, content)
+                blob.refcount = F('refcount') + 1
+                blob.save(update_fields=['refcount'])
+        finally:
+            if spooled and os.path.exists(spooled):
+                os.remove(spooled)
+        return name
+
+    def delete(self, name):
+        if not name or not name.startswith(BLOB_PREFIX):
+            return
+
+        MediaBlob = apps.get_model('lawyers', 'MediaBlob')
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                blob.refcount = F('refcount') - 1
+                blob.save(update_fields=['refcount'])
+                return
+            # Last reference: the file goes while the row is still locked, so
+            # a concurrent save of the same content waits and then rewrites it.
+            blob.delete()
+            super().delete(name)
+            delete_thumbnails(name)
+
+
+media_storage = ContentAddressedStorage()
+
+
+def get_media_storage():
+    return media_storage
+
+
+def release_file(name):
+    """Drop a reference once the surrounding transaction commits."""
+    if name:
+        transaction.on_commit(lambda: media_storage.delete(name))
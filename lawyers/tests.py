@@ -1,3 +1,1115 @@
-from django.test import TestCase
+import base64
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import Http404
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from appointments.models import CaseAppointment
+from backend.watermarks import MAX_SEEN, decode_watermark, encode_watermark
+from clients.models import GeneralUserProfile
+from hire.models import Hire
+from users.models import User
+from . import document_search
+from .document_search import extract_document
+from .models import CaseDocument, CaseDocumentUpload, CaseEvent, LawyerDocuments, LawyerProfile, LawyerRating, LawyerStats, LegalCase, MediaBlob
+from .ratings import rate_lawyer, rebuild_ratings
+from .facets import facet_counts, get_facet_cube
+from .search import search_lawyers
+from .serializers import LawyerProfileSerializer
+from .stats import rebuild_stats
+from .storage import media_storage
+from .thumbnails import THUMBNAIL_SIZES, generate_thumbnails, thumbnail_name, thumbnail_names
+from .uploads import partial_path, write_chunk
+from .views import CaseSyncView, serve_public_media
 
-# Create your tests here.
+
+def make_lawyer(n, **fields):
+    user = User.objects.create_user(email=f'lawyer{n}@example.com', password=None, role='lawyer')
+    values = {
+        'full_name': f'Lawyer {n}',
+        'bar_registration_number': f'BAR{n}',
+        'experience_years': '3-5',
+        'location': 'Mumbai',
+    }
+    values.update(fields)
+    return LawyerProfile.objects.create(user=user, **values)
+
+
+def make_client(n):
+    user = User.objects.create_user(email=f'client{n}@example.com', password=None, role='general')
+    return GeneralUserProfile.objects.create(user=user, full_name=f'Client {n}', phone_number='9999999999')
+
+
+def make_case(lawyer, client, number, **fields):
+    values = {
+        'title': f'Case {number}',
+        'court': 'High Court',
+        'next_hearing': datetime.date(2026, 1, 1),
+    }
+    values.update(fields)
+    return LegalCase.objects.create(lawyer=lawyer, client=client, case_number=f'CN-{number}', **values)
+
+
+def make_document(legal_case, title, content=b'%PDF-1.4 test', name='file.pdf'):
+    return CaseDocument.objects.create(legal_case=legal_case, title=title, document=ContentFile(content, name=name))
+
+
+class TempMediaMixin:
+    """Points MEDIA_ROOT at a throwaway directory for the test class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+def api_client(user):
+    # A fresh instance, as a real request would load, without cached relations.
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=user.pk))
+    return client
+
+
+class MigrationTestCase(TransactionTestCase):
+    """
+    Rolls the schema back to migrate_from, lets the test create rows with
+    the historical models, then migrate() applies migrate_to.
+    """
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.old_apps = executor.loader.project_state(self.migrate_from).apps
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        return executor.loader.project_state(self.migrate_to).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+def count_queries(fn):
+    with CaptureQueriesContext(connection) as queries:
+        response = fn()
+    return response, len(queries)
+
+
+class LawyerDirectoryTests(TestCase):
+    def setUp(self):
+        self.client_profile = make_client(1)
+        self.lawyers = [make_lawyer(n) for n in range(3)]
+        make_case(self.lawyers[0], self.client_profile, 1)
+        make_case(self.lawyers[0], self.client_profile, 2)
+        Hire.objects.create(client=self.client_profile, lawyer=self.lawyers[0], status='accepted')
+        self.api = api_client(self.client_profile.user)
+
+    def test_list_includes_case_and_client_counts(self):
+        response = self.api.get('/api/lawyers/list/')
+        self.assertEqual(response.status_code, 200)
+        by_id = {row['lawyer_profile']['id']: row for row in response.data}
+        self.assertEqual(by_id[self.lawyers[0].id]['number_of_cases'], 2)
+        self.assertEqual(by_id[self.lawyers[0].id]['number_of_clients'], 1)
+        self.assertEqual(by_id[self.lawyers[1].id]['number_of_cases'], 0)
+
+    def test_list_query_count_does_not_grow_with_lawyers(self):
+        _, before = count_queries(lambda: self.api.get('/api/lawyers/list/'))
+        for n in range(3, 8):
+            make_lawyer(n)
+        response, after = count_queries(lambda: self.api.get('/api/lawyers/list/'))
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(before, after)
+
+    def test_detail_is_one_query(self):
+        response, queries = count_queries(lambda: self.api.get(f'/api/lawyers/detail/{self.lawyers[0].user_id}/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['number_of_cases'], 2)
+        self.assertEqual(queries, 1)
+
+
+class LawyerStatsTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+
+    def stats(self):
+        return LawyerStats.objects.get(lawyer=self.lawyer)
+
+    def test_case_lifecycle_updates_counters(self):
+        first = make_case(self.lawyer, self.client_profile, 1)
+        make_case(self.lawyer, self.client_profile, 2, status='pending')
+        stats = self.stats()
+        self.assertEqual((stats.total_cases, stats.active_cases, stats.closed_cases), (2, 1, 0))
+
+        first.status = 'closed'
+        first.save()
+        stats = self.stats()
+        self.assertEqual((stats.total_cases, stats.active_cases, stats.closed_cases), (2, 0, 1))
+
+        first.delete()
+        stats = self.stats()
+        self.assertEqual((stats.total_cases, stats.active_cases, stats.closed_cases), (1, 0, 0))
+
+    def test_moving_a_case_moves_its_counts(self):
+        other = make_lawyer(2)
+        legal_case = make_case(self.lawyer, self.client_profile, 1)
+        legal_case.lawyer = other
+        legal_case.save()
+        self.assertEqual(self.stats().total_cases, 0)
+        self.assertEqual(LawyerStats.objects.get(lawyer=other).active_cases, 1)
+
+    def test_rebuild_reports_and_fixes_drift(self):
+        make_case(self.lawyer, self.client_profile, 1)
+        LawyerStats.objects.filter(lawyer=self.lawyer).update(total_cases=7)
+
+        drift = rebuild_stats(lawyer_ids=[self.lawyer.pk])
+        self.assertIn((self.lawyer.pk, 'total_cases', 7, 1), drift)
+        self.assertEqual(self.stats().total_cases, 1)
+        self.assertEqual(rebuild_stats(lawyer_ids=[self.lawyer.pk]), [])
+
+    def test_missing_row_is_rebuilt_on_first_change(self):
+        make_case(self.lawyer, self.client_profile, 1)
+        LawyerStats.objects.filter(lawyer=self.lawyer).delete()
+        make_case(self.lawyer, self.client_profile, 2)
+        self.assertEqual(self.stats().total_cases, 2)
+
+    def test_stats_endpoint(self):
+        make_case(self.lawyer, self.client_profile, 1)
+        response = api_client(self.lawyer.user).get('/api/lawyers/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_cases'], 1)
+        self.assertEqual(api_client(self.client_profile.user).get('/api/lawyers/stats/').status_code, 403)
+
+
+class LawyerSearchTests(TestCase):
+    def setUp(self):
+        make_lawyer(1, full_name='Asha Rao', bio='Divorce and custody disputes', specialization='family', rating=2.0)
+        make_lawyer(2, full_name='Ravi Menon', bio='Fraud and theft trials', specialization='criminal', rating=4.0)
+        make_lawyer(3, full_name='Meera Iyer', bio='Custody appeals', specialization='family', rating=5.0)
+        self.api = api_client(make_client(1).user)
+
+    def test_ranks_matches_and_skips_the_rest(self):
+        response = self.api.get('/api/lawyers/search/', {'q': 'custody'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['lawyer_profile']['full_name'] for row in response.data], ['Meera Iyer', 'Asha Rao'])
+
+    def test_prefix_terms_match(self):
+        self.assertEqual(len(search_lawyers('cust')), 2)
+
+    def test_index_follows_profile_edits(self):
+        profile = LawyerProfile.objects.get(full_name='Ravi Menon')
+        profile.bio = 'Custody mediation'
+        profile.save()
+        self.assertEqual(len(search_lawyers('custody')), 3)
+        profile.delete()
+        self.assertEqual(len(search_lawyers('custody')), 2)
+
+    def test_limit_is_bounded(self):
+        self.assertEqual(len(self.api.get('/api/lawyers/search/', {'q': 'custody', 'limit': -5}).data), 1)
+        self.assertEqual(len(self.api.get('/api/lawyers/search/', {'q': 'custody', 'limit': 0}).data), 1)
+        self.assertEqual(self.api.get('/api/lawyers/search/', {'q': 'custody', 'limit': 'ten'}).status_code, 400)
+        self.assertEqual(self.api.get('/api/lawyers/search/').status_code, 400)
+
+
+class LawyerSearchIndexMigrationTests(MigrationTestCase):
+    migrate_from = [('lawyers', '0010_lawyerstats')]
+    migrate_to = [('lawyers', '0011_lawyer_search_index')]
+
+    def test_existing_profiles_are_indexed(self):
+        User = self.old_apps.get_model('users', 'User')
+        Profile = self.old_apps.get_model('lawyers', 'LawyerProfile')
+        user = User.objects.create(email='old@example.com', role='lawyer')
+        Profile.objects.create(
+            user=user, full_name='Old Lawyer', bar_registration_number='OLD1', experience_years='3-5',
+            location='Pune', bio='Intellectual property', specialization='intellectual_property',
+        )
+        self.migrate()
+        self.assertEqual([lawyer_id for lawyer_id, _ in search_lawyers('property')], [Profile.objects.get().pk])
+
+
+class DirectoryFacetTests(TestCase):
+    def setUp(self):
+        make_lawyer(1, specialization='family', location='Mumbai', rating=4.2)
+        make_lawyer(2, specialization='family', location=' mumbai', rating=4.8)
+        make_lawyer(3, specialization='criminal', location='Pune', rating=2.5, is_verified=True)
+        make_lawyer(4, specialization='criminal', location='MUMBAI', rating=4.6)
+        self.api = api_client(make_client(1).user)
+
+    def test_cube_buckets_ratings_and_folds_location(self):
+        # Four lawyers, three distinct (specialization, location, stars) cells.
+        self.assertEqual(len(get_facet_cube()), 3)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets = facet_counts({'specialization': ['family'], 'location': 'Mumbai'})
+        self.assertEqual(facets['specialization'], {'family': 2, 'criminal': 1})
+        self.assertEqual(facets['location'], {'mumbai': 2})
+        self.assertEqual(facets['rating'], {'4': 2})
+
+    def test_whole_star_rating_bounds(self):
+        facets = facet_counts({'min_rating': 4})
+        self.assertEqual(facets['specialization'], {'family': 2, 'criminal': 1})
+        self.assertEqual(facets['rating'], {'4': 3, '2': 1})
+
+    def test_list_filters_and_reports_facets(self):
+        response = self.api.get('/api/lawyers/list/', {'specialization': 'criminal', 'min_rating': '3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['lawyer_profile']['full_name'] for row in response.data['results']], ['Lawyer 4'])
+        self.assertEqual(response.data['facets']['is_verified'], {'false': 1})
+        self.assertEqual(self.api.get('/api/lawyers/list/', {'specialization': 'maritime'}).status_code, 400)
+
+    def test_facet_counts_match_the_lists_they_link_to(self):
+        make_lawyer(5, specialization='family', location='Mumbai ', rating=4.4)
+        for params in [{'location': 'Mumbai'}, {'min_rating': '4.5'}, {'max_rating': '4.5'},
+                       {'location': 'mumbai', 'min_rating': '4.3', 'max_rating': '4.7'}]:
+            response = self.api.get('/api/lawyers/list/', params)
+            specializations = response.data['facets']['specialization']
+            self.assertEqual(sum(specializations.values()), len(response.data['results']), params)
+            for specialization, count in specializations.items():
+                linked = self.api.get('/api/lawyers/list/', {**params, 'specialization': specialization})
+                self.assertEqual(len(linked.data['results']), count, (params, specialization))
+
+    def test_cube_is_rebuilt_after_profile_changes(self):
+        get_facet_cube()
+        get_facet_cube({'min_rating': 0.5})
+        make_lawyer(5, specialization='corporate', location='Delhi', rating=1.0)
+        self.assertEqual(facet_counts({})['specialization']['corporate'], 1)
+        self.assertEqual(facet_counts({'min_rating': 0.5})['specialization']['corporate'], 1)
+
+
+class RatingTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.clients = [make_client(n) for n in range(3)]
+
+    def totals(self):
+        self.lawyer.refresh_from_db()
+        return self.lawyer.rating_sum, self.lawyer.rating_count, self.lawyer.rating
+
+    def test_first_ratings_and_re_ratings(self):
+        rate_lawyer(self.clients[0], self.lawyer.pk, 4)
+        rate_lawyer(self.clients[1], self.lawyer.pk, 5)
+        self.assertEqual(self.totals(), (9, 2, 4.5))
+
+        rate_lawyer(self.clients[0], self.lawyer.pk, 1)
+        self.assertEqual(self.totals(), (6, 2, 3.0))
+        self.assertEqual(LawyerRating.objects.count(), 2)
+
+    def test_lawyer_row_is_locked_before_the_rating_is_read(self):
+        with CaptureQueriesContext(connection) as queries:
+            rate_lawyer(self.clients[0], self.lawyer.pk, 3)
+        statements = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertIn('lawyers_lawyerprofile', statements[0])
+        self.assertIn('lawyers_lawyerrating', statements[1])
+
+    def test_rate_view(self):
+        api = api_client(self.clients[0].user)
+        response = api.post('/api/lawyers/rate/', {'lawyer_id': self.lawyer.pk, 'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['new_rating'], 4.0)
+        self.assertEqual(api.post('/api/lawyers/rate/', {'lawyer_id': self.lawyer.pk, 'rating': 9}, format='json').status_code, 400)
+        self.assertEqual(api_client(self.lawyer.user).post('/api/lawyers/rate/', {'lawyer_id': self.lawyer.pk, 'rating': 4}, format='json').status_code, 403)
+
+    def test_rebuild_fixes_drift(self):
+        rate_lawyer(self.clients[0], self.lawyer.pk, 2)
+        LawyerProfile.objects.filter(pk=self.lawyer.pk).update(rating_count=5)
+        drift = rebuild_ratings()
+        self.assertEqual(drift, [(self.lawyer.pk, (2, 5, 2.0), (2, 1, 2.0))])
+        self.assertEqual(self.totals(), (2, 1, 2.0))
+
+
+class RatingTotalsMigrationTests(MigrationTestCase):
+    migrate_from = [('lawyers', '0011_lawyer_search_index')]
+    migrate_to = [('lawyers', '0012_lawyerprofile_rating_sum_rating_count')]
+
+    def test_totals_are_backfilled_from_existing_ratings(self):
+        User = self.old_apps.get_model('users', 'User')
+        Profile = self.old_apps.get_model('lawyers', 'LawyerProfile')
+        Client = self.old_apps.get_model('clients', 'GeneralUserProfile')
+        Rating = self.old_apps.get_model('lawyers', 'LawyerRating')
+        lawyer = Profile.objects.create(
+            user=User.objects.create(email='l@example.com', role='lawyer'), full_name='L',
+            bar_registration_number='B1', experience_years='3-5', location='Pune',
+        )
+        for n, rating in enumerate([5, 4, 4]):
+            client = Client.objects.create(user=User.objects.create(email=f'c{n}@example.com', role='general'), full_name='C')
+            Rating.objects.create(user=client, lawyer=lawyer, rating=rating)
+
+        apps = self.migrate()
+        lawyer = apps.get_model('lawyers', 'LawyerProfile').objects.get(pk=lawyer.pk)
+        self.assertEqual((lawyer.rating_sum, lawyer.rating_count, lawyer.rating), (13, 3, 4.3))
+
+
+class BatchRatingLookupTests(TestCase):
+    def setUp(self):
+        self.lawyers = [make_lawyer(n) for n in range(3)]
+        self.client_profile = make_client(1)
+        rate_lawyer(self.client_profile, self.lawyers[0].pk, 5)
+        self.api = api_client(self.client_profile.user)
+
+    def test_returns_every_requested_lawyer_in_one_query_set(self):
+        ids = ','.join(str(lawyer.pk) for lawyer in self.lawyers)
+        response, queries = count_queries(lambda: self.api.get('/api/lawyers/check-lawyer-ratings/', {'lawyer_ids': ids}))
+        self.assertEqual(response.status_code, 200)
+        ratings = response.data['ratings']
+        self.assertEqual(ratings[self.lawyers[0].pk]['rating'], 5)
+        self.assertFalse(ratings[self.lawyers[1].pk]['has_rated'])
+        self.assertEqual(len(ratings), 3)
+        # Profile lookup plus the ratings, however many ids are asked for.
+        self.assertEqual(queries, 2)
+
+    def test_repeated_lawyer_ids_params_are_merged(self):
+        response = self.api.get(f'/api/lawyers/check-lawyer-ratings/?lawyer_ids={self.lawyers[0].pk}&lawyer_ids={self.lawyers[1].pk}')
+        self.assertEqual(len(response.data['ratings']), 2)
+
+    def test_rejects_bad_input(self):
+        self.assertEqual(self.api.get('/api/lawyers/check-lawyer-ratings/').status_code, 400)
+        self.assertEqual(self.api.get('/api/lawyers/check-lawyer-ratings/', {'lawyer_ids': '1,x'}).status_code, 400)
+        too_many = ','.join(str(n) for n in range(201))
+        self.assertEqual(self.api.get('/api/lawyers/check-lawyer-ratings/', {'lawyer_ids': too_many}).status_code, 400)
+        lawyer_api = api_client(self.lawyers[0].user)
+        self.assertEqual(lawyer_api.get('/api/lawyers/check-lawyer-ratings/', {'lawyer_ids': '1'}).status_code, 403)
+
+
+class CaseListTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        for n in range(3):
+            legal_case = make_case(self.lawyer, self.client_profile, n, status='closed' if n == 2 else 'active')
+            make_document(legal_case, f'Doc {n}', content=f'doc {n}'.encode())
+        self.api = api_client(self.lawyer.user)
+
+    def test_documents_are_prefetched(self):
+        self.api.get('/api/lawyers/cases/')
+        response, before = count_queries(lambda: self.api.get('/api/lawyers/cases/'))
+        self.assertEqual(len(response.data['cases']), 3)
+        self.assertEqual(len(response.data['cases'][0]['documents']), 1)
+
+        for n in range(3, 6):
+            make_document(make_case(self.lawyer, self.client_profile, n), f'Doc {n}')
+        _, after = count_queries(lambda: self.api.get('/api/lawyers/cases/'))
+        self.assertEqual(before, after)
+
+    def test_document_count_instead_of_documents(self):
+        response = self.api.get('/api/lawyers/cases/', {'documents': 'count'})
+        self.assertEqual([case['document_count'] for case in response.data['cases']], [1, 1, 1])
+        self.assertNotIn('documents', response.data['cases'][0])
+
+    def test_filters_and_pages(self):
+        response = self.api.get('/api/lawyers/cases/', {'status': 'active,pending'})
+        self.assertEqual(len(response.data['cases']), 2)
+        self.assertEqual(self.api.get('/api/lawyers/cases/', {'status': 'won'}).status_code, 400)
+        self.assertEqual(self.api.get('/api/lawyers/cases/', {'hearing_from': '01-01-2026'}).status_code, 400)
+
+        page = self.api.get('/api/lawyers/cases/', {'page_size': 2})
+        self.assertEqual(len(page.data['cases']), 2)
+        self.assertIsNotNone(page.data['next'])
+
+    def test_client_sees_the_same_listing(self):
+        response = api_client(self.client_profile.user).get('/api/lawyers/cases/client')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['cases']), 3)
+
+
+class HearingCalendarTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        day = datetime.date(2026, 5, 4)
+        make_case(self.lawyer, self.client_profile, 1, next_hearing=day)
+        make_case(self.lawyer, self.client_profile, 2, next_hearing=day + datetime.timedelta(days=1))
+        make_case(self.lawyer, self.client_profile, 3, next_hearing=day + datetime.timedelta(days=30))
+        for title, at in [('Late', datetime.time(16, 0)), ('Untimed', None), ('Early', datetime.time(9, 30))]:
+            CaseAppointment.objects.create(
+                user=self.client_profile, lawyer=self.lawyer, title=title, appointment_date=day, appointment_time=at,
+            )
+        self.range = {'from': '2026-05-04', 'to': '2026-05-10'}
+
+    def test_merges_hearings_and_appointments_in_order(self):
+        response = api_client(self.lawyer.user).get('/api/lawyers/calendar/', self.range)
+        self.assertEqual(response.status_code, 200)
+        events = [(event['type'], event['title']) for event in response.data['events']]
+        self.assertEqual(events, [
+            ('hearing', 'Case 1'),
+            ('appointment', 'Untimed'),
+            ('appointment', 'Early'),
+            ('appointment', 'Late'),
+            ('hearing', 'Case 2'),
+        ])
+
+    def test_client_calendar(self):
+        response = api_client(self.client_profile.user).get('/api/lawyers/calendar/', self.range)
+        self.assertEqual(len(response.data['events']), 5)
+
+    def test_range_validation(self):
+        api = api_client(self.lawyer.user)
+        self.assertEqual(api.get('/api/lawyers/calendar/', {'from': '2026-05-10', 'to': '2026-05-01'}).status_code, 400)
+        self.assertEqual(api.get('/api/lawyers/calendar/', {'from': '2026-01-01', 'to': '2027-06-01'}).status_code, 400)
+        self.assertEqual(api.get('/api/lawyers/calendar/', {'from': 'May 4'}).status_code, 400)
+
+
+class BulkCaseUpdateTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        self.cases = [make_case(self.lawyer, self.client_profile, n) for n in range(3)]
+        self.other_case = make_case(make_lawyer(2), self.client_profile, 99)
+        self.api = api_client(self.lawyer.user)
+
+    def post(self, updates):
+        return self.api.post('/api/lawyers/update-cases/', {'updates': updates}, format='json')
+
+    def test_updates_valid_items_and_reports_the_rest(self):
+        response = self.post([
+            {'case_id': self.cases[0].id, 'status': 'closed'},
+            {'case_id': self.cases[1].id, 'next_hearing': '2026-09-01', 'priority': 'urgent'},
+            {'case_id': self.cases[1].id, 'status': 'closed'},
+            {'case_id': self.cases[2].id, 'status': 'won'},
+            {'case_id': self.other_case.id, 'status': 'closed'},
+            {'status': 'closed'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['failed']), (2, 4))
+        self.assertEqual([result['result'] for result in response.data['results']],
+                         ['updated', 'updated', 'error', 'error', 'error', 'error'])
+
+        self.cases[1].refresh_from_db()
+        self.assertEqual((self.cases[1].priority, self.cases[1].next_hearing), ('urgent', datetime.date(2026, 9, 1)))
+        self.other_case.refresh_from_db()
+        self.assertEqual(self.other_case.status, 'active')
+
+    def test_keeps_stats_and_events_in_step(self):
+        self.post([{'case_id': case.id, 'status': 'closed'} for case in self.cases])
+        stats = LawyerStats.objects.get(lawyer=self.lawyer)
+        self.assertEqual((stats.active_cases, stats.closed_cases), (0, 3))
+        self.assertEqual(CaseEvent.objects.filter(lawyer=self.lawyer, kind='updated').count(), 3)
+
+    def test_accepts_a_bare_list(self):
+        response = self.api.post('/api/lawyers/update-cases/', [{'case_id': self.cases[0].id, 'status': 'closed'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+        self.cases[0].refresh_from_db()
+        self.assertEqual(self.cases[0].status, 'closed')
+
+        for body in ['closed', 12, {'updates': {'case_id': self.cases[1].id}}]:
+            self.assertEqual(self.api.post('/api/lawyers/update-cases/', body, format='json').status_code, 400, body)
+
+    def test_batch_limits(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([{'case_id': n, 'status': 'closed'} for n in range(501)]).status_code, 400)
+        self.assertEqual(api_client(self.client_profile.user).post('/api/lawyers/update-cases/', {'updates': [{}]}, format='json').status_code, 403)
+
+
+class CaseImportTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        self.api = api_client(self.lawyer.user)
+
+    def upload(self, content, name='cases.csv', **params):
+        url = '/api/lawyers/cases/import/'
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.api.post(url, {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def csv_rows(self, *rows):
+        header = 'title,client_id,court,case_number,next_hearing,status\n'
+        return (header + ''.join(f'{row}\n' for row in rows)).encode()
+
+    def test_imports_csv_and_reports_bad_rows(self):
+        cid = self.client_profile.id
+        response = self.upload(self.csv_rows(
+            f'Alpha,{cid},HC,A-1,2026-02-01,active',
+            f'Beta,{cid},HC,A-2,2026-02-01,closed',
+            f'Gamma,{cid},HC,A-1,2026-02-01,active',
+            'Delta,999,HC,A-3,2026-02-01,active',
+            f'Eps,{cid},HC,A-4,01/02/2026,active',
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 3))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5])
+        stats = LawyerStats.objects.get(lawyer=self.lawyer)
+        self.assertEqual((stats.total_cases, stats.closed_cases), (2, 1))
+        self.assertEqual(CaseEvent.objects.filter(kind='created').count(), 2)
+
+    def test_type_parameter_picks_the_parser(self):
+        line = f'{{"title": "Json", "client_id": {self.client_profile.id}, "court": "HC", "case_number": "J-1", "next_hearing": "2026-02-01"}}\n'
+        response = self.upload(line.encode(), name='export.txt', type='ndjson')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(self.upload(line.encode(), name='export.txt').status_code, 400)
+
+    def test_format_parameter_is_left_to_drf(self):
+        # ?format= picks a DRF renderer, so it can't name the import format.
+        self.assertEqual(self.upload(self.csv_rows(), format='csv').status_code, 404)
+
+    def test_non_utf8_file_is_a_bad_request(self):
+        response = self.upload(b'\xff\xfet\x00i\x00t\x00l\x00e\x00\n\x00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('UTF-8', response.data['error'])
+
+    def test_rows_before_an_encoding_error_are_kept(self):
+        # Text is decoded in blocks, so the good rows have to span more than one.
+        cid = self.client_profile.id
+        good = [f'Case {n},{cid},HC,A-{n},2026-02-01,active' for n in range(400)]
+        response = self.upload(self.csv_rows(*good) + b'Bad \xff,1,HC,B-1,2026-02-01,active\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertGreater(response.data['created'], 0)
+        self.assertEqual(response.data['created'], LegalCase.objects.count())
+
+    def test_broken_csv_is_a_bad_request(self):
+        oversized = 'x' * 200000
+        response = self.upload(self.csv_rows(f'"{oversized}",1,HC,A-1,2026-02-01,active'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Malformed CSV', response.data['error'])
+
+    def test_overlong_values_fail_their_own_row(self):
+        cid = self.client_profile.id
+        response = self.upload(self.csv_rows(
+            f'{"T" * 256},{cid},HC,A-1,2026-02-01,active',
+            f'Fine,{cid},{"C" * 256},A-2,2026-02-01,active',
+            f'Fine,{cid},HC,{"N" * 51},2026-02-01,active',
+            f'Fine,{cid},HC,A-4,2026-02-01,active',
+        ))
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 3))
+        self.assertEqual([error['error'] for error in response.data['errors']], [
+            'title must be at most 255 characters.',
+            'court must be at most 255 characters.',
+            'case_number must be at most 50 characters.',
+        ])
+
+
+class CaseSyncTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        self.cases = [make_case(self.lawyer, self.client_profile, n) for n in range(3)]
+        self.api = api_client(self.lawyer.user)
+
+    def sync(self, since=None):
+        response = self.api.get('/api/lawyers/cases/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_snapshot_then_deltas(self):
+        snapshot = self.sync()
+        self.assertTrue(snapshot['full'])
+        self.assertEqual(len(snapshot['cases']), 3)
+
+        self.cases[0].status = 'closed'
+        self.cases[0].save()
+        case_id = self.cases[1].id
+        self.cases[1].delete()
+        delta = self.sync(snapshot['watermark'])
+        self.assertFalse(delta['full'])
+        self.assertEqual([case['id'] for case in delta['cases']], [self.cases[0].id])
+        self.assertEqual(delta['deleted'], [case_id])
+
+    def test_repeated_poll_is_empty(self):
+        watermark = self.sync()['watermark']
+        self.cases[0].save()
+        delta = self.sync(watermark)
+        self.assertEqual(len(delta['cases']), 1)
+        again = self.sync(delta['watermark'])
+        self.assertEqual((again['cases'], again['deleted']), ([], []))
+        self.assertEqual(self.sync(again['watermark'])['cases'], [])
+
+    def test_event_committed_out_of_id_order_is_not_lost(self):
+        # The slow writer's id and timestamp are taken before the fast
+        # writer's, but its row only becomes visible after the next poll.
+        slow = CaseEvent.objects.create(case_id=self.cases[2].id, lawyer=self.lawyer, client=self.client_profile, kind='updated')
+        slow_id, slow_at = slow.id, slow.created_at
+        slow.delete()
+        watermark = self.sync()['watermark']
+        self.cases[0].save()
+        delta = self.sync(watermark)
+        self.assertEqual([case['id'] for case in delta['cases']], [self.cases[0].id])
+
+        CaseEvent.objects.create(id=slow_id, case_id=self.cases[2].id,
+                                 lawyer=self.lawyer, client=self.client_profile, kind='updated')
+        CaseEvent.objects.filter(id=slow_id).update(created_at=slow_at)
+        late = self.sync(delta['watermark'])
+        self.assertEqual([case['id'] for case in late['cases']], [self.cases[2].id])
+        self.assertEqual(self.sync(late['watermark'])['cases'], [])
+
+    def test_pages_through_a_long_backlog(self):
+        watermark = self.sync()['watermark']
+        for case in self.cases:
+            case.save()
+        with patch.object(CaseSyncView, 'max_events', 2):
+            first = self.sync(watermark)
+            second = self.sync(first['watermark'])
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(sorted(case['id'] for case in first['cases'] + second['cases']),
+                         sorted(case.id for case in self.cases))
+
+    def test_rejects_foreign_watermarks(self):
+        oversized = base64.urlsafe_b64encode(
+            json.dumps({'t': timezone.now().isoformat(), 's': list(range(MAX_SEEN + 1))}).encode()
+        ).decode()
+        for since in ['12', 'not-a-watermark', oversized]:
+            response = self.api.get('/api/lawyers/cases/sync/', {'since': since})
+            self.assertEqual(response.status_code, 400)
+        # Watermarks this server hands out are trimmed to fit.
+        self.assertEqual(len(decode_watermark(encode_watermark(timezone.now(), range(MAX_SEEN + 1)))[1]), MAX_SEEN)
+
+    def test_client_sees_own_cases(self):
+        make_case(make_lawyer(2), make_client(2), 99)
+        data = api_client(self.client_profile.user).get('/api/lawyers/cases/sync/').data
+        self.assertEqual(len(data['cases']), 3)
+
+
+class ChunkedUploadTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        settings_override = override_settings(CHUNKED_UPLOAD_DIR=self.upload_dir, CHUNKED_UPLOAD_CHUNK_SIZE=4)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.lawyer = make_lawyer(1)
+        self.case = make_case(self.lawyer, make_client(1), 1)
+        self.api = api_client(self.lawyer.user)
+        self.data = b'0123456789'
+        response = self.api.post(f'/api/lawyers/cases/{self.case.id}/uploads/',
+                                 {'title': 'Brief', 'filename': 'brief.txt', 'size': len(self.data)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.upload_id = response.data['upload_id']
+
+    def put(self, offset, body):
+        return self.api.put(f'/api/lawyers/uploads/{self.upload_id}/?offset={offset}', body,
+                            content_type='application/octet-stream')
+
+    def finish(self):
+        return self.api.post(f'/api/lawyers/uploads/{self.upload_id}/finalize/')
+
+    def test_chunks_assemble_into_a_document(self):
+        for offset in range(0, len(self.data), 4):
+            response = self.put(offset, self.data[offset:offset + 4])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['received'], len(self.data))
+        self.assertEqual(self.finish().status_code, 201)
+        document = CaseDocument.objects.get(legal_case=self.case)
+        with document.document.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(self.put(0, b'0123').status_code, 409)
+
+    def test_stale_retry_is_rejected_before_touching_the_file(self):
+        self.put(0, b'0123')
+        self.put(4, b'4567')
+        stale = self.put(0, b'XXXX')
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale.data['received'], 8)
+        with open(partial_path(CaseDocumentUpload.objects.get(pk=self.upload_id)), 'rb') as partial:
+            self.assertEqual(partial.read(), b'01234567')
+
+        self.put(8, b'89')
+        self.finish()
+        with CaseDocument.objects.get(legal_case=self.case).document.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_short_body_leaves_the_upload_where_it_was(self):
+        self.put(0, b'0123')
+        upload = CaseDocumentUpload.objects.get(pk=self.upload_id)
+        with self.assertRaises(ValueError):
+            write_chunk(upload, 4, io.BytesIO(b'45'), 4)
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 4)
+        with open(partial_path(upload), 'rb') as partial:
+            self.assertEqual(partial.read(), b'0123')
+
+        response = self.api.get(f'/api/lawyers/uploads/{self.upload_id}/')
+        self.assertEqual(response.data['received'], 4)
+        self.assertEqual(self.put(4, b'4567').status_code, 200)
+
+    def test_chunk_limits_and_incomplete_finish(self):
+        self.assertEqual(self.put(0, b'01234').status_code, 400)
+        self.assertEqual(self.put(8, b'0123').status_code, 400)
+        self.assertEqual(self.finish().status_code, 409)
+
+    def test_discard_removes_the_partial_file(self):
+        self.put(0, b'0123')
+        path = partial_path(CaseDocumentUpload.objects.get(pk=self.upload_id))
+        self.assertEqual(self.api.delete(f'/api/lawyers/uploads/{self.upload_id}/').status_code, 204)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(CaseDocumentUpload.objects.filter(pk=self.upload_id).exists())
+
+
+class CountingFile(ContentFile):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def chunks(self, chunk_size=None):
+        self.reads += 1
+        return super().chunks(chunk_size)
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.case = make_case(make_lawyer(1), make_client(1), 1)
+
+    def blob(self, document):
+        return MediaBlob.objects.get(name=document.document.name)
+
+    def test_identical_content_is_stored_once(self):
+        first = make_document(self.case, 'One')
+        second = make_document(self.case, 'Two', name='copy.pdf')
+        self.assertEqual(first.document.name, second.document.name)
+        self.assertTrue(first.document.name.startswith('blobs/'))
+        self.assertEqual(self.blob(first).refcount, 2)
+        self.assertEqual(self.blob(first).size, len(b'%PDF-1.4 test'))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'blobs', 'tmp')), [])
+
+    def test_upload_is_read_once(self):
+        content = CountingFile(b'%PDF-1.4 counted', name='counted.pdf')
+        CaseDocument.objects.create(legal_case=self.case, title='Counted', document=content)
+        self.assertEqual(content.reads, 1)
+
+    def test_file_goes_with_its_last_reference(self):
+        first = make_document(self.case, 'One')
+        second = make_document(self.case, 'Two')
+        name = first.document.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, name)))
+
+        again = make_document(self.case, 'Again')
+        self.assertEqual(again.document.name, name)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+        self.assertEqual(self.blob(again).refcount, 1)
+
+    def test_replacing_a_file_releases_the_old_one(self):
+        document = make_document(self.case, 'One')
+        old_name = document.document.name
+        with self.captureOnCommitCallbacks(execute=True):
+            document.document = ContentFile(b'%PDF-1.4 v2', name='v2.pdf')
+            document.save()
+        self.assertNotEqual(document.document.name, old_name)
+        self.assertFalse(MediaBlob.objects.filter(name=old_name).exists())
+        self.assertEqual(self.blob(document).refcount, 1)
+
+    def test_unknown_and_legacy_names_are_ignored(self):
+        media_storage.delete('blobs/aa/bb/missing.pdf')
+        media_storage.delete('case_documents/old.pdf')
+
+
+class CaseDocumentDownloadTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        self.case = make_case(self.lawyer, self.client_profile, 1)
+        self.document = make_document(self.case, 'Brief', content=b'0123456789')
+        self.url = f'/api/lawyers/case-documents/{self.document.id}/download/'
+        self.api = api_client(self.lawyer.user)
+
+    def test_only_the_case_parties_can_download(self):
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(api_client(self.client_profile.user).get(self.url).status_code, 200)
+        self.assertEqual(api_client(make_lawyer(2).user).get(self.url).status_code, 404)
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+
+    def test_ranges(self):
+        response = self.api.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        self.assertEqual(b''.join(self.api.get(self.url, HTTP_RANGE='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.api.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+        stale = self.api.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"other"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_conditional_get(self):
+        etag = self.api.get(self.url)['ETag']
+        self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_case_listing_only_links_the_download_view(self):
+        documents = self.api.get('/api/lawyers/cases/').data['cases'][0]['documents']
+        self.assertNotIn('document', documents[0])
+        self.assertTrue(documents[0]['download_url'].endswith(self.url))
+
+    def test_media_urls_do_not_serve_private_files(self):
+        request = RequestFactory().get('/')
+        with self.assertRaises(Http404):
+            serve_public_media(request, self.document.document.name, document_root=self.media_root)
+        picture = make_lawyer(3)
+        picture.profile_picture = ContentFile(b'not really a png', name='me.png')
+        picture.save()
+        response = serve_public_media(request, picture.profile_picture.name, document_root=self.media_root)
+        self.assertEqual(response.status_code, 200)
+
+    def test_media_privacy_follows_the_referencing_field(self):
+        # Same bytes as the case document, so the same blob: it is public
+        # because a profile picture points at it.
+        request = RequestFactory().get('/')
+        picture = make_lawyer(3)
+        picture.profile_picture = ContentFile(b'0123456789', name='me.pdf')
+        picture.save()
+        self.assertEqual(picture.profile_picture.name, self.document.document.name)
+        response = serve_public_media(request, picture.profile_picture.name, document_root=self.media_root)
+        self.assertEqual(response.status_code, 200)
+
+        thumb = thumbnail_name(picture.profile_picture.name, 'sm', 'jpg')
+        default_storage.save(thumb, ContentFile(b'thumb'))
+        self.assertEqual(serve_public_media(request, thumb, document_root=self.media_root).status_code, 200)
+        with self.assertRaises(Http404):
+            serve_public_media(request, thumbnail_name('blobs/elsewhere.png', 'sm', 'jpg'), document_root=self.media_root)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        token = await sync_to_async(Token.objects.create)(user=self.lawyer.user)
+        response = await AsyncClient().get(self.url, headers={'Authorization': f'Token {token.key}', 'Range': 'bytes=1-3'})
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(hasattr(response.streaming_content, '__aiter__'))
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), b'123')
+
+
+class LawyerDocumentTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.documents = LawyerDocuments.objects.create(
+            lawyer=self.lawyer, uploaded=True,
+            photo_id=ContentFile(b'id card scan', name='id.png'), cop=ContentFile(b'%PDF-1.4 cop', name='cop.pdf'),
+        )
+        self.url = f'/api/lawyers/documents/{self.lawyer.id}/photo_id/download/'
+
+    def test_directory_only_shows_the_upload_status(self):
+        response = api_client(make_client(1).user).get('/api/lawyers/list/')
+        self.assertEqual(response.data[0]['lawyer_profile']['documents'], {'uploaded': True})
+
+    def test_owner_gets_download_links(self):
+        data = api_client(self.lawyer.user).get('/api/lawyers/documents/').data
+        self.assertNotIn('photo_id', data)
+        self.assertTrue(data['photo_id_url'].endswith(self.url))
+        self.assertTrue(data['cop_url'].endswith(f'/api/lawyers/documents/{self.lawyer.id}/cop/download/'))
+
+    def test_only_the_lawyer_and_staff_can_download(self):
+        response = api_client(self.lawyer.user).get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'id card scan')
+
+        staff = User.objects.create_user(email='staff@example.com', password=None, role='admin', is_staff=True)
+        self.assertEqual(api_client(staff).get(self.url).status_code, 200)
+        self.assertEqual(api_client(make_lawyer(2).user).get(self.url).status_code, 404)
+        self.assertEqual(api_client(self.lawyer.user).get(f'/api/lawyers/documents/{self.lawyer.id}/bio/download/').status_code, 404)
+
+    def test_media_urls_do_not_serve_id_documents(self):
+        request = RequestFactory().get('/')
+        for name in (self.documents.photo_id.name, self.documents.cop.name):
+            with self.assertRaises(Http404):
+                serve_public_media(request, name, document_root=self.media_root)
+
+
+def png_bytes(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'navy').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ThumbnailTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        # Run the background jobs inline.
+        executor = patch('lawyers.thumbnails.executor')
+        self.addCleanup(executor.stop)
+        executor.start().submit.side_effect = lambda fn, *args: fn(*args)
+
+    def set_picture(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lawyer.profile_picture = ContentFile(content, name='me.png')
+            self.lawyer.save()
+        return self.lawyer.profile_picture.name
+
+    def test_upload_generates_every_size_and_format(self):
+        name = self.set_picture(png_bytes(1000, 600))
+        for thumb in thumbnail_names(name):
+            self.assertTrue(default_storage.exists(thumb), thumb)
+        with default_storage.open(thumbnail_name(name, 'sm', 'jpg')) as f:
+            self.assertEqual(max(Image.open(f).size), THUMBNAIL_SIZES['sm'])
+        self.assertEqual(generate_thumbnails(media_storage, name), 0)
+        self.assertEqual(generate_thumbnails(media_storage, name, force=True), len(thumbnail_names(name)))
+
+    def test_profile_serves_the_thumbnail(self):
+        name = self.set_picture(png_bytes(300, 300))
+        data = LawyerProfileSerializer(self.lawyer).data
+        self.assertEqual(data['profile_picture'], default_storage.url(thumbnail_name(name, 'md', 'jpg')))
+        self.assertEqual(set(data['profile_picture_thumbnails']), set(THUMBNAIL_SIZES))
+
+    def test_files_pillow_cannot_read_are_skipped(self):
+        name = self.set_picture(b'not an image')
+        self.assertFalse(any(default_storage.exists(thumb) for thumb in thumbnail_names(name)))
+        self.assertIsNone(LawyerProfileSerializer(self.lawyer).data['profile_picture_thumbnails'])
+
+    def test_thumbnails_go_with_the_last_reference(self):
+        name = self.set_picture(png_bytes(200, 200))
+        self.set_picture(png_bytes(210, 200))
+        self.assertFalse(any(default_storage.exists(thumb) for thumb in thumbnail_names(name)))
+
+    def test_backfill_command(self):
+        with patch('lawyers.signals.schedule_thumbnails'):
+            name = self.set_picture(png_bytes(200, 200))
+        out = io.StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn(f'{len(thumbnail_names(name))} thumbnails written', out.getvalue())
+
+    def test_id_scans_get_no_public_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            documents = LawyerDocuments.objects.create(lawyer=self.lawyer, photo_id=ContentFile(png_bytes(300, 200), name='id.png'))
+        self.assertFalse(any(default_storage.exists(thumb) for thumb in thumbnail_names(documents.photo_id.name)))
+
+        # Derivatives made before ID scans were excluded are cleaned up.
+        generate_thumbnails(media_storage, documents.photo_id.name)
+        call_command('generate_thumbnails', stdout=io.StringIO())
+        self.assertFalse(any(default_storage.exists(thumb) for thumb in thumbnail_names(documents.photo_id.name)))
+
+
+class DocumentSearchTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        self.case = make_case(self.lawyer, self.client_profile, 1)
+        self.brief = make_document(self.case, 'Brief', b'The tenancy agreement was breached in March.', name='brief.txt')
+        self.notes = make_document(self.case, 'Notes', b'Tenancy deposit withheld by the landlord.', name='notes.txt')
+        other_case = make_case(make_lawyer(2), make_client(2), 2)
+        self.other = make_document(other_case, 'Other', b'Another tenancy dispute.', name='other.txt')
+        for document in (self.brief, self.notes, self.other):
+            extract_document(document, in_process=True)
+        self.api = api_client(self.lawyer.user)
+
+    def search(self, **params):
+        return self.api.get('/api/lawyers/case-documents/search/', params)
+
+    def test_finds_text_in_own_cases_only(self):
+        response = self.search(q='tenancy')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({hit['id'] for hit in response.data}, {self.brief.id, self.notes.id})
+        hit = self.search(q='breached').data[0]
+        self.assertEqual(hit['id'], self.brief.id)
+        self.assertIn('**breached**', hit['snippet'])
+        self.assertEqual(api_client(self.client_profile.user).get('/api/lawyers/case-documents/search/', {'q': 'deposit'}).data[0]['id'], self.notes.id)
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.search(q='tenancy', limit=0).data), 1)
+        self.assertEqual(len(self.search(q='tenancy', limit=-5).data), 1)
+        self.assertEqual(self.search(q='tenancy', limit='x').status_code, 400)
+        self.assertEqual(self.search(q='').status_code, 400)
+
+    def test_outcomes_are_recorded(self):
+        self.assertEqual(self.brief.text.status, 'done')
+        scan = make_document(self.case, 'Scan', b'binary', name='scan.bin')
+        self.assertEqual(extract_document(scan, in_process=True).status, 'unsupported')
+        self.assertEqual(self.search(q='scan').data, [])
+
+    def test_deleted_documents_leave_the_index(self):
+        self.brief.delete()
+        self.assertEqual([hit['id'] for hit in self.search(q='tenancy').data], [self.notes.id])
+
+
+class ExtractionWorkerTests(SimpleTestCase):
+    def tearDown(self):
+        document_search._kill_process_pool()
+
+    def test_overrunning_parse_is_killed_and_the_worker_replaced(self):
+        # len and time.sleep stand in for extract_text: both pickle into the spawned worker.
+        with patch.object(document_search, 'extract_text', len):
+            self.assertEqual(document_search.extract_in_worker('abc'), 3)
+        workers = list(document_search.process_pool()._processes.values())
+
+        with patch.object(document_search, 'extract_text', time.sleep), patch.object(document_search, 'EXTRACTION_TIMEOUT', 1):
+            with self.assertRaises(TimeoutError):
+                document_search.extract_in_worker(60)
+        self.assertIsNone(document_search._process_pool)
+        for worker in workers:
+            worker.join(5)
+            self.assertFalse(worker.is_alive())
+
+        with patch.object(document_search, 'extract_text', len):
+            self.assertEqual(document_search.extract_in_worker('abcd'), 4)
+
+
+class DocumentSearchMigrationTests(MigrationTestCase):
+    migrate_from = [('lawyers', '0016_mediablob')]
+    migrate_to = [('lawyers', '0017_document_search')]
+
+    def test_creates_and_drops_the_search_table(self):
+        self.assertNotIn('lawyers_documentsearch', connection.introspection.table_names())
+        self.migrate()
+        self.assertIn('lawyers_documentsearch', connection.introspection.table_names())
+
+
+class CaseDocumentsZipTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+        self.case = make_case(self.lawyer, self.client_profile, 1)
+        make_document(self.case, 'Brief', b'%PDF-1.4 brief')
+        make_document(self.case, 'Brief', b'%PDF-1.4 second brief')
+        make_document(self.case, 'Notes.txt', b'notes ' * 1000, name='notes.txt')
+        self.url = f'/api/lawyers/cases/{self.case.id}/documents/zip/'
+
+    def archive(self, content):
+        return zipfile.ZipFile(io.BytesIO(content))
+
+    def test_archive_holds_every_document_under_a_unique_name(self):
+        response = api_client(self.lawyer.user).get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = self.archive(b''.join(response.streaming_content))
+        self.assertEqual(archive.namelist(), ['Brief.pdf', 'Brief (2).pdf', 'Notes.txt'])
+        self.assertEqual(archive.read('Brief (2).pdf'), b'%PDF-1.4 second brief')
+        self.assertEqual(archive.getinfo('Brief.pdf').compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo('Notes.txt').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.read('Notes.txt'), b'notes ' * 1000)
+
+    def test_access(self):
+        self.assertEqual(api_client(self.client_profile.user).get(self.url).status_code, 200)
+        self.assertEqual(api_client(make_lawyer(2).user).get(self.url).status_code, 404)
+        empty = make_case(self.lawyer, self.client_profile, 2)
+        self.assertEqual(api_client(self.lawyer.user).get(f'/api/lawyers/cases/{empty.id}/documents/zip/').status_code, 404)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        token = await sync_to_async(Token.objects.create)(user=self.lawyer.user)
+        response = await AsyncClient().get(self.url, headers={'Authorization': f'Token {token.key}'})
+        self.assertTrue(hasattr(response.streaming_content, '__aiter__'))
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(len(self.archive(b''.join(chunks)).namelist()), 3)
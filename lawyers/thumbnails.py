@@ -0,0 +1,99 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Longest edge in pixels. 'sm' is the directory avatar, 'md' the detail view.
+THUMBNAIL_SIZES = {'sm': 128, 'md': 512}
+THUMBNAIL_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_DIR = 'thumbs/'
+
+# Pillow drops the GIL while decoding and resizing, so a couple of threads
+# keep thumbnailing off the request without a separate worker process.
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='thumbnails')
+
+
+def thumbnail_name(source_name, size, ext):
+    # Content-addressed sources make this a per-blob cache shared by every row.
+    return f"{THUMBNAIL_DIR}{os.path.splitext(source_name)[0]}_{size}.{ext}"
+
+
+def thumbnail_names(source_name):
+    return [thumbnail_name(source_name, size, ext) for size in THUMBNAIL_SIZES for ext in THUMBNAIL_FORMATS]
+
+
+THUMBNAIL_RE = re.compile(
+    rf"^{re.escape(THUMBNAIL_DIR)}(.+)_(?:{'|'.join(THUMBNAIL_SIZES)})\.(?:{'|'.join(THUMBNAIL_FORMATS)})$"
+)
+
+
+def thumbnail_source_stem(name):
+    """The source name, less its extension, that a thumbnail was made from; None for other names."""
+    match = THUMBNAIL_RE.match(name)
+    return match.group(1) if match else None
+
+
+def generate_thumbnails(storage, source_name, force=False):
+    """
+    Write every size/format derivative of an image that doesn't have them
+    yet. Files Pillow can't read (PDF scans and the like) are skipped.
+    Returns the number of thumbnails written.
+    """
+    if not force and all(default_storage.exists(name) for name in thumbnail_names(source_name)):
+        return 0
+
+    try:
+        with storage.open(source_name, 'rb') as f:
+            image = Image.open(f)
+            image.draft('RGB', (max(THUMBNAIL_SIZES.values()),) * 2)
+            image = ImageOps.exif_transpose(image).convert('RGB')
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return 0
+
+    written = 0
+    for size_key, size in THUMBNAIL_SIZES.items():
+        thumb = image.copy()
+        thumb.thumbnail((size, size), Image.LANCZOS)
+        for ext, fmt in THUMBNAIL_FORMATS.items():
+            name = thumbnail_name(source_name, size_key, ext)
+            if default_storage.exists(name):
+                if not force:
+                    continue
+                default_storage.delete(name)
+            buffer = BytesIO()
+            thumb.save(buffer, fmt, quality=THUMBNAIL_QUALITY, optimize=True)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def schedule_thumbnails(field_file):
+    if field_file:
+        storage, name = field_file.storage, field_file.name
+        transaction.on_commit(lambda: executor.submit(generate_thumbnails, storage, name))
+
+
+def delete_thumbnails(source_name):
+    for name in thumbnail_names(source_name):
+        default_storage.delete(name)
+
+
+def thumbnail_urls(field_file, request=None):
+    """
+    {size: {format: url}} for the derivatives that exist, or None while they
+    are still being generated (or the file isn't an image).
+    """
+    # Derivatives are written in order, so the last one existing means all do.
+    if not field_file or not default_storage.exists(thumbnail_names(field_file.name)[-1]):
+        return None
+    urls = {}
+    for size_key in THUMBNAIL_SIZES:
+        for ext in THUMBNAIL_FORMATS:
+            url = default_storage.url(thumbnail_name(field_file.name, size_key, ext))
+            urls.setdefault(size_key, {})[ext] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,96 @@
+import os
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from .models import CaseDocument, CaseDocumentUpload
+
+READ_SIZE = 64 * 1024
+
+
+class PartialUploadFile(File):
+    # Exposing temporary_file_path() lets FileSystemStorage move the finished
+    # file into place instead of copying it.
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def partial_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{upload.pk}.part")
+
+
+def start_upload(legal_case, title, filename, size):
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    upload = CaseDocumentUpload.objects.create(legal_case=legal_case, title=title, filename=filename, size=size)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+class UploadConflict(Exception):
+    """The upload is not where the client thinks it is; upload is its current state."""
+
+    def __init__(self, message, upload):
+        super().__init__(message)
+        self.upload = upload
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Copy length bytes from stream into the partial file at offset, READ_SIZE
+    at a time, and advance received. The upload row is locked from the offset
+    check to the advance, so a stale or duplicate PUT is turned away with
+    UploadConflict before it touches the file. Raises ValueError, leaving the
+    upload as it was, if the body is short.
+    """
+    with transaction.atomic():
+        upload = CaseDocumentUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status != 'uploading':
+            raise UploadConflict("Upload is already complete.", upload)
+        if offset != upload.received:
+            raise UploadConflict("Offset does not match received bytes.", upload)
+
+        written = 0
+        with open(partial_path(upload), 'r+b') as partial:
+            partial.seek(offset)
+            while written < length:
+                block = stream.read(min(READ_SIZE, length - written))
+                if not block:
+                    break
+                partial.write(block)
+                written += len(block)
+            # A short body leaves the file as it was; a full one drops any stale tail.
+            partial.truncate(offset if written != length else partial.tell())
+
+        if written != length:
+            raise ValueError("Request body ended before Content-Length bytes were received.")
+
+        upload.received = offset + written
+        upload.save(update_fields=['received', 'updated_at'])
+    return upload
+
+
+def finish_upload(upload):
+    path = partial_path(upload)
+    with transaction.atomic():
+        upload = CaseDocumentUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status == 'complete':
+            return upload.document
+
+        document = CaseDocument(legal_case=upload.legal_case, title=upload.title)
+        with open(path, 'rb') as partial:
+            document.document.save(upload.filename, PartialUploadFile(partial, name=upload.filename), save=False)
+        document.save()
+
+        upload.status = 'complete'
+        upload.document = document
+        upload.save(update_fields=['status', 'document', 'updated_at'])
+
+    if os.path.exists(path):
+        os.remove(path)
+    return document
+
+
+def discard_upload(upload):
+    path = partial_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    upload.delete()
@@ -3,15 +3,29 @@ from . import views
 
 urlpatterns = [
     path('list/', views.LawyerListView.as_view(), name='lawyer-list'),
+    path('search/', views.LawyerSearchView.as_view(), name='lawyer-search'),
+    path('stats/', views.LawyerStatsView.as_view(), name='lawyer-stats'),
     path('detail/<int:user_id>/', views.LawyerDetailView.as_view(), name='lawyer-detail'),
     path('clients/<int:lawyer_id>/', views.get_lawyer_clients, name='lawyer-clients'),
     path('appointments/', views.LawyerAppointmentsView.as_view(), name='lawyer-appointments'),
     path('cases/', views.LawyerCasesView.as_view(), name='lawyer-cases'),
     path('cases/client', views.ClientCasesView.as_view(), name='client-cases'),
+    path('cases/sync/', views.CaseSyncView.as_view(), name='case-sync'),
+    path('cases/import/', views.ImportCasesView.as_view(), name='import-cases'),
+    path('calendar/', views.HearingCalendarView.as_view(), name='hearing-calendar'),
     path('cases/<int:case_id>/upload-document/', views.UploadCaseDocumentView.as_view(), name='upload-case-document'),
+    path('cases/<int:case_id>/documents/zip/', views.CaseDocumentsZipView.as_view(), name='case-documents-zip'),
+    path('cases/<int:case_id>/uploads/', views.StartChunkedUploadView.as_view(), name='start-chunked-upload'),
+    path('uploads/<uuid:upload_id>/', views.ChunkedUploadView.as_view(), name='chunked-upload'),
+    path('uploads/<uuid:upload_id>/finalize/', views.FinishChunkedUploadView.as_view(), name='finish-chunked-upload'),
+    path('case-documents/search/', views.CaseDocumentSearchView.as_view(), name='case-document-search'),
+    path('case-documents/<int:document_id>/download/', views.CaseDocumentDownloadView.as_view(), name='case-document-download'),
     path('documents/', views.LawyerDocumentUploadView.as_view(), name='lawyer-document-upload'),
+    path('documents/<int:lawyer_id>/<str:kind>/download/', views.LawyerDocumentDownloadView.as_view(), name='lawyer-document-download'),
     path('rate/', views.RateLawyerView.as_view(), name='rate-lawyer'),
     path('check-lawyer-rating/', views.GetLawyerRatingView.as_view(), name='check-lawyer-rating'),
+    path('check-lawyer-ratings/', views.BatchLawyerRatingView.as_view(), name='check-lawyer-ratings'),
     path('update-profile/', views.UpdateLawyerProfileView.as_view(), name='update-lawyer-profile'),
-    path('update-case/<int:case_id>/', views.UpdateCaseView.as_view(), name='update-case')
+    path('update-case/<int:case_id>/', views.UpdateCaseView.as_view(), name='update-case'),
+    path('update-cases/', views.BulkUpdateCasesView.as_view(), name='bulk-update-cases')
 ]
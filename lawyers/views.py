@@ -1,22 +1,39 @@
 from django.http import Http404
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.views.static import serve
 from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-from .models import LawyerProfile, LegalCase, LawyerDocuments, LawyerRating
+from .models import LawyerProfile, LegalCase, LawyerDocuments, LawyerRating, LawyerStats, CaseEvent, CaseDocument, CaseDocumentUpload
 from users.models import User
 from appointments.models import CaseAppointment
 from clients.models import GeneralUserProfile
-from .serializers import LawyerDocumentsSerializer, LawyerProfileSerializer
+from .serializers import LawyerDocumentsSerializer, LawyerProfileSerializer, LawyerStatsSerializer
 from users.serializers import UserSerializer
 from appointments.serializers import CaseAppointmentSerializer
 from rest_framework import status
 from django.utils import timezone
-from datetime import datetime
+from django.conf import settings
+from datetime import datetime, timedelta
+from collections import Counter
+import heapq
 from rest_framework.parsers import MultiPartParser, FormParser
 from .serializers import CaseDocumentSerializer
+from .cases import apply_case_update, case_list_response, record_case_events, serialize_case
+from .uploads import UploadConflict, discard_upload, finish_upload, start_upload, write_chunk
+from .downloads import file_download_response, is_public_media, zip_download_response
+from .document_search import search_documents
+from .importers import ImportFileError, detect_format, import_cases, iter_rows
+from .facets import apply_filters, facet_counts, parse_filters
+from .ratings import rate_lawyer
+from .search import search_lawyers
+from .stats import bump, case_status_deltas, rebuild_stats
+from backend.pagination import paginate
+from backend.watermarks import decode_watermark, read_since, watermark_now
 
 from dotenv import load_dotenv
 import os
@@ -24,28 +41,99 @@ import os
 load_dotenv()
 debug = os.getenv("DEBUG", "False")
 
-def update_lawyer_rating(lawyer):
-    avg_rating = LawyerRating.objects.filter(lawyer=lawyer).aggregate(avg=Avg('rating'))['avg'] or 0
-    lawyer.rating = round(avg_rating, 1)
-    lawyer.save()
-
-
 class LawyerListView(ListAPIView):
-    queryset = User.objects.filter(role='lawyer').exclude(email='legalbot@casebridge.com')
+    queryset = User.objects.with_profiles().filter(role='lawyer').exclude(email='legalbot@casebridge.com')
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        queryset = self.get_queryset()
+        try:
+            filters = parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = apply_filters(self.get_queryset(), filters, prefix='lawyer_profile__')
+        queryset, paginator = paginate(request, queryset, '-date_joined', view=self)
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        # Plain unfiltered requests keep the original bare-list response.
+        if paginator is None and not filters and 'facets' not in request.query_params:
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        data = {"results": serializer.data, "facets": facet_counts(filters)}
+        if paginator is not None:
+            return paginator.get_paginated_response(data)
+        return Response(data, status=status.HTTP_200_OK)
+    
+class LawyerSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        ranked = search_lawyers(query, limit=limit)
+        lawyer_ids = [lawyer_id for lawyer_id, _ in ranked]
+        users = {
+            user.lawyer_profile.id: user
+            for user in User.objects.with_profiles()
+            .filter(lawyer_profile__id__in=lawyer_ids)
+            .exclude(email='legalbot@casebridge.com')
+        }
+
+        results = []
+        for lawyer_id, score in ranked:
+            if lawyer_id in users:
+                results.append({**UserSerializer(users[lawyer_id]).data, "score": score})
+        return Response(results, status=status.HTTP_200_OK)
     
+class CaseDocumentSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        hits = search_documents(request.user, query, limit=limit)
+        documents = CaseDocument.objects.select_related('legal_case').in_bulk([document_id for document_id, _, _ in hits])
+        origin = request.build_absolute_uri('/').rstrip('/')
+
+        results = []
+        for document_id, score, snippet in hits:
+            document = documents.get(document_id)
+            if document is None:
+                continue
+            results.append({
+                "id": document.id,
+                "title": document.title,
+                "case_id": document.legal_case_id,
+                "case_number": document.legal_case.case_number,
+                "case_title": document.legal_case.title,
+                "uploaded_at": document.uploaded_at,
+                "download_url": origin + reverse('case-document-download', args=[document.id]),
+                "snippet": snippet,
+                "score": score,
+            })
+        return Response(results, status=status.HTTP_200_OK)
+
 class LawyerDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get_object(self, user_id):
         try:
-            return User.objects.get(id=user_id)
+            return User.objects.with_profiles().get(id=user_id)
         except User.DoesNotExist:
             raise Http404
     
@@ -54,6 +142,23 @@ class LawyerDetailView(APIView):
         serializer = UserSerializer(lawyer)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+class LawyerStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            lawyer_profile = request.user.lawyer_profile
+        except LawyerProfile.DoesNotExist:
+            return Response({"error": "You are not authorized to view stats."}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            stats = lawyer_profile.stats
+        except LawyerStats.DoesNotExist:
+            rebuild_stats(lawyer_ids=[lawyer_profile.pk])
+            stats = LawyerStats.objects.get(lawyer=lawyer_profile)
+
+        return Response(LawyerStatsSerializer(stats).data, status=status.HTTP_200_OK)
+
 class UpdateLawyerProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -119,9 +224,12 @@ class LawyerAppointmentsView(APIView):
         except LawyerProfile.DoesNotExist:
             return Response({"error": "You are not authorized to view appointments."}, status=status.HTTP_403_FORBIDDEN)
 
-        appointments = CaseAppointment.objects.filter(lawyer=lawyer_profile).order_by('-appointment_date')
+        appointments = CaseAppointment.objects.filter(lawyer=lawyer_profile).select_related('user').order_by('-appointment_date')
+        appointments, paginator = paginate(request, appointments, '-appointment_date', view=self)
 
         serializer = CaseAppointmentSerializer(appointments, many=True)
+        if paginator is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class LawyerCasesView(APIView):
@@ -135,31 +243,7 @@ class LawyerCasesView(APIView):
         except LawyerProfile.DoesNotExist:
             return Response({"error": "You are not authorized to view cases."}, status=status.HTTP_403_FORBIDDEN)
 
-        cases = LegalCase.objects.filter(lawyer=lawyer_profile).order_by('-created_at')
-
-        return Response({
-            "cases": [
-                {
-                    "id": case.id,
-                    "title": case.title,
-                    "client": case.client.full_name,
-                    "court": case.court,
-                    "case_number": case.case_number,
-                    "next_hearing": case.next_hearing,
-                    "status": case.status,
-                    "priority": case.priority,
-                    "created_at": case.created_at,
-                    "documents": [
-                        {
-                            "id": doc.id,
-                            "title": doc.title,
-                            "document": request.build_absolute_uri(doc.document.url),
-                            "uploaded_at": doc.uploaded_at
-                        } for doc in case.documents.all()
-                    ]
-                } for case in cases
-            ]
-        }, status=status.HTTP_200_OK)
+        return case_list_response(request, LegalCase.objects.filter(lawyer=lawyer_profile), view=self)
 
     def post(self, request):
         user = request.user
@@ -234,45 +318,10 @@ class UpdateCaseView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        data = request.data
-        updated_fields = []
-
-        if 'status' in data:
-            valid_statuses = [choice[0] for choice in LegalCase.STATUS_CHOICES]
-            if data['status'] not in valid_statuses:
-                return Response(
-                    {"error": f"Invalid status. Valid options are: {', '.join(valid_statuses)}"}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            legal_case.status = data['status']
-            updated_fields.append('status')
-
-        if 'next_hearing' in data:
-            try:
-                next_hearing_date = datetime.strptime(data['next_hearing'], '%Y-%m-%d').date()
-                legal_case.next_hearing = next_hearing_date
-                updated_fields.append('next_hearing')
-            except ValueError:
-                return Response(
-                    {"error": "Invalid date format for next_hearing. Use YYYY-MM-DD format."}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        if 'priority' in data:
-            valid_priorities = [choice[0] for choice in LegalCase.PRIORITY_CHOICES]
-            if data['priority'] not in valid_priorities:
-                return Response(
-                    {"error": f"Invalid priority. Valid options are: {', '.join(valid_priorities)}"}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            legal_case.priority = data['priority']
-            updated_fields.append('priority')
-
-        if not updated_fields:
-            return Response(
-                {"error": "No valid fields provided for update. Supported fields: status, next_hearing, priority"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        try:
+            updated_fields = apply_case_update(legal_case, request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             legal_case.last_update = timezone.now()
@@ -301,6 +350,133 @@ class UpdateCaseView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
+class ImportCasesView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    max_reported_errors = 1000
+
+    def post(self, request):
+        try:
+            lawyer_profile = request.user.lawyer_profile
+        except LawyerProfile.DoesNotExist:
+            return Response({"error": "You are not authorized to create cases."}, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Not ?format=, which DRF reserves for choosing the response renderer.
+        try:
+            fmt = detect_format(upload.name, request.query_params.get('type'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors, failed = [], 0
+
+        def on_error(row_number, row, message):
+            nonlocal failed
+            failed += 1
+            if len(errors) < self.max_reported_errors:
+                errors.append({"row": row_number, "case_number": (row or {}).get('case_number'), "error": message})
+
+        # Large uploads are already spooled to a temp file; rows are read from it lazily.
+        try:
+            created = import_cases(lawyer_profile, iter_rows(upload.file, fmt), on_error)
+        except ImportFileError as e:
+            errors.sort(key=lambda error: error["row"])
+            return Response({
+                "error": str(e),
+                "created": e.created,
+                "failed": failed,
+                "errors": errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        errors.sort(key=lambda error: error["row"])
+
+        return Response({
+            "message": "Import finished.",
+            "created": created,
+            "failed": failed,
+            "errors": errors,
+            "errors_truncated": failed > len(errors)
+        }, status=status.HTTP_200_OK)
+
+class BulkUpdateCasesView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_updates = 500
+
+    def post(self, request):
+        try:
+            lawyer_profile = request.user.lawyer_profile
+        except LawyerProfile.DoesNotExist:
+            return Response({"error": "You are not authorized to update cases."}, status=status.HTTP_403_FORBIDDEN)
+
+        # Either a bare list of updates or {"updates": [...]}.
+        updates = request.data.get('updates') if isinstance(request.data, dict) else request.data
+        if not isinstance(updates, list) or not updates:
+            return Response({"error": "updates must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(updates) > self.max_updates:
+            return Response({"error": f"At most {self.max_updates} updates per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        def parse_case_id(item):
+            try:
+                return int(item['case_id'])
+            except (TypeError, KeyError, ValueError):
+                return None
+
+        results = []
+        with transaction.atomic():
+            # One ownership check for the whole batch; rows stay locked until the bulk write.
+            cases = LegalCase.objects.select_for_update().filter(
+                lawyer=lawyer_profile, id__in={parse_case_id(item) for item in updates} - {None}
+            ).in_bulk()
+
+            now = timezone.now()
+            changed, fields, deltas, seen = [], {'last_update', 'updated_at'}, Counter(), set()
+
+            for item in updates:
+                case_id = parse_case_id(item)
+                if case_id is None:
+                    results.append({"case_id": None, "result": "error", "error": "case_id is required."})
+                    continue
+                if case_id in seen:
+                    results.append({"case_id": case_id, "result": "error", "error": "Duplicate case_id in request."})
+                    continue
+                seen.add(case_id)
+
+                legal_case = cases.get(case_id)
+                if legal_case is None:
+                    results.append({
+                        "case_id": case_id, "result": "error",
+                        "error": "Case not found or you don't have permission to update this case."
+                    })
+                    continue
+
+                old_status = legal_case.status
+                try:
+                    updated_fields = apply_case_update(legal_case, item)
+                except ValueError as e:
+                    results.append({"case_id": case_id, "result": "error", "error": str(e)})
+                    continue
+
+                # bulk_update skips auto_now and the post_save signals, so those are done here.
+                legal_case.last_update = now
+                legal_case.updated_at = now
+                changed.append(legal_case)
+                fields.update(updated_fields)
+                deltas.update(case_status_deltas(old_status, legal_case.status))
+                results.append({"case_id": case_id, "result": "updated", "updated_fields": updated_fields})
+
+            if changed:
+                LegalCase.objects.bulk_update(changed, fields=sorted(fields))
+                bump(lawyer_profile.pk, **deltas)
+                record_case_events(changed, 'updated')
+
+        return Response({
+            "updated": len(changed),
+            "failed": len(results) - len(changed),
+            "results": results
+        }, status=status.HTTP_200_OK)
+
 class ClientCasesView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -312,32 +488,151 @@ class ClientCasesView(APIView):
         except GeneralUserProfile.DoesNotExist:
             return Response({"error": "You are not authorized to view cases."}, status=status.HTTP_403_FORBIDDEN)
 
-        cases = LegalCase.objects.filter(client=client_profile).order_by('-created_at')
+        return case_list_response(request, LegalCase.objects.filter(client=client_profile), view=self)
+
+class CaseSyncView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_events = 1000
+    # Case writes can commit out of timestamp order by up to this much.
+    overlap = timedelta(seconds=5)
+
+    def get(self, request):
+        user = request.user
+
+        if user.role == 'lawyer' and hasattr(user, 'lawyer_profile'):
+            owner = {'lawyer': user.lawyer_profile}
+        elif user.role == 'general' and hasattr(user, 'general_profile'):
+            owner = {'client': user.general_profile}
+        else:
+            return Response({"error": "You are not authorized to view cases."}, status=status.HTTP_403_FORBIDDEN)
+
+        since = request.query_params.get('since')
+        cases = LegalCase.objects.filter(**owner).select_related('client').prefetch_related('documents')
+        case_events = CaseEvent.objects.filter(**owner).only('id', 'case_id', 'kind', 'created_at')
+        media_origin = request.build_absolute_uri('/').rstrip('/')
+
+        if not since:
+            # Full snapshot. The watermark is read first so a change racing the
+            # snapshot is repeated in the next delta rather than lost.
+            watermark = watermark_now(case_events, 'created_at', self.overlap)
+            return Response({
+                "watermark": watermark,
+                "full": True,
+                "has_more": False,
+                "cases": [serialize_case(case, media_origin) for case in cases.order_by('-updated_at')],
+                "deleted": []
+            }, status=status.HTTP_200_OK)
+
+        try:
+            since, seen = decode_watermark(since)
+        except ValueError:
+            return Response({"error": "since must be a watermark returned by this endpoint."}, status=status.HTTP_400_BAD_REQUEST)
+
+        events, has_more, watermark = read_since(case_events, 'created_at', since, seen, self.max_events, self.overlap)
+
+        changed, deleted = set(), set()
+        for event in events:
+            if event.kind == 'deleted':
+                deleted.add(event.case_id)
+                changed.discard(event.case_id)
+            else:
+                changed.add(event.case_id)
+                deleted.discard(event.case_id)
 
         return Response({
-            "cases": [
-                {
-                    "id": case.id,
-                    "title": case.title,
-                    "client": case.client.full_name,
-                    "court": case.court,
-                    "case_number": case.case_number,
-                    "next_hearing": case.next_hearing,
-                    "status": case.status,
-                    "priority": case.priority,
-                    "created_at": case.created_at,
-                    "documents": [
-                        {
-                            "id": doc.id,
-                            "title": doc.title,
-                            "document": request.build_absolute_uri(doc.document.url),
-                            "uploaded_at": doc.uploaded_at
-                        } for doc in case.documents.all()
-                    ]
-                } for case in cases
-            ]
+            "watermark": watermark,
+            "full": False,
+            "has_more": has_more,
+            "cases": [serialize_case(case, media_origin) for case in cases.filter(id__in=changed)],
+            "deleted": sorted(deleted)
         }, status=status.HTTP_200_OK)
 
+class HearingCalendarView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_days = 366
+
+    def get_range(self, params):
+        today = timezone.localdate()
+        try:
+            start = datetime.strptime(params['from'], '%Y-%m-%d').date() if params.get('from') else today
+            end = datetime.strptime(params['to'], '%Y-%m-%d').date() if params.get('to') else start + timedelta(days=6)
+        except ValueError:
+            raise ValueError("Invalid date format for from/to. Use YYYY-MM-DD format.")
+        if end < start:
+            raise ValueError("to must not be before from.")
+        if (end - start).days > self.max_days:
+            raise ValueError(f"Date range may span at most {self.max_days} days.")
+        return start, end
+
+    def get(self, request):
+        user = request.user
+
+        if user.role == 'lawyer' and hasattr(user, 'lawyer_profile'):
+            owner = {'lawyer': user.lawyer_profile}
+            appointment_owner = owner
+        elif user.role == 'general' and hasattr(user, 'general_profile'):
+            owner = {'client': user.general_profile}
+            appointment_owner = {'user': user.general_profile}
+        else:
+            return Response({"error": "You are not authorized to view the calendar."}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            start, end = self.get_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Both lookups are range scans on the (owner, date) composite indexes.
+        hearings = LegalCase.objects.filter(
+            next_hearing__range=(start, end), **owner
+        ).order_by('next_hearing', 'id').values(
+            'id', 'title', 'case_number', 'court', 'status', 'priority', 'next_hearing',
+            'client__full_name', 'lawyer__full_name'
+        )
+        appointments = CaseAppointment.objects.filter(
+            appointment_date__range=(start, end), **appointment_owner
+        ).order_by('appointment_date', F('appointment_time').asc(nulls_first=True), 'id').values(
+            'id', 'title', 'description', 'status', 'appointment_date', 'appointment_time',
+            'user__full_name', 'lawyer__full_name'
+        )
+
+        hearing_events = (
+            {
+                "type": "hearing",
+                "date": case['next_hearing'],
+                "time": None,
+                "case_id": case['id'],
+                "title": case['title'],
+                "case_number": case['case_number'],
+                "court": case['court'],
+                "status": case['status'],
+                "priority": case['priority'],
+                "client": case['client__full_name'],
+                "lawyer": case['lawyer__full_name'],
+            } for case in hearings
+        )
+        appointment_events = (
+            {
+                "type": "appointment",
+                "date": appointment['appointment_date'],
+                "time": appointment['appointment_time'],
+                "appointment_id": appointment['id'],
+                "title": appointment['title'],
+                "description": appointment['description'],
+                "status": appointment['status'],
+                "client": appointment['user__full_name'],
+                "lawyer": appointment['lawyer__full_name'],
+            } for appointment in appointments
+        )
+
+        # Hearings carry no time, so on a shared date they sort before appointments.
+        # Untimed appointments likewise come first; the query orders NULL times
+        # first explicitly because Postgres would otherwise put them last.
+        events = heapq.merge(
+            hearing_events, appointment_events,
+            key=lambda event: (event['date'], event['time'] is not None, event['time'] or datetime.min.time())
+        )
+        return Response({"from": start, "to": end, "events": list(events)}, status=status.HTTP_200_OK)
+
 class UploadCaseDocumentView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
@@ -353,12 +648,189 @@ class UploadCaseDocumentView(APIView):
         data = request.data.copy()
         data['legal_case'] = legal_case.id
 
-        serializer = CaseDocumentSerializer(data=data)
+        serializer = CaseDocumentSerializer(data=data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response({"message": "Document uploaded successfully.", "document": serializer.data}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class StartChunkedUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, case_id):
+        try:
+            legal_case = LegalCase.objects.get(id=case_id, lawyer__user=request.user)
+        except LegalCase.DoesNotExist:
+            return Response({"error": "Case not found or unauthorized."}, status=status.HTTP_404_NOT_FOUND)
+
+        title = request.data.get('title')
+        filename = request.data.get('filename')
+        if not title or not filename:
+            return Response({"error": "title and filename are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({"error": "size must be the total file size in bytes."}, status=status.HTTP_400_BAD_REQUEST)
+        if size <= 0 or size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            return Response({"error": f"size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes."}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = start_upload(legal_case, title, os.path.basename(filename), size)
+        return Response({
+            "upload_id": upload.id,
+            "size": upload.size,
+            "received": upload.received,
+            "chunk_size": settings.CHUNKED_UPLOAD_CHUNK_SIZE
+        }, status=status.HTTP_201_CREATED)
+
+class ChunkedUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self, request, upload_id):
+        return CaseDocumentUpload.objects.select_related('legal_case').filter(
+            id=upload_id, legal_case__lawyer__user=request.user
+        ).first()
+
+    def describe(self, upload):
+        return {
+            "upload_id": upload.id,
+            "status": upload.status,
+            "size": upload.size,
+            "received": upload.received,
+            "document_id": upload.document_id
+        }
+
+    def get(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.describe(upload), status=status.HTTP_200_OK)
+
+    def put(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        if upload.status != 'uploading':
+            return Response({"error": "Upload is already complete."}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            offset = int(request.query_params.get('offset'))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return Response({"error": "offset query parameter and Content-Length header are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if length <= 0 or length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+            return Response({"error": f"Chunk must be between 1 and {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes."}, status=status.HTTP_400_BAD_REQUEST)
+        if offset + length > upload.size:
+            return Response({"error": "Chunk runs past the declared file size."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Chunks must arrive in order; after a dropped connection the client
+        # GETs the upload and resumes from "received".
+        try:
+            upload = write_chunk(upload, offset, request.stream, length)
+        except CaseDocumentUpload.DoesNotExist:
+            return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        except UploadConflict as e:
+            return Response({"error": str(e), **self.describe(e.upload)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(self.describe(upload), status=status.HTTP_200_OK)
+
+    def delete(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        if upload.status != 'uploading':
+            return Response({"error": "Upload is already complete."}, status=status.HTTP_409_CONFLICT)
+
+        discard_upload(upload)
+        return Response({"message": "Upload discarded."}, status=status.HTTP_204_NO_CONTENT)
+
+class FinishChunkedUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, upload_id):
+        upload = CaseDocumentUpload.objects.select_related('legal_case').filter(
+            id=upload_id, legal_case__lawyer__user=request.user
+        ).first()
+        if upload is None:
+            return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        if upload.received != upload.size:
+            return Response({
+                "error": "Upload is incomplete.",
+                "size": upload.size,
+                "received": upload.received
+            }, status=status.HTTP_409_CONFLICT)
+
+        document = finish_upload(upload)
+        return Response({"message": "Document uploaded successfully.", "document": CaseDocumentSerializer(document, context={'request': request}).data}, status=status.HTTP_201_CREATED)
+
+class CaseDocumentDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, document_id):
+        document = CaseDocument.objects.filter(
+            Q(legal_case__lawyer__user=request.user) | Q(legal_case__client__user=request.user),
+            id=document_id,
+        ).first()
+        if document is None or not document.document:
+            return Response({"error": "Document not found or unauthorized."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Stored names are content digests, so name the download after its title.
+        extension = os.path.splitext(document.document.name)[1]
+        filename = document.title if document.title.lower().endswith(extension) else document.title + extension
+        try:
+            return file_download_response(request, document.document, filename, as_attachment=request.query_params.get('download') == '1')
+        except FileNotFoundError:
+            return Response({"error": "Document file is missing."}, status=status.HTTP_404_NOT_FOUND)
+
+class LawyerDocumentDownloadView(APIView):
+    # ID documents go to their lawyer and to staff verifying them, nobody else.
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, lawyer_id, kind):
+        if kind not in ('photo_id', 'cop'):
+            return Response({"error": "Document not found or unauthorized."}, status=status.HTTP_404_NOT_FOUND)
+        documents = LawyerDocuments.objects.filter(lawyer_id=lawyer_id)
+        if not request.user.is_staff:
+            documents = documents.filter(lawyer__user=request.user)
+        documents = documents.first()
+        field_file = getattr(documents, kind, None)
+        if not field_file:
+            return Response({"error": "Document not found or unauthorized."}, status=status.HTTP_404_NOT_FOUND)
+
+        filename = kind + os.path.splitext(field_file.name)[1]
+        try:
+            return file_download_response(request, field_file, filename, as_attachment=request.query_params.get('download') == '1')
+        except FileNotFoundError:
+            return Response({"error": "Document file is missing."}, status=status.HTTP_404_NOT_FOUND)
+
+def serve_public_media(request, path, document_root=None):
+    # Development media server. Only profile pictures go out by URL; case
+    # documents and ID scans only through their authorized download views.
+    if not is_public_media(path):
+        raise Http404
+    return serve(request, path, document_root=document_root)
+
+class CaseDocumentsZipView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, case_id):
+        legal_case = LegalCase.objects.filter(
+            Q(lawyer__user=request.user) | Q(client__user=request.user),
+            id=case_id,
+        ).first()
+        if legal_case is None:
+            return Response({"error": "Case not found or unauthorized."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Fetched up front so no cursor stays open while the archive streams.
+        documents = list(legal_case.documents.order_by('uploaded_at', 'id'))
+        if not documents:
+            return Response({"error": "This case has no documents."}, status=status.HTTP_404_NOT_FOUND)
+
+        return zip_download_response(request, documents, f"{legal_case.case_number} documents.zip")
+
 class LawyerDocumentUploadView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
@@ -374,7 +846,7 @@ class LawyerDocumentUploadView(APIView):
         if not profile or not hasattr(profile, 'documents'):
             return Response({"detail": "Documents not found."}, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = LawyerDocumentsSerializer(profile.documents)
+        serializer = LawyerDocumentsSerializer(profile.documents, context={'request': request})
         return Response(serializer.data)
 
     def post(self, request):
@@ -423,13 +895,8 @@ class RateLawyerView(APIView):
         except ValueError:
             return Response({"error": "Rating must be an integer between 0 and 5."}, status=status.HTTP_400_BAD_REQUEST)
 
-        rating_obj, created = LawyerRating.objects.update_or_create(
-            user=general_profile,
-            lawyer=lawyer_profile,
-            defaults={'rating': rating}
-        )
-
-        update_lawyer_rating(lawyer_profile)
+        rate_lawyer(general_profile, lawyer_profile.pk, rating)
+        lawyer_profile.refresh_from_db(fields=['rating', 'rating_count'])
 
         return Response(
             {"message": "Rating submitted successfully.", "new_rating": lawyer_profile.rating},
@@ -468,4 +935,38 @@ class GetLawyerRatingView(APIView):
                 "has_rated": False,
                 "rating": None,
                 "rated_at": None
-            }, status=status.HTTP_200_OK)
\ No newline at end of file
+            }, status=status.HTTP_200_OK)
+
+class BatchLawyerRatingView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_ids = 200
+
+    def get(self, request):
+        raw_ids = ','.join(request.query_params.getlist('lawyer_ids'))
+        if not raw_ids:
+            return Response({"error": "lawyer_ids is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            lawyer_ids = {int(value) for value in raw_ids.split(',') if value.strip()}
+        except ValueError:
+            return Response({"error": "lawyer_ids must be a comma-separated list of integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(lawyer_ids) > self.max_ids:
+            return Response({"error": f"At most {self.max_ids} lawyer_ids per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            general_profile = request.user.general_profile
+        except GeneralUserProfile.DoesNotExist:
+            return Response({"error": "Only general users can check ratings."}, status=status.HTTP_403_FORBIDDEN)
+
+        ratings = {
+            lawyer_id: {"has_rated": False, "rating": None, "rated_at": None}
+            for lawyer_id in lawyer_ids
+        }
+        given = LawyerRating.objects.filter(
+            user=general_profile, lawyer_id__in=lawyer_ids
+        ).values_list('lawyer_id', 'rating', 'created_at')
+        for lawyer_id, rating, rated_at in given:
+            ratings[lawyer_id] = {"has_rated": True, "rating": rating, "rated_at": rated_at}
+
+        return Response({"ratings": ratings}, status=status.HTTP_200_OK)
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from lawyers.stats import bump
+from .models import Transaction
+
+
+def _earned(lawyer_id, status, amount):
+    return amount if lawyer_id and status == 'completed' else 0
+
+
+@receiver(post_init, sender=Transaction)
+def remember_transaction_state(sender, instance, **kwargs):
+    instance._stats_state = (instance.lawyer_id, instance.status, instance.amount)
+
+
+@receiver(post_save, sender=Transaction)
+def update_stats_on_transaction_save(sender, instance, created, **kwargs):
+    old_lawyer_id, old_status, old_amount = instance._stats_state
+    new_state = (instance.lawyer_id, instance.status, instance.amount)
+
+    if created:
+        bump(instance.lawyer_id, completed_earnings=_earned(*new_state))
+    elif new_state != instance._stats_state:
+        bump(old_lawyer_id, completed_earnings=-_earned(old_lawyer_id, old_status, old_amount))
+        bump(instance.lawyer_id, completed_earnings=_earned(*new_state))
+
+    instance._stats_state = new_state
+
+
+@receiver(post_delete, sender=Transaction)
+def update_stats_on_transaction_delete(sender, instance, **kwargs):
+    bump(instance.lawyer_id, rebuild_missing=False, completed_earnings=-_earned(*instance._stats_state))
@@ -1,3 +1,31 @@
+from decimal import Decimal
 from django.test import TestCase
+from lawyers.models import LawyerStats
+from lawyers.tests import make_client, make_lawyer
+from .models import Transaction
 
-# Create your tests here.
+
+class TransactionStatsTests(TestCase):
+    def setUp(self):
+        self.lawyer = make_lawyer(1)
+        self.client_profile = make_client(1)
+
+    def earnings(self):
+        return LawyerStats.objects.get(lawyer=self.lawyer).completed_earnings
+
+    def test_only_completed_payments_count(self):
+        payment = Transaction.objects.create(user=self.client_profile, lawyer=self.lawyer, amount=Decimal('500.00'))
+        self.assertEqual(self.earnings(), Decimal('0'))
+
+        payment.status = 'completed'
+        payment.save()
+        self.assertEqual(self.earnings(), Decimal('500.00'))
+
+        payment.status = 'refunded'
+        payment.save()
+        self.assertEqual(self.earnings(), Decimal('0'))
+
+    def test_deleting_a_completed_payment(self):
+        payment = Transaction.objects.create(user=self.client_profile, lawyer=self.lawyer, amount=Decimal('250.00'), status='completed')
+        payment.delete()
+        self.assertEqual(self.earnings(), Decimal('0'))
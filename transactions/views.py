@@ -11,6 +11,7 @@ from decimal import Decimal
 
 from .models import Transaction, LawyerProfile, GeneralUserProfile
 from .serializers import TransactionSerializer
+from backend.pagination import paginate
 
 from dotenv import load_dotenv
 import os
@@ -161,9 +162,12 @@ class LawyerTransactionsView(APIView):
                     Q(description__icontains=search)
                 )
 
-            transactions = transactions.order_by('-timestamp')
+            transactions = transactions.select_related('user', 'lawyer').order_by('-timestamp')
+            transactions, paginator = paginate(request, transactions, '-timestamp', view=self)
             serializer = TransactionSerializer(transactions, many=True)
 
+            if paginator is not None:
+                return paginator.get_paginated_response({'transactions': serializer.data})
             return Response({'transactions': serializer.data}, status=status.HTTP_200_OK)
 
         except LawyerProfile.DoesNotExist:
@@ -234,7 +238,8 @@ class ClientPaymentRequestsView(APIView):
             if status_filter and status_filter != 'all':
                 transactions = transactions.filter(status=status_filter)
 
-            transactions = transactions.order_by('-timestamp')
+            transactions = transactions.select_related('lawyer__user').order_by('-timestamp')
+            transactions, paginator = paginate(request, transactions, '-timestamp', view=self)
 
             serialized_transactions = []
             for transaction in transactions:
@@ -254,6 +259,8 @@ class ClientPaymentRequestsView(APIView):
                     }
                 })
 
+            if paginator is not None:
+                return paginator.get_paginated_response({'payment_requests': serialized_transactions})
             return Response({'payment_requests': serialized_transactions}, status=status.HTTP_200_OK)
 
         except GeneralUserProfile.DoesNotExist:
@@ -18,6 +18,13 @@ class UserManager(BaseUserManager):
 
         return self.create_user(email, password, role='admin', **extra_fields)
 
+    def with_profiles(self):
+        # Everything UserSerializer reads, fetched in a single query: the profile
+        # joins plus the lawyer's denormalized stats row.
+        return self.get_queryset().select_related(
+            'general_profile', 'lawyer_profile', 'lawyer_profile__documents', 'lawyer_profile__stats'
+        )
+
 class User(AbstractBaseUser, PermissionsMixin):
     ROLE_CHOICES = (
         ('lawyer', 'Lawyer'),
@@ -16,11 +16,17 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_number_of_cases(self, obj):
         if obj.role == 'lawyer' and hasattr(obj, 'lawyer_profile') and obj.lawyer_profile:
+            stats = getattr(obj.lawyer_profile, 'stats', None)
+            if stats is not None:
+                return stats.total_cases
             return obj.lawyer_profile.legal_cases.count()
         return None
 
     def get_number_of_clients(self, obj):
         if obj.role == 'lawyer' and hasattr(obj, 'lawyer_profile') and obj.lawyer_profile:
+            stats = getattr(obj.lawyer_profile, 'stats', None)
+            if stats is not None:
+                return stats.clients_served
             return Hire.objects.filter(
                 lawyer=obj.lawyer_profile,
                 status='accepted'
@@ -90,7 +90,7 @@ class SignupView(APIView):
                 print("Error during signup:", str(e))
             return Response({"error": "Signup failed"}, status=status.HTTP_400_BAD_REQUEST)
 
-        serialized_user = UserSerializer(user).data
+        serialized_user = UserSerializer(User.objects.with_profiles().get(pk=user.pk)).data
 
         return Response({
             "message": "Signup successful",
@@ -115,7 +115,7 @@ class LoginView(APIView):
 
         token, _ = Token.objects.get_or_create(user=user)
 
-        serialized_user = UserSerializer(user).data
+        serialized_user = UserSerializer(User.objects.with_profiles().get(pk=user.pk)).data
 
         return Response({
             "message": "Login successful",
@@ -140,6 +140,6 @@ class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
+        user = User.objects.with_profiles().get(pk=request.user.pk)
         serializer = UserSerializer(user)
         return Response({"user": serializer.data})
\ No newline at end of file